@@ -5,6 +5,8 @@ from dataclasses import dataclass
 import json
 import logging
 
+from ads.chatMessage import ChatMessage
+
 # Optional: Use OpenAI types if available
 try:
     from openai.types.chat import (
@@ -103,8 +105,8 @@ class MessageConverter:
         if msg is None:
             raise ValueError("Message cannot be None")
 
-        # Pass through if already a dict
-        if isinstance(msg, dict):
+        # Pass through if already a dict or a ChatMessage (the canonical history type)
+        if isinstance(msg, (dict, ChatMessage)):
             return msg  # MessageConverter._validate_and_clean_dict(msg)
 
         # Handle OpenAI pydantic models (openai>=1.0.0)
@@ -183,20 +185,15 @@ class MessageConverter:
         if not hasattr(function, "name") or not hasattr(function, "arguments"):
             raise ValueError("Tool call function must have 'name' and 'arguments'")
 
-        try:
-            # Try to parse arguments as JSON if it's a string
-            args = function.arguments
-            if isinstance(args, str):
-                args = json.loads(args)
-        except (json.JSONDecodeError, AttributeError):
-            args = args  # Leave as-is if not parsable
-
+        # Argument text is passed through as streamed: parsing and re-dumping it
+        # cost a full decode/encode per call and changed the text sent back
+        args = function.arguments
         return {
             "id": tc.id,
             "type": getattr(tc, "type", "function"),
             "function": {
                 "name": function.name,
-                "arguments": json.dumps(args) if isinstance(args, (dict, list)) else args
+                "arguments": json.dumps(args, ensure_ascii=False) if isinstance(args, (dict, list)) else args
             }
         }
 
@@ -46,6 +46,54 @@ class ParametersONE:
     agentEpilog = ""
     
     TEMPERATURE = .7  # 1.0
+
+    HEADLESS = False  # set by --headless → no console rendering, JSON Lines events instead
+
+    # HTTP / streaming
+    FAST_STREAM = False  # True → raw SSE parser (ads/sseStream.py) instead of the OpenAI SDK stream
+    HTTP_TIMEOUT = 600.0  # seconds, long generations stream for minutes
+    HTTP_CONNECT_TIMEOUT = 10.0
+    HTTP_MAX_CONNECTIONS = 20
+    STREAM_MAX_RETRIES = 4  # retries after a broken stream (0 → fail fast)
+    STREAM_RETRY_BASE_DELAY = 1.0  # seconds, doubled per attempt (with jitter)
+    STREAM_RETRY_MAX_DELAY = 30.0
+    MAX_CONTINUATIONS = 3  # follow-up requests when a response stops at max_tokens (finish_reason=length)
+    # Stream watchdog deadlines in seconds (None → disabled)
+    STREAM_FIRST_TOKEN_TIMEOUT = 180.0  # request sent → first chunk
+    STREAM_IDLE_TIMEOUT = 90.0  # max silence between two chunks
+    STREAM_TOTAL_TIMEOUT = 1800.0  # whole response, 64K tokens at slow rates
+    # Degeneration guard: abort streams that loop on the same text
+    REPETITION_GUARD = True
+    REPETITION_NGRAM = 12  # tokens per hashed n-gram
+    REPETITION_MIN_RUN = 300  # consecutive repeated tokens before the stream is aborted
+    REPETITION_WINDOW = 8192  # recent n-gram hashes remembered per channel (bounds memory)
+    # reasoning_content of older assistant turns in resent history
+    REASONING_RETENTION = "digest"  # "keep" | "digest" (short head/tail digest) | "drop"
+    REASONING_KEEP_RECENT = 1  # most recent assistant turns that keep their full reasoning
+    REASONING_DIGEST_CHARS = 400
+    # Large message fields (chapters, reasoning, tool results) are kept in an on-disk blob file
+    MESSAGE_SPILL = True
+    MESSAGE_SPILL_THRESHOLD = 2048  # characters; shorter strings stay in memory
+    BLOB_DIR = BACKUP_DIR / "blobs"
+    TOOL_MAX_WORKERS = 4  # independent tool calls of one turn (different files) run concurrently
+    TOOL_TIMEOUT = 60.0  # seconds per file-tool call (see tools/registry.py)
+    TOOL_RESULT_MAX_CHARS = 8000  # larger tool results are stored out of band (tools/results.py)
+    TOOL_RESULT_PREVIEW_CHARS = 1500  # preview of an out-of-band result kept in history
+    WRITE_FSYNC = "iteration"  # "call" | "iteration" | "shutdown": when chapter writes are fsynced (tools/writeback.py)
+    WRITE_BEHIND_MAX_BYTES = 1 << 20  # queued appends of one file are written early past this size
+    APPEND_HANDLES = 16  # open append handles kept per project folder (LRU)
+    APPEND_DEDUP_MIN_CHARS = 200  # an append at least this long that matches the file's tail is skipped
+    SEARCH_RESULTS = 8  # snippets returned by search_project
+    EXPORT_DIRNAME = "export"  # python -m tools.export writes <project>/export/
+    EXPORT_FORMATS = ["md", "epub", "zip"]
+    EXPORT_EXCLUDE = ["outline*", "notes*", "*.partial.md"]  # kept out of the manuscript (still in the zip)
+    EXPORT_LANGUAGE = "en"
+    EXPORT_WORKERS = 4  # projects exported in parallel
+    REVISION_KEYFRAME_INTERVAL = 8  # every 8th stored revision is a full copy, the rest are deltas
+    REVISION_KEEP = 50  # revisions kept per chapter (0 = no limit)
+    REVISION_MAX_AGE_DAYS = 30  # older revisions are pruned (0 = no limit)
+    TOOL_PLUGINS = []  # modules that register extra tools, e.g. ["my_plugin.tools"]
+    PIPELINE_PLUGINS = []  # modules that register loop hooks (see ads/pipeline.py), e.g. ["my_plugin.profiler"]
     
     """
 Examples:
@@ -3,40 +3,41 @@
 
 from openai.types.chat import ChatCompletionMessageToolCall
 from openai.types.chat.chat_completion_message_tool_call import Function
+import asyncio
+import functools
 import json
 import logging
-from typing import Any, List, Dict
+import time
+from typing import Any, List, Dict, Optional, Tuple
 from pathlib import Path
-from tools.compression import compress_context_impl
+from tools.repair import ParsedArguments, parse_tool_arguments
+from tools.results import store_tool_result
+from tools.writeback import write_behind
+from tools.writer import save_partial_chapter_impl
 from ParametersONE import ParametersONE
+from ads.chatMessage import ChatMessage
+from ads.eventLog import events
+from ads.metrics import metrics
+from ads.pipeline import pipeline
+from ads.toolExecutor import ToolExecutor, tool_executor
 
 logger = logging.getLogger(__name__)
 
 class ReconstructedMessage:
+
+    # Appended to the result of a call that ran on repaired arguments
+    REPAIRED_NOTE = ("[arguments repaired] The arguments of this call were truncated or malformed JSON "
+                     "and were repaired before running it; check that the end of the text is complete.")
+
     def __init__(self, role, content_text, reasoning_content, tool_calls_data):
         self.role = role
         self.content = content_text if content_text is not None else None
         self.reasoning_content = reasoning_content if reasoning_content is not None else None
-        self.tool_calls = None
-
-        if tool_calls_data:
-            # Convert to proper format (mimicking OpenAI's ChatCompletionMessageToolCall)
-            # Note: This uses dynamic class creation for simplicity; in production, use dataclasses or namedtuples
-            self.tool_calls = []
-            for tc in tool_calls_data:
-                if tc.get("id"):  # Only add if we have an ID
-                    function_obj = type('Function', (), {
-                        'name': tc["function"]["name"],
-                        'arguments': tc["function"]["arguments"]
-                    })()
-
-                    tool_call_obj = type('ToolCall', (), {
-                        'id': tc["id"],
-                        'type': 'function',
-                        'function': function_obj
-                    })()
+        # Only calls that got an ID can be answered with a tool message
+        self.tool_calls = [tc for tc in tool_calls_data if tc.id] if tool_calls_data else None
 
-                    self.tool_calls.append(tool_call_obj)
+        # The history entry for this response (freezes the tool calls)
+        self.message = ChatMessage.assistant(self.content, self.reasoning_content, self.tool_calls)
 
 
 
@@ -130,6 +131,7 @@ class ReconstructedMessage:
             print(f"   Model: {ParametersONE.MODEL}")
             print(f"   Final context length: {len(agent.messages)} messages")
             print("=" * 70)
+            events.emit("task_completed", iteration=iteration, messages=len(agent.messages))
             return True  # Done!
 
 
@@ -137,71 +139,264 @@ class ReconstructedMessage:
         # tool_calls = self.tool_calls
         print(f"\nModel requested {len(self.tool_calls)} tool call{'s' if len(self.tool_calls) > 1 else ''}")
 
+        calls = []
         for idx, tool_call in enumerate(self.tool_calls, start=1):
-            func_name = tool_call.function.name
-            raw_args = tool_call.function.arguments or "{}"
+            func_name = tool_call.name
 
             print(f"\n  [{idx}/{len(self.tool_calls)}] Executing → {func_name}")
 
-            # Parse arguments safely
-            try:
-                args = json.loads(raw_args)
-                args_display = json.dumps(args, ensure_ascii=False, indent=2)
-            except json.JSONDecodeError as e:
-                args = {}
-                args_display = f"<JSON parse error: {e}>\n{raw_args}"
-
-            print(f"     Arguments:\n{args_display}")
-
-            tool_func = agent.tool_map.get(func_name)
-            if not tool_func:
-                result: Any = "Error: Tool execution failed (unknown error)"
-                print(f"    ✗ {result}")
-
-            try:
-                if func_name == "compress_context":
-                    print("     Performing intelligent context compression...")
-                    compression_result = compress_context_impl(
-                        messages=agent.messages,
-                        client=agent.moonshotclient.client,
-                        model=ParametersONE.MODEL,
-                        keep_recent=10,
-                        # extract_entities=True,
-                        # max_summary_tokens=2000
-                    )
-
-                    if compression_result.get("compressed_messages"):
-                        _old_len = len(agent.messages)
-                        agent.messages = compression_result["compressed_messages"]
-                        saved = _old_len - len(agent.messages)
-                        ratio = compression_result.get("compression_ratio", 1.0)
-                        print(f"     Context compressed: {_old_len} → {len(agent.messages)} messages "
-                              f"(-{saved}, ~{ratio:.2f}x)")
-
-                    result = compression_result.get("message", "Compression completed")  # "Context compressed")
-
-                elif tool_func:
-                    result = tool_func(**args)
-                    result_str = str(result)
-                    if len(result_str) > 400:
-                        result_str = result_str[:400] + "\n    ..."
-                    print(f"     Success: {result_str}")
-                else:
-                    result = f"Error: Unknown tool '{func_name}'"
-                    print(f"     Failed: Tool not found in agent.tool_map")
-
-            except Exception as e:
-                result = f"Tool crashed: {type(e).__name__}: {e}"
-                print(f"     Failed: {result}")
-                # logger.error(f"Tool '{func_name}' failed at iteration {iteration}", exc_info=True)
+            # Parse arguments safely (truncated / malformed JSON is repaired)
+            parsed, rejected = self._parse_arguments(agent, iteration, tool_call)
+
+            if not ParametersONE.HEADLESS:
+                if parsed.repaired:
+                    print(f"     <JSON parse error: {parsed.error}> - repaired")
+                print(f"     Arguments:\n{self._preview_arguments(parsed.args)}")
+
+            calls.append((tool_call, parsed, rejected))
+
+        # Independent calls (different files) run concurrently; results keep the call order
+        batch_start = time.monotonic()
+        outcomes = tool_executor.run(
+            [functools.partial(self._execute_tool, agent, iteration, *call) for call in calls],
+            [self._conflict_keys(agent, *call) for call in calls],
+        )
+        self._record_batch(iteration, calls, outcomes, batch_start)
+        outcomes = self._with_write_failures(outcomes)
+
+        for idx, ((tool_call, parsed, rejected), (result_text, duration)) in enumerate(zip(calls, outcomes), start=1):
+            func_name = tool_call.name
+            if result_text.startswith(("Error", "Tool crashed")):
+                print(f"\n  [{idx}] {func_name} ({duration:.2f}s) Failed: {result_text}")
+            else:
+                shown = result_text if len(result_text) <= 400 else result_text[:400] + "\n    ..."
+                print(f"\n  [{idx}] {func_name} ({duration:.2f}s) Success: {shown}")
+
+            if parsed.repaired and rejected is None:
+                result_text += "\n" + self.REPAIRED_NOTE
 
             # Append tool response (required by the API spec)
-            agent.messages.append({
-                "role": "tool",
-                "tool_call_id": tool_call.id,
-                "name": func_name,
-                "content": str(result)
-            })
+            agent.messages.append(ChatMessage.tool(tool_call.id, func_name,
+                                                   self._history_content(agent, tool_call, result_text)))
 
         print()  # Clean line break
         return False  # Continue loop
+
+    async def handle_tool_calls_async(self, agent, iteration: int, render: bool = True) -> bool:
+        """
+        asyncio variant of handle_tool_calls used by agentAsync.py.
+
+        File writes and compression run off the event loop so other sessions keep
+        streaming; tool messages are appended in the original order.
+
+        Returns:
+            bool: True if task is completed (no tool calls), False if we should continue
+        """
+        if not self.tool_calls:
+            print(f"✅ TASK COMPLETED in {iteration} iteration{'s' if iteration != 1 else ''} "
+                  f"({len(agent.messages)} messages)")
+            events.emit("task_completed", iteration=iteration, messages=len(agent.messages))
+            return True
+
+        calls = [(tool_call, *self._parse_arguments(agent, iteration, tool_call)) for tool_call in self.tool_calls]
+        keys = [self._conflict_keys(agent, *call) for call in calls]
+
+        batch_start = time.monotonic()
+        outcomes: List[Tuple[str, float]] = [("", 0.0)] * len(calls)
+        for wave in tool_executor.waves(keys):
+            if len(wave) == 1:
+                # Awaited directly, not as a task: create_project must set this session's project
+                results = [await self._execute_tool_async(agent, iteration, *calls[wave[0]])]
+            else:
+                # Calls of one wave touch different files → write them concurrently
+                results = await asyncio.gather(*(self._execute_tool_async(agent, iteration, *calls[idx])
+                                                 for idx in wave))
+            for idx, outcome in zip(wave, results):
+                outcomes[idx] = outcome
+        self._record_batch(iteration, calls, outcomes, batch_start)
+        outcomes = self._with_write_failures(outcomes)
+
+        for (tool_call, parsed, rejected), (result_text, duration) in zip(calls, outcomes):
+            if parsed.repaired and rejected is None:
+                result_text += "\n" + self.REPAIRED_NOTE
+            if render:
+                print(f"  → {tool_call.name} ({duration:.2f}s): {result_text[:200]}")
+
+            agent.messages.append(ChatMessage.tool(tool_call.id, tool_call.name,
+                                                   self._history_content(agent, tool_call, result_text)))
+
+        return False
+
+    @staticmethod
+    def _with_write_failures(outcomes: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        """Add queued-text flush errors (this batch's or the last iteration's) to the first result."""
+        notice = write_behind.take_failures()
+        if notice and outcomes:
+            result_text, duration = outcomes[0]
+            outcomes = [(f"{result_text}\n{notice}", duration)] + list(outcomes[1:])
+        return outcomes
+
+    @staticmethod
+    def _conflict_keys(agent, tool_call, parsed: ParsedArguments, rejected: Optional[str]):
+        """Conflict keys of a prepared call; rejected and unknown calls touch nothing."""
+        spec = agent.toolmap.get(tool_call.name)
+        if rejected is not None or spec is None:
+            return frozenset()
+        return ToolExecutor.conflict_keys(spec, parsed.args)
+
+    def _execute_tool(self, agent, iteration: int, tool_call, parsed: ParsedArguments,
+                      rejected: Optional[str]) -> Tuple[str, float]:
+        """
+        Run one prepared tool call (possibly on a pool thread).
+
+        Returns:
+            (result_text, duration in seconds)
+        """
+        func_name = tool_call.name
+        tool_start = time.monotonic()
+        events.emit("tool_start", iteration=iteration, tool=func_name, call_id=tool_call.id,
+                    args_chars=len(tool_call.arguments or ""))
+
+        spec = agent.toolmap.get(func_name)
+        try:
+            if rejected is not None:
+                result: Any = rejected
+            elif (result := pipeline.run("pre_tool", agent, iteration, tool_call, parsed.args)) is not None:
+                pass  # answered by middleware (cache / policy)
+            elif spec is not None:
+                result = spec.invoke(agent, parsed.args)
+            else:
+                result = f"Error: Unknown tool '{func_name}'"
+        except Exception as e:
+            result = f"Tool crashed: {type(e).__name__}: {e}"
+            # logger.error(f"Tool '{func_name}' failed at iteration {iteration}", exc_info=True)
+
+        return self._finish_tool(agent, iteration, tool_call, result, tool_start)
+
+    async def _execute_tool_async(self, agent, iteration: int, tool_call, parsed: ParsedArguments,
+                                  rejected: Optional[str]) -> Tuple[str, float]:
+        """asyncio counterpart of _execute_tool: blocking tools run off the event loop."""
+        func_name = tool_call.name
+        tool_start = time.monotonic()
+        events.emit("tool_start", iteration=iteration, tool=func_name, call_id=tool_call.id,
+                    args_chars=len(tool_call.arguments or ""))
+
+        spec = agent.toolmap.get(func_name)
+        try:
+            if rejected is not None:
+                result: Any = rejected
+            elif (result := pipeline.run("pre_tool", agent, iteration, tool_call, parsed.args)) is not None:
+                pass  # answered by middleware (cache / policy)
+            elif spec is not None:
+                # Async handler, worker thread, or inline for cheap stateful tools (see ToolSpec.invoke_async)
+                result = await spec.invoke_async(agent, parsed.args)
+            else:
+                result = f"Error: Unknown tool '{func_name}'"
+        except Exception as e:
+            result = f"Tool crashed: {type(e).__name__}: {e}"
+
+        return self._finish_tool(agent, iteration, tool_call, result, tool_start)
+
+    @staticmethod
+    def _history_content(agent, tool_call, result_text: str) -> str:
+        """Tool message content: large results are stored out of band and referenced."""
+        spec = agent.toolmap.get(tool_call.name)
+        if spec is None or not spec.offload:
+            return result_text
+        return store_tool_result(tool_call.id, tool_call.name, result_text)
+
+    @staticmethod
+    def _finish_tool(agent, iteration: int, tool_call, result: Any, tool_start: float) -> Tuple[str, float]:
+        """Record the timing of a finished call, run the post_tool hooks and return (result_text, duration)."""
+        result_text = str(result)
+        duration = time.monotonic() - tool_start
+        metrics.observe(f"tool.{tool_call.name}", duration)
+        events.emit("tool_end", iteration=iteration, tool=tool_call.name, call_id=tool_call.id,
+                    duration_s=round(duration, 3), result_chars=len(result_text),
+                    ok=not result_text.startswith(("Error", "Tool crashed")))
+        pipeline.run("post_tool", agent, iteration, tool_call, result_text, duration)
+        return result_text, duration
+
+    @staticmethod
+    def _record_batch(iteration: int, calls: list, outcomes: list, batch_start: float) -> None:
+        """Summarize a turn's tool calls: wall time vs. the sum of the per-call times."""
+        if len(calls) < 2:
+            return
+        wall = time.monotonic() - batch_start
+        busy = sum(duration for _, duration in outcomes)
+        metrics.observe("tool.batch", wall)
+        events.emit("tool_batch", iteration=iteration, calls=len(calls), wall_s=round(wall, 3),
+                    sum_s=round(busy, 3))
+
+    @staticmethod
+    def _parse_arguments(agent, iteration: int, tool_call) -> Tuple[ParsedArguments, Optional[str]]:
+        """
+        Parse a tool call's arguments, repairing truncated or malformed JSON.
+
+        A repaired call that satisfies the tool schema is executed (the caller
+        marks its result with REPAIRED_NOTE), except a write_chapter 'create' or
+        'overwrite': its content may be cut off, and it would become the whole
+        chapter. Such calls and calls that fail the schema are rejected; for
+        write_chapter the recovered content is saved to disk first (to
+        ``<name>.partial.md`` if it would replace an existing file), so the
+        model can append the rest instead of writing the chapter again.
+
+        Returns:
+            (parsed, None) if the call can run, or (parsed, result) with the
+            tool result to send back instead
+        """
+        func_name = tool_call.name
+        # tool_call.decoded is shared with continuation/salvage: the text is decoded only once
+        parsed = parse_tool_arguments(str(tool_call.arguments),
+                                      agent.toolmap.get_parameters_schema(func_name),
+                                      decoded=tool_call.decoded)
+        if parsed.ok and not parsed.repaired:
+            return parsed, None
+
+        rejected = None
+        outcome = "executed"
+        mode = parsed.args.get("mode")
+        # A repaired whole-chapter write would replace the chapter with a possibly cut-off text
+        replaces = parsed.ok and func_name == "write_chapter" and mode != "append"
+        if not parsed.ok or replaces:
+            outcome = "rejected"
+            if replaces:
+                rejected = (f"Error: The arguments of '{func_name}' were truncated or malformed JSON, so the "
+                            f"'{mode}' was not run: its text may be cut off.")
+            else:
+                rejected = f"Error: Invalid arguments for '{func_name}': {'; '.join(parsed.problems)}."
+                if parsed.repaired:
+                    rejected += " The arguments were truncated or malformed JSON."
+
+            filename, content = parsed.args.get("filename"), parsed.args.get("content")
+            if func_name == "write_chapter" and isinstance(filename, str) and isinstance(content, str) and content:
+                # New files get the text in place (the model appends the rest); existing ones stay intact
+                note = save_partial_chapter_impl(filename, content, mode)
+                if not note.startswith("Error"):
+                    outcome = "saved_partial"
+                    rejected += f" {note}"
+
+        metrics.incr(f"tools.args_repair.{outcome}")
+        events.emit("tool_args_repaired", iteration=iteration, tool=func_name, call_id=tool_call.id,
+                    outcome=outcome, error=parsed.error, problems=parsed.problems)
+        logger.warning("Arguments of %s (%s): %s", func_name, outcome, parsed.error or "; ".join(parsed.problems))
+        return parsed, rejected
+
+    @staticmethod
+    def _preview_arguments(args: Dict[str, Any], limit: int = 200) -> str:
+        """
+        Short, one line per parameter view of parsed arguments for the console.
+
+        Long strings (chapter bodies) are cut instead of re-serializing the
+        whole argument object with ``json.dumps(indent=2)``.
+        """
+        lines = []
+        for key, value in args.items():
+            if isinstance(value, str) and len(value) > limit:
+                shown = f"{value[:limit]!r}… ({len(value):,} chars)"
+            else:
+                shown = repr(value)
+                if len(shown) > limit:
+                    shown = shown[:limit] + "…"
+            lines.append(f"       {key}: {shown}")
+        return "\n".join(lines) or "       (none)"
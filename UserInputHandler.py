@@ -30,6 +30,8 @@ class UserInputHandler:
 
     def __init__(self):
         self.parser = self._setup_parser()
+        self.headless: bool = False
+        self.events_file: str | None = None
 
     def _setup_parser(self) -> argparse.ArgumentParser:
 
@@ -43,6 +45,9 @@ class UserInputHandler:
         
           # Recovery mode from previous context
           python kimi-writer.py --recover my_project/.context_summary_20250107_143022.md
+
+          # Unattended production run: JSON Lines events instead of console output
+          python agent.py --headless --events-file run.jsonl "Create a mystery novel"
                     """
         )
 
@@ -58,6 +63,17 @@ class UserInputHandler:
             default=None,
             help='Path to a context summary file to continue from'
         )
+        parser.add_argument(
+            '--headless',
+            action='store_true',
+            help='No console rendering; emit structured JSON Lines events instead'
+        )
+        parser.add_argument(
+            '--events-file',
+            type=str,
+            default=None,
+            help='Write headless events to this file instead of standard output'
+        )
 
         return parser
 
@@ -112,11 +128,17 @@ class UserInputHandler:
             Tuple of (prompt/context, is_recovery_mode)
         """
         args = self.parser.parse_args()
+        self.headless = args.headless
+        self.events_file = args.events_file
 
         # Validate arguments: cannot provide both prompt and --recover
         if args.prompt is not None and args.recover is not None:
             self.parser.error("Error: Cannot provide both a prompt and --recover. Use one or the other.")
 
+        # Nobody is there to answer an interactive prompt
+        if args.headless and args.prompt is None and args.recover is None:
+            self.parser.error("Error: --headless needs a prompt argument or --recover.")
+
         # Check if recovery mode
         if args.recover:
             return self._handle_recovery(args.recover)
@@ -2,20 +2,21 @@
 import os
 import sys
 
-from openai import OpenAI
+import httpx
+from openai import OpenAI, AsyncOpenAI
 # from ParametersONE import API_KEY, BASE_URL  # , MODEL
 from ParametersONE import ParametersONE
 
 class MoonshotClient:
+    # Async connection pool shared by every session in the process (created lazily)
+    _shared_async_http_client = None
+
     def __init__(self):
         _a_KEY = os.getenv("MOONSHOT_API_KEY")
         if not _a_KEY:
             print("Error: MOONSHOT_API_KEY environment variable not set.")
             print("Please set your API key: export MOONSHOT_API_KEY='your-key-here'")
             sys.exit(1)
-        print("\nMoonshotClient execution finished!")
-        print(_a_KEY)
-
         self.api_key = _a_KEY
         if len(_a_KEY) > 8:
             print(f"✓ API Key loaded: {_a_KEY[:4]}...{_a_KEY[-4:]}")
@@ -30,8 +31,41 @@ class MoonshotClient:
         print(f"✓ Base URL: {_b_URL}\n")
 
         self.base_url = _b_URL
-        self.client = OpenAI(api_key=_a_KEY, base_url=_b_URL)
+        # One connection pool shared by the SDK client and the raw SSE fast path
+        self.http_client = httpx.Client(
+            timeout=httpx.Timeout(ParametersONE.HTTP_TIMEOUT, connect=ParametersONE.HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=ParametersONE.HTTP_MAX_CONNECTIONS,
+                                max_keepalive_connections=ParametersONE.HTTP_MAX_CONNECTIONS),
+        )
+        self.client = OpenAI(api_key=_a_KEY, base_url=_b_URL, http_client=self.http_client)
         self.model = ParametersONE.MODEL
+        self._async_client = None
+
+    @classmethod
+    def shared_async_http_client(cls) -> httpx.AsyncClient:
+        """Process-wide ``httpx.AsyncClient`` so concurrent sessions reuse connections."""
+        if cls._shared_async_http_client is None:
+            cls._shared_async_http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(ParametersONE.HTTP_TIMEOUT, connect=ParametersONE.HTTP_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=ParametersONE.HTTP_MAX_CONNECTIONS,
+                                    max_keepalive_connections=ParametersONE.HTTP_MAX_CONNECTIONS),
+            )
+        return cls._shared_async_http_client
+
+    @classmethod
+    async def aclose_shared(cls) -> None:
+        """Close the shared async pool (call once, when the event loop is done)."""
+        if cls._shared_async_http_client is not None:
+            await cls._shared_async_http_client.aclose()
+            cls._shared_async_http_client = None
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """``AsyncOpenAI`` client on the shared async pool (created on first use)."""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url,
+                                             http_client=MoonshotClient.shared_async_http_client())
+        return self._async_client
 
 
 
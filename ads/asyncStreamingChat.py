@@ -0,0 +1,147 @@
+# asyncStreamingChat.py
+import asyncio
+from typing import TYPE_CHECKING
+
+from ParametersONE import ParametersONE
+from ads.messageStore import MessageStore
+from ads.streamAccumulator import StreamAccumulator
+from ads.streamingChat import StreamingChat
+from ads.retryPolicy import RetryPolicy, StreamInterrupted
+from ads.repetitionGuard import RepetitionDetected
+from ads.streamSalvage import StreamSalvage
+from ads.streamWatchdog import StreamWatchdog
+from ads.metrics import metrics
+from ads.continuation import Continuation
+from ads.eventLog import events
+from ads.pipeline import pipeline
+
+if TYPE_CHECKING:
+    from agentONE import AgentONE
+
+
+class AsyncStreamingChat:
+    """
+    asyncio counterpart of StreamingChat, built on ``AsyncOpenAI``.
+
+    Network waits yield to the event loop, so many sessions can stream at the
+    same time from one process over the shared async connection pool.
+    """
+
+    @staticmethod
+    async def kimi_k2_streaming_chat(
+            agent: "AgentONE",
+            iteration: int,
+            render: bool = True,
+            messages: list = None,
+    ) -> tuple[str, str, str, list | None, str | None]:
+        """
+        Stream one model response.
+
+        Args:
+            agent: The session to stream for
+            iteration: Current iteration (for the console headers)
+            render: Print the live stream; turn off when several sessions share one console
+            messages: Request messages (defaults to the agent's history)
+
+        Returns:
+            Tuple of (role, final_content, reasoning_content, tool_calls, finish_reason)
+        """
+        if render:
+            print(f"\n🤖 调用 Kimi K2 模型... (第 {iteration} 次思考)\n")
+
+        accumulator = StreamAccumulator(iteration, render=render)
+        watchdog = StreamWatchdog()
+        try:
+            stream = await agent.moonshotclient.async_client.chat.completions.create(
+                model=ParametersONE.MODEL,
+                messages=MessageStore.hydrate(agent.messages if messages is None else messages),
+                max_tokens=ParametersONE.MAX_TOKENS,  # 64K tokens
+                tools=agent.tools,
+                temperature=ParametersONE.TEMPERATURE,
+                stream=True,
+                tool_choice="auto",
+            )
+            try:
+                chunks = stream.__aiter__()
+                while True:
+                    try:
+                        # Every read is bounded by the nearest watchdog deadline
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=watchdog.remaining())
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        stall = watchdog.check()
+                        if stall is not None:
+                            raise stall
+                        continue
+                    watchdog.beat()
+                    StreamingChat.feed_chunk(chunk, accumulator)
+            finally:
+                # Also runs on task cancellation → the connection goes back to the pool
+                await stream.close()
+        except Exception as e:
+            # Hand the partial response to the retry / salvage layer
+            raise StreamInterrupted(e, accumulator) from e
+        finally:
+            watchdog.stop()
+
+        return accumulator.result()
+
+    @staticmethod
+    async def stream_with_retry(agent: "AgentONE", iteration: int, render: bool = True,
+                                policy: RetryPolicy = None, messages: list = None) -> tuple[str, str, str, list | None, str | None]:
+        """asyncio counterpart of StreamingChat.stream_with_retry (backoff sleeps yield to the loop)."""
+        policy = policy or RetryPolicy()
+        attempt = 0
+        while True:
+            pipeline.run("pre_request", agent, iteration, messages)
+            try:
+                return await AsyncStreamingChat.kimi_k2_streaming_chat(agent, iteration, render=render,
+                                                                       messages=messages)
+            except StreamInterrupted as interrupted:
+                attempt += 1
+                metrics.incr("stream.interruptions")
+                if messages is not None and isinstance(interrupted.cause, RepetitionDetected):
+                    # A continuation that loops → keep its trimmed text and stop continuing
+                    return interrupted.accumulator.result()
+                # Explicit request messages (continuations) are not part of history → nothing to salvage into
+                salvaged = None if messages is not None else \
+                    StreamSalvage.salvage(agent, interrupted.accumulator, interrupted.cause)
+                if salvaged is not None:
+                    return salvaged
+
+                if policy.classify(interrupted) == RetryPolicy.FATAL or attempt > policy.max_retries:
+                    events.emit("stream_failed", iteration=iteration, attempt=attempt, error=str(interrupted))
+                    raise interrupted.cause
+
+                delay = policy.delay(attempt, interrupted)
+                print(f"\n⏳ Stream failed ({interrupted}) - retry {attempt}/{policy.max_retries} in {delay:.1f}s")
+                metrics.incr("stream.retries")
+                events.emit("stream_retry", iteration=iteration, attempt=attempt, delay_s=round(delay, 3),
+                            error=str(interrupted))
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    async def stream_with_continuation(agent: "AgentONE", iteration: int,
+                                       render: bool = True) -> tuple[str, str, str, list | None, str | None]:
+        """asyncio counterpart of StreamingChat.stream_with_continuation."""
+        role, content, reasoning, tool_calls, finish_reason = \
+            await AsyncStreamingChat.stream_with_retry(agent, iteration, render=render)
+        rounds = 0
+        while finish_reason == "length" and rounds < ParametersONE.MAX_CONTINUATIONS:
+            target = Continuation.target(content, tool_calls)
+            if target is None:
+                break  # tool calls are complete → run them as they are
+            rounds += 1
+            Continuation.announce(rounds, target, tool_calls)
+            metrics.incr("stream.continuations")
+            events.emit("stream_continuation", iteration=iteration, round=rounds, target=target[0])
+
+            request = Continuation.request_messages(agent.messages, Continuation.prefix(content, tool_calls, target))
+            _, more, _, _, finish_reason = \
+                await AsyncStreamingChat.stream_with_retry(agent, iteration, render=render, messages=request)
+            if not more:
+                break  # the model did not continue the text → keep what we have
+            content = Continuation.stitch(content, tool_calls, target, more)
+
+        return role, content, reasoning, tool_calls, finish_reason
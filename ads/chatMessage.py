@@ -0,0 +1,225 @@
+# chatMessage.py
+"""
+Canonical message model: one representation from the stream to the history.
+
+A response used to be accumulated into dicts, turned into dynamically created
+``type('ToolCall', ...)`` classes, then back into dicts by MessageConverter
+(which re-parsed and re-dumped every tool argument). ToolCall and ChatMessage
+replace all of that:
+
+- ToolCall is filled in place by the StreamAccumulator and frozen once the
+  response becomes a ChatMessage.
+- ChatMessage is immutable from construction; ``replace()`` returns a
+  modified copy. Its API dict is built once and cached.
+
+Both use ``__slots__``, so the per-message footprint is a handful of pointers.
+
+Tool arguments are decoded once (``ToolCall.decoded``, via ads.fastJson) and
+the result is shared by continuation, salvage, argument repair and execution;
+the raw text is what goes back to the API.
+"""
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+class ToolCall:
+    """One function call requested by the model."""
+
+    __slots__ = ("id", "name", "arguments", "_frozen", "_decoded")
+
+    def __init__(self, id: Optional[str] = None, name: str = "", arguments: Any = ""):
+        object.__setattr__(self, "_frozen", False)
+        self.id = id
+        self.name = name
+        self.arguments = arguments  # raw JSON text as streamed (or a BlobRef once spilled)
+
+    def __setattr__(self, key, value):
+        if self._frozen:
+            raise AttributeError(f"ToolCall is frozen, cannot set '{key}'")
+        object.__setattr__(self, key, value)
+        if key == "arguments":
+            object.__setattr__(self, "_decoded", None)  # text changed (stream / continuation)
+
+    @property
+    def decoded(self) -> Tuple[Any, Optional[str]]:
+        """
+        Strict JSON decode of the arguments, computed once per argument text.
+
+        Returns:
+            (value, None) if the arguments are valid JSON (empty means ``{}``),
+            else (None, decode error message)
+        """
+        if self._decoded is None:
+            from tools.repair import decode_arguments  # tools → ads.messageStore → here
+            object.__setattr__(self, "_decoded", decode_arguments(str(self.arguments)))
+        return self._decoded
+
+    @property
+    def complete(self) -> bool:
+        """Whether the arguments are valid JSON (the call was streamed in full)."""
+        return self.decoded[1] is None
+
+    def freeze(self) -> "ToolCall":
+        object.__setattr__(self, "_frozen", True)
+        return self
+
+    @property
+    def function(self) -> "ToolCall":
+        """``tool_call.function.name`` / ``.arguments``, as on OpenAI SDK objects."""
+        return self
+
+    @property
+    def type(self) -> str:
+        return "function"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "type": "function",
+                "function": {"name": self.name, "arguments": str(self.arguments)}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ToolCall":
+        function = data.get("function") or {}
+        return cls(data.get("id"), function.get("name") or "", function.get("arguments") or "")
+
+    def __repr__(self) -> str:
+        return f"ToolCall(id={self.id!r}, name={self.name!r}, arguments={len(self.arguments):,} chars)"
+
+
+class ChatMessage:
+    """
+    One message of the conversation, immutable.
+
+    ``to_dict()`` returns the API form (cached unless a field is spilled to the
+    blob store, see ads/messageStore.py). Read-only mapping access (``get``,
+    ``msg["role"]``, ``in``) works like on the plain dicts used before.
+    """
+
+    __slots__ = ("role", "content", "reasoning_content", "tool_calls", "tool_call_id", "name", "partial",
+                 "_dict")
+
+    _FIELDS = ("role", "content", "reasoning_content", "tool_calls", "tool_call_id", "name", "partial")
+
+    def __init__(self, role: str, content: Any = None, reasoning_content: Any = None,
+                 tool_calls: Optional[Iterable[ToolCall]] = None, tool_call_id: Optional[str] = None,
+                 name: Optional[str] = None, partial: bool = False):
+        setattr_ = object.__setattr__
+        setattr_(self, "role", role)
+        setattr_(self, "content", content)
+        setattr_(self, "reasoning_content", reasoning_content or None)
+        setattr_(self, "tool_calls", tuple(tc.freeze() for tc in tool_calls) if tool_calls else ())
+        setattr_(self, "tool_call_id", tool_call_id)
+        setattr_(self, "name", name)
+        setattr_(self, "partial", partial)
+        setattr_(self, "_dict", None)
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"ChatMessage is immutable, use replace() to change '{key}'")
+
+    # ------------------------------------------------------------------ #
+    # Construction
+    # ------------------------------------------------------------------ #
+
+    @classmethod
+    def system(cls, content: str) -> "ChatMessage":
+        return cls("system", content)
+
+    @classmethod
+    def user(cls, content: str) -> "ChatMessage":
+        return cls("user", content)
+
+    @classmethod
+    def assistant(cls, content: Optional[str] = None, reasoning_content: Optional[str] = None,
+                  tool_calls: Optional[Iterable[ToolCall]] = None, partial: bool = False) -> "ChatMessage":
+        return cls("assistant", content or None, reasoning_content, tool_calls, partial=partial)
+
+    @classmethod
+    def tool(cls, tool_call_id: str, name: str, content: str) -> "ChatMessage":
+        return cls("tool", content, tool_call_id=tool_call_id, name=name)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ChatMessage":
+        tool_calls = data.get("tool_calls")
+        return cls(
+            data.get("role", "assistant"),
+            data.get("content"),
+            data.get("reasoning_content"),
+            [tc if isinstance(tc, ToolCall) else ToolCall.from_dict(tc) for tc in tool_calls] if tool_calls else None,
+            data.get("tool_call_id"),
+            data.get("name"),
+            bool(data.get("partial")),
+        )
+
+    @classmethod
+    def coerce(cls, msg: Any) -> "ChatMessage":
+        """ChatMessage from a ChatMessage (as is) or an API-style dict."""
+        if isinstance(msg, ChatMessage):
+            return msg
+        if isinstance(msg, dict):
+            return cls.from_dict(msg)
+        raise TypeError(f"Cannot convert {type(msg).__name__} to ChatMessage")
+
+    def replace(self, **changes) -> "ChatMessage":
+        """Copy with some fields changed."""
+        fields = {name: getattr(self, name) for name in self._FIELDS}
+        fields.update(changes)
+        return ChatMessage(**fields)
+
+    # ------------------------------------------------------------------ #
+    # Serialization
+    # ------------------------------------------------------------------ #
+
+    def _spilled(self) -> bool:
+        return (not isinstance(self.content, (str, type(None), list))
+                or not isinstance(self.reasoning_content, (str, type(None)))
+                or any(not isinstance(tc.arguments, str) for tc in self.tool_calls))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        API form of the message.
+
+        Cached after the first call. Spilled fields (BlobRefs) are read back on
+        every call instead, so the text is never pinned in memory.
+        """
+        if self._dict is not None:
+            return self._dict
+
+        msg: Dict[str, Any] = {"role": self.role}
+        content = self.content
+        if content is not None or self.role == "assistant":
+            msg["content"] = content if isinstance(content, (str, list, type(None))) else str(content)
+        if self.reasoning_content:
+            msg["reasoning_content"] = str(self.reasoning_content)
+        if self.tool_calls:
+            msg["tool_calls"] = [tc.to_dict() for tc in self.tool_calls]
+        if self.tool_call_id:
+            msg["tool_call_id"] = self.tool_call_id
+        if self.name:
+            msg["name"] = self.name
+        if self.partial:
+            msg["partial"] = True
+
+        if not self._spilled():
+            object.__setattr__(self, "_dict", msg)
+        return msg
+
+    # ------------------------------------------------------------------ #
+    # Read-only mapping access
+    # ------------------------------------------------------------------ #
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in self._FIELDS:
+            return default
+        value = getattr(self, key)
+        return default if value is None or value == () or value is False else value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __repr__(self) -> str:
+        size = len(self.content) if self.content is not None else 0
+        return f"ChatMessage(role={self.role!r}, content={size:,} chars, tool_calls={len(self.tool_calls)})"
@@ -0,0 +1,73 @@
+# continuation.py
+"""
+Continuation of responses cut off by ``max_tokens`` (finish_reason == "length").
+"""
+from typing import Optional, Tuple
+
+from ParametersONE import ParametersONE
+from ads.chatMessage import ChatMessage
+
+
+class Continuation:
+    """
+    Stitches a response that stopped at ``max_tokens`` back together.
+
+    The truncated text (the unfinished tool-call arguments, or else the visible
+    content) is sent back as a prefilled assistant message in Moonshot's
+    partial mode (``"partial": True``), so the model carries on exactly where it
+    stopped. The continuation text is appended to the truncated piece and the
+    loop repeats while the finish reason is still ``length``. Only the stitched
+    response enters history, and tools run on complete arguments.
+    """
+
+    TOOL_ARGUMENTS = "tool_arguments"
+    CONTENT = "content"
+
+    @staticmethod
+    def target(content: str, tool_calls: list) -> Optional[Tuple[str, int]]:
+        """
+        Locate the truncated part of a response.
+
+        Returns:
+            (TOOL_ARGUMENTS, index) for a tool call whose arguments are not valid
+            JSON yet, (CONTENT, -1) for plain text, or None if tool calls are
+            complete (nothing to continue, they can run as they are)
+        """
+        for idx in range(len(tool_calls or []) - 1, -1, -1):
+            if not tool_calls[idx].complete:
+                return Continuation.TOOL_ARGUMENTS, idx
+        if tool_calls:
+            return None
+        return Continuation.CONTENT, -1
+
+    @staticmethod
+    def request_messages(history: list, prefix: str) -> list:
+        """History plus the partial-mode assistant prefill (history itself is not modified)."""
+        return history + [ChatMessage.assistant(prefix, partial=True)]
+
+    @staticmethod
+    def prefix(content: str, tool_calls: list, target: Tuple[str, int]) -> str:
+        kind, idx = target
+        return tool_calls[idx].arguments if kind == Continuation.TOOL_ARGUMENTS else content
+
+    @staticmethod
+    def stitch(content: str, tool_calls: list, target: Tuple[str, int], continuation: str) -> str:
+        """
+        Append continuation text to the truncated piece.
+
+        Tool-call arguments are extended in place; the (possibly extended)
+        content is returned.
+        """
+        kind, idx = target
+        if kind == Continuation.TOOL_ARGUMENTS:
+            tool_calls[idx].arguments += continuation
+            return content
+        return content + continuation
+
+    @staticmethod
+    def announce(round_no: int, target: Tuple[str, int], tool_calls: list) -> None:
+        kind, idx = target
+        what = (f"arguments of {tool_calls[idx].name}" if kind == Continuation.TOOL_ARGUMENTS
+                else "response text")
+        print(f"\n✂️  Response hit max_tokens - continuing {what} "
+              f"({round_no}/{ParametersONE.MAX_CONTINUATIONS})")
@@ -0,0 +1,110 @@
+# eventLog.py
+"""
+Structured JSON Lines event stream for unattended (--headless) runs.
+
+Events are handed to a ``logging.handlers.QueueHandler``; formatting and the
+actual write happen on the QueueListener thread, so emitting never blocks the
+agent loop on I/O. When the event log is disabled ``emit`` returns at once.
+
+One event per line:
+
+    {"ts": 1731000000.123, "event": "tool_end", "iteration": 3, "tool": "write_chapter", ...}
+"""
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from typing import Optional
+
+from ParametersONE import ParametersONE
+from ads import fastJson
+
+
+class _JsonLinesFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {"ts": round(record.created, 3), "event": record.getMessage()}
+        payload.update(getattr(record, "fields", {}))
+        return fastJson.dumps(payload)
+
+
+# Fields added to every event of the current context (e.g. the asyncio session)
+_bound_fields: contextvars.ContextVar[dict] = contextvars.ContextVar("event_fields", default={})
+
+
+class EventLog:
+
+    def __init__(self):
+        self.enabled = False
+        self._logger = logging.getLogger("agentONE.events")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self._console = None
+
+    def emit(self, event: str, **fields) -> None:
+        """Queue one event (no-op unless the event log is enabled)."""
+        if not self.enabled:
+            return
+        bound = _bound_fields.get()
+        if bound:
+            fields = {**bound, **fields}
+        self._logger.info(event, extra={"fields": fields})
+
+    def bind(self, **fields) -> None:
+        """Attach fields to every later event emitted from the current context / task."""
+        _bound_fields.set({**_bound_fields.get(), **fields})
+
+    def enable(self, target: Optional[str] = None) -> None:
+        """
+        Start writing events.
+
+        Args:
+            target: File path for the JSON Lines output; None → standard output
+        """
+        if self.enabled:
+            return
+        if target:
+            handler = logging.FileHandler(target, encoding="utf-8")
+        else:
+            handler = logging.StreamHandler(self._console or sys.stdout)
+        handler.setFormatter(_JsonLinesFormatter())
+
+        event_queue = queue.SimpleQueue()
+        self._logger.addHandler(logging.handlers.QueueHandler(event_queue))
+        self._listener = logging.handlers.QueueListener(event_queue, handler)
+        self._listener.start()
+        self.enabled = True
+        atexit.register(self.close)
+
+    def enable_headless(self, target: Optional[str] = None) -> None:
+        """
+        Switch the process to headless mode.
+
+        Console rendering (live tokens, spinner, banners) is silenced and the
+        event stream takes over standard output (or ``target``).
+        """
+        ParametersONE.HEADLESS = True
+        self._console = sys.stdout
+        sys.stdout = open(os.devnull, "w", encoding="utf-8")
+        self.enable(target)
+
+    def close(self) -> None:
+        """Flush queued events and stop the writer thread."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        self.enabled = False
+
+
+# ← Process-wide instance shared by all modules
+events = EventLog()
+
+
+def elapsed_since(start: float) -> float:
+    """Rounded seconds since a ``time.monotonic()`` timestamp, for event fields."""
+    return round(time.monotonic() - start, 3)
@@ -0,0 +1,54 @@
+# fastJson.py
+"""
+Thin JSON backend switch.
+
+Uses orjson when it is installed and falls back to the stdlib json module
+otherwise, so callers never have to care which one is available.
+"""
+import json
+
+try:
+    import orjson
+
+    BACKEND = "orjson"
+
+    def loads(data):
+        """Decode a JSON document from str or bytes."""
+        return orjson.loads(data)
+
+    def dumps(obj) -> str:
+        """Encode an object as a compact JSON string (UTF-8, no ASCII escaping)."""
+        return orjson.dumps(obj).decode("utf-8")
+
+    def dumps_bytes(obj) -> bytes:
+        """Encode an object as compact JSON bytes, ready for an HTTP body."""
+        return orjson.dumps(obj)
+
+except ImportError:  # pragma: no cover - depends on the environment
+    BACKEND = "json"
+
+    def loads(data):
+        """Decode a JSON document from str or bytes."""
+        return json.loads(data)
+
+    def dumps(obj) -> str:
+        """Encode an object as a compact JSON string (UTF-8, no ASCII escaping)."""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+    def dumps_bytes(obj) -> bytes:
+        """Encode an object as compact JSON bytes, ready for an HTTP body."""
+        return dumps(obj).encode("utf-8")
+
+
+def dumps_bytes_with(obj: dict, **encoded: bytes) -> bytes:
+    """
+    Encode a dict plus extra fields whose values are already JSON bytes.
+
+    Lets large constant parts of a request (the tool schemas) be encoded once
+    and spliced into every body.
+    """
+    body = dumps_bytes(obj)
+    if not encoded:
+        return body
+    extra = b",".join(dumps_bytes(key) + b":" + value for key, value in encoded.items())
+    return body[:-1] + (b"," if len(body) > 2 else b"") + extra + b"}"
@@ -0,0 +1,182 @@
+# messageStore.py
+"""
+Conversation history whose large fields live on disk.
+
+In a long run ``agent.messages`` would otherwise hold every chapter body,
+reasoning trace and tool result as Python strings, so resident memory grows
+with the total output. MessageStore spills every ``content``,
+``reasoning_content`` and tool-call ``arguments`` string above
+``MESSAGE_SPILL_THRESHOLD`` characters into an append-only blob file and keeps
+a compact BlobRef in the ChatMessage instead. Blobs are read back through a
+read-only memory map, only when a message is hydrated (request building,
+token counting, compression, dumps).
+
+Anything that serializes history must go through ``MessageStore.hydrate``.
+"""
+import atexit
+import mmap
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Iterable, List, Optional
+
+from ParametersONE import ParametersONE
+from ads.chatMessage import ChatMessage, ToolCall
+from ads.metrics import metrics
+
+
+class BlobRef:
+    """Handle to one string in a BlobStore. ``str(ref)`` reads it back."""
+
+    __slots__ = ("store", "offset", "size", "chars")
+
+    def __init__(self, store: "BlobStore", offset: int, size: int, chars: int):
+        self.store = store
+        self.offset = offset
+        self.size = size  # bytes (UTF-8)
+        self.chars = chars
+
+    def __str__(self) -> str:
+        return self.store.read(self)
+
+    def __len__(self) -> int:
+        return self.chars
+
+    def __repr__(self) -> str:
+        return f"BlobRef(offset={self.offset}, size={self.size}, chars={self.chars})"
+
+
+class BlobStore:
+    """
+    Append-only UTF-8 blob file with lazy, memory-mapped reads.
+
+    Thread-safe. The file is scratch space (dumps and backups hydrate the
+    history), so it is removed when the store is closed or the process exits.
+    """
+
+    def __init__(self, directory: Path = ParametersONE.BLOB_DIR):
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self.path = Path(directory) / f"messages_{os.getpid()}_{uuid.uuid4().hex[:8]}.blob"
+        self._file = open(self.path, "a+b")
+        self._size = 0
+        self._map: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def put(self, text: str) -> BlobRef:
+        """Append a string and return its handle."""
+        data = text.encode("utf-8")
+        with self._lock:
+            offset = self._size
+            self._file.write(data)
+            self._size += len(data)
+        metrics.incr("messages.spilled_bytes", len(data))
+        return BlobRef(self, offset, len(data), len(text))
+
+    def read(self, ref: BlobRef) -> str:
+        """Read a string back from the memory map (remapped as the file grows)."""
+        end = ref.offset + ref.size
+        with self._lock:
+            if self._map is None or end > len(self._map):
+                self._file.flush()
+                if self._map is not None:
+                    self._map.close()
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map[ref.offset:end].decode("utf-8")
+
+    @property
+    def size(self) -> int:
+        """Bytes stored so far."""
+        return self._size
+
+    def close(self) -> None:
+        """Unmap, close and delete the blob file."""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if not self._file.closed:
+                self._file.close()
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+
+
+class MessageStore(list):
+    """
+    ``list`` of ChatMessages that spills large string fields to a BlobStore.
+
+    Every way of adding messages (append, extend, insert, item assignment,
+    construction) goes through ``spill``, which coerces API-style dicts to
+    ChatMessage and swaps large fields for BlobRefs (in a copy; messages are
+    immutable). Without a BlobStore nothing is spilled.
+    """
+
+    def __init__(self, messages: Iterable[Any] = (), blobs: Optional[BlobStore] = None,
+                 threshold: int = ParametersONE.MESSAGE_SPILL_THRESHOLD):
+        super().__init__()
+        self.blobs = blobs
+        self.threshold = threshold
+        self.extend(messages)
+
+    # ------------------------------------------------------------------ #
+    # Spilling
+    # ------------------------------------------------------------------ #
+
+    def _large(self, value: Any) -> bool:
+        return isinstance(value, str) and len(value) >= self.threshold
+
+    def spill(self, msg: Any) -> ChatMessage:
+        """``msg`` as a ChatMessage, with large string fields moved to the blob file."""
+        msg = ChatMessage.coerce(msg)
+        if self.blobs is None:
+            return msg
+
+        changes = {}
+        for key in ("content", "reasoning_content"):
+            value = getattr(msg, key)
+            if self._large(value):
+                changes[key] = self.blobs.put(value)
+        if any(self._large(tc.arguments) for tc in msg.tool_calls):
+            changes["tool_calls"] = [
+                # Fresh copy: the decoded arguments are not carried into history either
+                ToolCall(tc.id, tc.name, self.blobs.put(tc.arguments)) if self._large(tc.arguments) else tc
+                for tc in msg.tool_calls
+            ]
+        return msg.replace(**changes) if changes else msg
+
+    def append(self, msg: Any) -> None:
+        super().append(self.spill(msg))
+
+    def extend(self, messages: Iterable[Any]) -> None:
+        super().extend(self.spill(msg) for msg in messages)
+
+    def insert(self, index: int, msg: Any) -> None:
+        super().insert(index, self.spill(msg))
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            value = [self.spill(msg) for msg in value]
+        else:
+            value = self.spill(value)
+        super().__setitem__(index, value)
+
+    def __iadd__(self, messages: Iterable[Any]) -> "MessageStore":
+        self.extend(messages)
+        return self
+
+    # ------------------------------------------------------------------ #
+    # Hydration
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def hydrate_message(msg: Any) -> Any:
+        """API dict of a message, spilled fields read back (plain dicts pass through)."""
+        return msg.to_dict() if isinstance(msg, ChatMessage) else msg
+
+    @staticmethod
+    def hydrate(messages: Iterable[Any]) -> List[Any]:
+        """Plain list of fully materialized messages, ready for the API or JSON."""
+        return [msg.to_dict() if isinstance(msg, ChatMessage) else msg for msg in messages]
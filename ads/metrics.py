@@ -0,0 +1,55 @@
+# metrics.py
+"""
+In-process counters and timings.
+
+Cheap enough for the hot path (a lock and a few float ops), thread-safe, and
+bounded in memory: timings keep count / total / max, not every sample.
+"""
+import threading
+from collections import defaultdict
+from typing import Dict, Any
+
+
+class Metrics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(int)
+        self._timings: Dict[str, list] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Add ``value`` to counter ``name``."""
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record one duration sample for ``name``."""
+        with self._lock:
+            stat = self._timings.get(name)
+            if stat is None:
+                self._timings[name] = [1, seconds, seconds]
+            else:
+                stat[0] += 1
+                stat[1] += seconds
+                if seconds > stat[2]:
+                    stat[2] = seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copy of all counters and timing summaries."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "timings": {
+                    name: {"count": n, "total_s": round(total, 6), "avg_s": round(total / n, 6), "max_s": round(peak, 6)}
+                    for name, (n, total, peak) in self._timings.items()
+                },
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+# ← Process-wide instance shared by all modules
+metrics = Metrics()
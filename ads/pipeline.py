@@ -0,0 +1,159 @@
+# pipeline.py
+"""
+Stages of the agent loop, with middleware hooks and built-in timing.
+
+Both loops (agent.py, agentAsync.py) run every iteration as named stages:
+
+    retain_reasoning → compress → backup → stream → reconstruct → tools
+
+Each ``with pipeline.stage(name, iteration):`` block records its wall-clock
+and CPU time (``stage.<name>`` / ``stage.<name>.cpu`` in ads/metrics.py and a
+``stage`` event), so a slow stage shows up without a profiler.
+
+Middleware plugs into the loop through hooks instead of edits to it::
+
+    from ads.pipeline import pipeline
+
+    def log_writes(agent, iteration, tool_call, args):
+        if tool_call.name == "write_chapter":
+            print("writing", args.get("filename"))
+
+    pipeline.add_hook("pre_tool", log_writes)
+
+Hooks and their arguments:
+
+- ``pre_request(agent, iteration, messages)``: before every model request
+  (retries and continuations included); ``messages`` is None for the history
+- ``on_chunk(iteration, channel, text)``: every streamed delta; ``channel`` is
+  "reasoning", "content" or "tool_call". Runs on the hot path, keep it cheap
+- ``post_stream(agent, iteration, message)``: the assembled assistant ChatMessage
+- ``pre_tool(agent, iteration, tool_call, args)``: before a tool runs (possibly
+  on a pool thread). Returning a value other than None skips the call and
+  uses that value as its result (caching, policy)
+- ``post_tool(agent, iteration, tool_call, result_text, duration)``
+- ``pre_compress(agent, tokens)`` / ``post_compress(agent, result)``: around a
+  context compression
+- ``post_stage(stage, iteration, wall_s, cpu_s)``: after every timed stage
+
+Code running inside a stage (tools included, on their pool threads) can ask
+for the iteration with ``current_iteration()``.
+
+Modules listed in ``ParametersONE.PIPELINE_PLUGINS`` are imported at agent
+start-up and register their hooks when imported. A hook that raises is
+logged and counted (``pipeline.hook_errors``); it never breaks the loop.
+"""
+import contextvars
+import importlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from ads.eventLog import events
+from ads.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Iteration of the stage being run in this context (copied into tool threads and asyncio tasks)
+_iteration: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("pipeline_iteration", default=None)
+
+
+def current_iteration() -> Optional[int]:
+    """The iteration whose stage is running, or None outside the loop."""
+    return _iteration.get()
+
+
+class Pipeline:
+
+    HOOKS = ("pre_request", "on_chunk", "post_stream", "pre_tool", "post_tool",
+             "pre_compress", "post_compress", "post_stage")
+
+    def __init__(self):
+        self._hooks: Dict[str, Tuple[Callable, ...]] = {name: () for name in self.HOOKS}
+        self._lock = threading.Lock()
+        self._loaded: set = set()
+
+    # ------------------------------------------------------------------ #
+    # Registration
+    # ------------------------------------------------------------------ #
+
+    def add_hook(self, name: str, hook: Callable) -> Callable:
+        """Register ``hook`` for ``name``; hooks run in registration order."""
+        if name not in self._hooks:
+            raise ValueError(f"Unknown pipeline hook '{name}' (one of: {', '.join(self.HOOKS)})")
+        with self._lock:
+            # Tuples are replaced, never mutated → callers iterate without locking
+            self._hooks[name] = self._hooks[name] + (hook,)
+        return hook
+
+    def hook(self, name: str) -> Callable[[Callable], Callable]:
+        """Decorator form of ``add_hook``: ``@pipeline.hook("post_tool")``."""
+        return lambda fn: self.add_hook(name, fn)
+
+    def remove_hook(self, name: str, hook: Callable) -> None:
+        with self._lock:
+            self._hooks[name] = tuple(h for h in self._hooks.get(name, ()) if h is not hook)
+
+    def hooks(self, name: str) -> Tuple[Callable, ...]:
+        """The hooks registered for ``name`` (an immutable snapshot)."""
+        return self._hooks[name]
+
+    def load_plugins(self, modules: List[str]) -> None:
+        """Import middleware modules once each (they register their hooks when imported)."""
+        for module_name in modules:
+            if module_name not in self._loaded:
+                importlib.import_module(module_name)
+                self._loaded.add(module_name)
+
+    # ------------------------------------------------------------------ #
+    # Running
+    # ------------------------------------------------------------------ #
+
+    def run(self, name: str, *args) -> Optional[Any]:
+        """
+        Call the hooks of ``name`` in order.
+
+        Returns:
+            The first result that is not None (later hooks are skipped), or None
+        """
+        for hook in self._hooks[name]:
+            try:
+                result = hook(*args)
+            except Exception as e:
+                metrics.incr("pipeline.hook_errors")
+                logger.warning("Pipeline hook %s (%s) failed: %s: %s",
+                               name, getattr(hook, "__qualname__", hook), type(e).__name__, e)
+                continue
+            if result is not None:
+                return result
+        return None
+
+    @contextmanager
+    def stage(self, name: str, iteration: int) -> Iterator[None]:
+        """
+        Time one stage of an iteration.
+
+        CPU time is the process's (``time.process_time``), so work done by
+        tool worker threads counts towards the stage that started it. With
+        several asyncio sessions in one process it also includes the other
+        sessions' work; wall time is exact either way.
+        """
+        token = _iteration.set(iteration)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            _iteration.reset(token)
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            metrics.observe(f"stage.{name}", wall)
+            metrics.observe(f"stage.{name}.cpu", cpu)
+            events.emit("stage", iteration=iteration, stage=name, wall_s=round(wall, 4), cpu_s=round(cpu, 4))
+            if self._hooks["post_stage"]:
+                self.run("post_stage", name, iteration, wall, cpu)
+
+
+# ← Process-wide instance shared by all modules
+pipeline = Pipeline()
@@ -0,0 +1,102 @@
+# reasoningRetention.py
+"""
+Retention policy for ``reasoning_content`` in the resent history.
+
+Every assistant message keeps its chain-of-thought, and the whole history is
+uploaded (and token-counted) again on every iteration. The thinking model only
+needs the reasoning of the current tool-call turn, so older turns are
+condensed to a short digest or stripped, once, by replacing the message in
+the history list.
+"""
+from typing import List, Tuple
+
+from ParametersONE import ParametersONE
+from ads.chatMessage import ChatMessage
+from ads.eventLog import events
+from ads.metrics import metrics
+from ads.tokenizer import count_tokens
+
+
+class ReasoningRetention:
+
+    KEEP = "keep"
+    DIGEST = "digest"
+    DROP = "drop"
+
+    DIGEST_MARKER = "[reasoning digest] "
+
+    @staticmethod
+    def digest(reasoning: str, limit: int = ParametersONE.REASONING_DIGEST_CHARS) -> str:
+        """
+        Condense reasoning to its opening and its conclusion.
+
+        Args:
+            reasoning: Full reasoning text
+            limit: Approximate size of the digest in characters
+
+        Returns:
+            The digest (prefixed with DIGEST_MARKER)
+        """
+        half = limit // 2
+        # Cut at whitespace so no word is split (CJK text has none → plain cut)
+        head = (reasoning[:half].rsplit(None, 1) or [""])[0]
+        tail = (reasoning[-half:].split(None, 1) or [""])[-1]
+        return f"{ReasoningRetention.DIGEST_MARKER}{head.strip()} … {tail.strip()}"
+
+    @staticmethod
+    def apply(messages: List[ChatMessage],
+              policy: str = ParametersONE.REASONING_RETENTION,
+              keep_recent: int = ParametersONE.REASONING_KEEP_RECENT) -> Tuple[int, int]:
+        """
+        Condense or drop the reasoning of all but the most recent assistant turns.
+
+        Trimmed messages are replaced in the list (messages are immutable);
+        already condensed reasoning is left alone, so calling this before every
+        request only costs a scan.
+
+        Args:
+            messages: Conversation history
+            policy: KEEP, DIGEST or DROP
+            keep_recent: Number of most recent assistant messages left untouched
+
+        Returns:
+            (bytes_saved, tokens_saved) for this call
+        """
+        if policy == ReasoningRetention.KEEP:
+            return 0, 0
+
+        bytes_saved = tokens_saved = trimmed = 0
+        seen = 0
+        for idx in range(len(messages) - 1, -1, -1):
+            msg = messages[idx]
+            if msg.role != "assistant":
+                continue
+            seen += 1
+            reasoning = msg.reasoning_content
+            if seen <= keep_recent or not reasoning:
+                continue
+            reasoning = str(reasoning)  # read back if spilled to the blob store
+
+            if policy == ReasoningRetention.DIGEST:
+                if reasoning.startswith(ReasoningRetention.DIGEST_MARKER) or \
+                        len(reasoning) <= ParametersONE.REASONING_DIGEST_CHARS:
+                    continue  # already short enough
+                replacement = ReasoningRetention.digest(reasoning)
+            elif policy == ReasoningRetention.DROP:
+                replacement = ""
+            else:
+                continue
+
+            messages[idx] = msg.replace(reasoning_content=replacement)
+            trimmed += 1
+            bytes_saved += len(reasoning.encode("utf-8")) - len(replacement.encode("utf-8"))
+            tokens_saved += count_tokens(reasoning) - (count_tokens(replacement) if replacement else 0)
+
+        if trimmed:
+            metrics.incr("reasoning.bytes_saved", bytes_saved)
+            metrics.incr("reasoning.tokens_saved", tokens_saved)
+            events.emit("reasoning_trimmed", policy=policy, messages=trimmed,
+                        bytes_saved=bytes_saved, tokens_saved=tokens_saved)
+            print(f"🧹 Reasoning retention ({policy}): {trimmed} older turn(s), "
+                  f"-{bytes_saved / 1024:.1f} KB, ~{tokens_saved:,} tokens saved per request")
+        return bytes_saved, tokens_saved
@@ -0,0 +1,121 @@
+# repetitionGuard.py
+"""
+Online detection of degenerate, looping generations.
+
+Thinking models occasionally fall into a loop and repeat the same paragraph
+(or reasoning fragment) until ``max_tokens``. RepetitionDetector watches one
+text channel as it streams and reports the loop after a few hundred repeated
+tokens, long before the 64K-token budget is spent.
+
+Text is split into tokens (words; every CJK character is a token of its own),
+and a polynomial rolling hash over the last ``ngram`` tokens is kept for each
+position. A token whose n-gram was already seen in the recent window extends
+the current "repeated run"; once the run reaches ``min_run`` tokens the tail
+is a verbatim copy of earlier text. Memory is bounded by ``window`` hashes.
+"""
+import re
+from collections import deque
+from typing import Optional
+
+from ParametersONE import ParametersONE
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"  # kana, CJK ideographs, hangul
+_TOKEN = re.compile(f"[{_CJK}]|[^\\s{_CJK}]+")
+_CJK_CHAR = re.compile(f"[{_CJK}]")
+
+_BASE = 1_000_003
+_MOD = (1 << 61) - 1
+
+
+class RepetitionDetected(Exception):
+    """A streamed channel started repeating itself and the stream was aborted."""
+
+    def __init__(self, channel: str, repeated_tokens: int, trimmed_chars: int):
+        super().__init__(f"{channel} repeated the same text for {repeated_tokens} tokens "
+                         f"({trimmed_chars:,} chars trimmed)")
+        self.channel = channel
+        self.repeated_tokens = repeated_tokens
+        self.trimmed_chars = trimmed_chars
+
+
+class RepetitionDetector:
+    """
+    Rolling n-gram hash detector for one streamed text channel.
+
+    ``feed()`` every fragment as it arrives; it returns the character offset
+    where the repetition began (everything from there on is a copy and can be
+    cut) once the repeated run crosses the threshold, else None.
+    """
+
+    def __init__(self,
+                 ngram: int = ParametersONE.REPETITION_NGRAM,
+                 min_run: int = ParametersONE.REPETITION_MIN_RUN,
+                 window: int = ParametersONE.REPETITION_WINDOW):
+        self.ngram = ngram
+        self.min_run = min_run
+        self.window = window
+
+        self.run = 0  # consecutive tokens whose n-gram was seen before
+        self._run_start = 0  # char offset where the current run began
+        self._tokens = 0
+        self._hash = 0
+        self._drop = pow(_BASE, ngram - 1, _MOD)  # weight of the token leaving the n-gram
+        self._recent_tokens = deque()  # (token hash, char offset) of the current n-gram
+        self._seen = {}  # n-gram hash → token number where it last ended
+        self._order = deque()  # n-gram hashes in insertion order, for eviction
+
+        self._carry = ""  # token cut at the end of the previous fragment
+        self._offset = 0  # char offset of the start of the pending text
+
+    def feed(self, text: str) -> Optional[int]:
+        """
+        Process one streamed fragment.
+
+        Returns:
+            Char offset (within the channel text) where the repetition starts,
+            or None while the text still looks healthy
+        """
+        text = self._carry + text
+        base = self._offset
+        matches = list(_TOKEN.finditer(text))
+        # An unfinished word may continue in the next fragment
+        if matches and matches[-1].end() == len(text) and not _CJK_CHAR.fullmatch(matches[-1].group()):
+            last = matches.pop()
+            self._carry = text[last.start():]
+            self._offset = base + last.start()
+        else:
+            self._carry = ""
+            self._offset = base + len(text)
+
+        for match in matches:
+            if self._push(hash(match.group()), base + match.start()):
+                return self._run_start
+        return None
+
+    def _push(self, token_hash: int, offset: int) -> bool:
+        recent = self._recent_tokens
+        if len(recent) == self.ngram:
+            old_hash, _ = recent.popleft()
+            self._hash = (self._hash - old_hash * self._drop) % _MOD
+        recent.append((token_hash, offset))
+        self._hash = (self._hash * _BASE + token_hash) % _MOD
+        self._tokens += 1
+        if len(recent) < self.ngram:
+            return False
+
+        seen = self._seen
+        if self._hash in seen:
+            if self.run == 0:
+                # The copy started with the first token of this n-gram
+                self._run_start = recent[0][1]
+            self.run += 1
+        else:
+            self.run = 0
+
+        seen[self._hash] = self._tokens
+        self._order.append((self._hash, self._tokens))
+        if len(self._order) > self.window:
+            old, number = self._order.popleft()
+            if seen.get(old) == number:
+                del seen[old]
+        return self.run >= self.min_run
@@ -0,0 +1,99 @@
+# retryPolicy.py
+"""
+Error classification and exponential backoff for the model stream.
+"""
+import random
+from typing import Optional
+
+from ParametersONE import ParametersONE
+
+
+class StreamInterrupted(Exception):
+    """
+    The model stream failed before it completed.
+
+    Carries the accumulator with everything received so far, so the caller can
+    salvage it instead of regenerating the whole response.
+    """
+
+    def __init__(self, cause: BaseException, accumulator=None):
+        super().__init__(f"{type(cause).__name__}: {cause}")
+        self.cause = cause
+        self.accumulator = accumulator
+
+
+class RetryPolicy:
+    """
+    Classifies stream errors and computes backoff delays.
+
+    Error classes:
+        - ``transient``: connection drops, timeouts, stalls, 408/409/429/5xx → retry;
+          a stream aborted for looping (RepetitionDetected) is retried at once
+        - ``fatal``: auth, bad request and other 4xx → retrying cannot help
+    """
+
+    TRANSIENT = "transient"
+    FATAL = "fatal"
+
+    _RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+    _TRANSIENT_NAMES = {
+        # openai
+        "APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+        # httpx (fast SSE path) and stdlib
+        "TransportError", "TimeoutException", "ReadTimeout", "ConnectTimeout", "ReadError",
+        "RemoteProtocolError", "ConnectError", "WriteError", "PoolTimeout",
+        "ConnectionError", "ConnectionResetError", "TimeoutError", "IncompleteRead",
+        # ads.streamWatchdog, ads.repetitionGuard
+        "StreamStalled", "RepetitionDetected",
+    }
+
+    def __init__(self,
+                 max_retries: int = ParametersONE.STREAM_MAX_RETRIES,
+                 base_delay: float = ParametersONE.STREAM_RETRY_BASE_DELAY,
+                 max_delay: float = ParametersONE.STREAM_RETRY_MAX_DELAY):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @staticmethod
+    def status_code(exc: BaseException) -> Optional[int]:
+        """HTTP status of an SDK or httpx error, if it has one."""
+        status = getattr(exc, "status_code", None)
+        if status is None and getattr(exc, "response", None) is not None:
+            status = getattr(exc.response, "status_code", None)
+        return status
+
+    def classify(self, exc: BaseException) -> str:
+        """Return TRANSIENT or FATAL for an exception raised by the stream."""
+        if isinstance(exc, StreamInterrupted):
+            exc = exc.cause
+
+        status = self.status_code(exc)
+        if status is not None:
+            return self.TRANSIENT if status in self._RETRYABLE_STATUS else self.FATAL
+
+        for cls in type(exc).__mro__:
+            if cls.__name__ in self._TRANSIENT_NAMES:
+                return self.TRANSIENT
+        return self.FATAL
+
+    def delay(self, attempt: int, exc: Optional[BaseException] = None) -> float:
+        """
+        Backoff before retry number ``attempt`` (1-based): exponential, capped, with jitter.
+
+        A server-provided ``Retry-After`` header wins when present.
+        """
+        if isinstance(exc, StreamInterrupted):
+            exc = exc.cause
+        if type(exc).__name__ == "RepetitionDetected":
+            return 0.0  # nothing to wait for, the server is fine
+        response = getattr(exc, "response", None)
+        retry_after = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(ceiling / 2, ceiling)
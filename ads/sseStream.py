@@ -0,0 +1,286 @@
+# sseStream.py
+"""
+Fast-path streaming client.
+
+Reads the ``text/event-stream`` of ``/chat/completions`` directly from the
+shared httpx pool and decodes every ``data:`` line with ads.fastJson into
+plain dicts. No pydantic ``ChatCompletionChunk`` is built per chunk and no
+``hasattr`` probing is needed; the deltas go into the same StreamAccumulator
+as the SDK path, so output and history are identical.
+
+Run this file directly to benchmark both paths against a local SSE stand-in:
+
+    python -m ads.sseStream --chunks 5000 --rounds 5
+"""
+from typing import Iterator, Iterable, Dict, Any
+
+from ParametersONE import ParametersONE
+from ads import fastJson
+from ads.messageStore import MessageStore
+from ads.retryPolicy import StreamInterrupted
+from ads.streamAccumulator import StreamAccumulator
+from ads.streamWatchdog import StreamWatchdog
+from tools.registry import tool_registry
+
+
+class SSEStreamingChat:
+
+    @staticmethod
+    def iter_sse_data(byte_chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Split a raw byte stream into SSE ``data:`` payloads.
+
+        Args:
+            byte_chunks: Response body bytes as they arrive (content-encoding already decoded)
+
+        Yields:
+            The payload of every ``data:`` line (without the prefix)
+        """
+        buffer = b""
+        for piece in byte_chunks:
+            buffer += piece
+            if b"\n" not in piece:
+                continue
+            lines = buffer.split(b"\n")
+            buffer = lines.pop()
+            for line in lines:
+                if line.startswith(b"data:"):
+                    yield line[5:].strip()
+        if buffer.startswith(b"data:"):
+            yield buffer[5:].strip()
+
+    @staticmethod
+    def consume(byte_chunks: Iterable[bytes], accumulator: StreamAccumulator,
+                watchdog: StreamWatchdog = None) -> StreamAccumulator:
+        """
+        Decode an SSE byte stream and feed the deltas into the accumulator.
+
+        Args:
+            byte_chunks: Raw bytes of a chat completion event stream
+            accumulator: Accumulator receiving the deltas
+            watchdog: Optional watchdog told about every event
+
+        Returns:
+            The same accumulator, for chaining
+        """
+        loads = fastJson.loads
+        beat = watchdog.beat if watchdog is not None else None
+        for payload in SSEStreamingChat.iter_sse_data(byte_chunks):
+            if beat is not None:
+                beat()
+            if not payload:
+                continue
+            if payload == b"[DONE]":
+                break
+
+            chunk = loads(payload)
+            choices = chunk.get("choices")
+            if not choices:
+                continue
+
+            choice = choices[0]
+            if choice.get("finish_reason"):
+                accumulator.on_finish(choice["finish_reason"])
+                # Moonshot reports usage on the final choice, OpenAI on the chunk
+                usage = choice.get("usage") or chunk.get("usage")
+                if usage:
+                    accumulator.on_usage(usage)
+
+            delta = choice.get("delta")
+            if not delta:
+                continue
+
+            if delta.get("role"):
+                accumulator.on_role(delta["role"])
+
+            reasoning = delta.get("reasoning_content")
+            if reasoning:
+                accumulator.on_reasoning(reasoning)
+
+            content = delta.get("content")
+            if content:
+                accumulator.on_content(content)
+
+            tool_deltas = delta.get("tool_calls")
+            if tool_deltas:
+                for tc_delta in tool_deltas:
+                    function = tc_delta.get("function") or {}
+                    accumulator.on_tool_call(
+                        tc_delta.get("index", 0),
+                        tc_delta.get("id"),
+                        function.get("name"),
+                        function.get("arguments"),
+                    )
+
+        return accumulator
+
+    @staticmethod
+    def build_payload(agent, messages: list = None) -> Dict[str, Any]:
+        """Request body equivalent to the SDK call in StreamingChat."""
+        return {
+            "model": ParametersONE.MODEL,
+            "messages": MessageStore.hydrate(agent.messages if messages is None else messages),
+            "max_tokens": ParametersONE.MAX_TOKENS,
+            "tools": agent.tools,
+            "temperature": ParametersONE.TEMPERATURE,
+            "stream": True,
+            "tool_choice": "auto",
+        }
+
+    @staticmethod
+    def encode_payload(payload: Dict[str, Any]) -> bytes:
+        """Request body bytes; the registry's tool schemas are spliced in pre-encoded."""
+        if payload.get("tools") is not None and payload["tools"] is tool_registry.definitions:
+            rest = {key: value for key, value in payload.items() if key != "tools"}
+            return fastJson.dumps_bytes_with(rest, tools=tool_registry.definitions_json)
+        return fastJson.dumps_bytes(payload)
+
+    @staticmethod
+    def stream(http_client, base_url: str, api_key: str, payload: Dict[str, Any],
+               accumulator: StreamAccumulator, watchdog: StreamWatchdog = None) -> StreamAccumulator:
+        """
+        POST a streaming chat completion and consume the event stream.
+
+        Args:
+            http_client: Shared ``httpx.Client`` (connection pool)
+            base_url: API base URL, e.g. https://api.moonshot.ai/v1
+            api_key: Bearer token
+            payload: Request body (``stream`` must be True)
+            accumulator: Accumulator receiving the deltas
+            watchdog: Optional watchdog; it closes the response on a stall
+
+        Returns:
+            The same accumulator
+
+        Raises:
+            httpx.HTTPStatusError: If the API answers with an error status
+        """
+        with http_client.stream(
+                "POST",
+                f"{base_url.rstrip('/')}/chat/completions",
+                content=SSEStreamingChat.encode_payload(payload),
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json",
+                    "Accept": "text/event-stream",
+                },
+        ) as response:
+            if response.status_code >= 400:
+                response.read()
+                response.raise_for_status()
+            if watchdog is not None:
+                watchdog.start(response.close)
+            # iter_bytes, not iter_raw: a gzip/deflate encoded stream (httpx asks for one) is decoded
+            return SSEStreamingChat.consume(response.iter_bytes(), accumulator, watchdog)
+
+    @staticmethod
+    def kimi_k2_streaming_chat(agent, iteration: int,
+                               messages: list = None) -> tuple[str, str, str, list | None, str | None]:
+        """Drop-in replacement for StreamingChat.kimi_k2_streaming_chat."""
+        print("🤖 Calling AgentONE-thinking model (fast SSE path)...\n")
+        accumulator = StreamAccumulator(iteration)
+        print(f"\n🤖 调用 Kimi K2 模型... (第 {iteration} 次思考)\n")
+        client = agent.moonshotclient
+        watchdog = StreamWatchdog()
+        try:
+            SSEStreamingChat.stream(client.http_client, client.base_url, client.api_key,
+                                    SSEStreamingChat.build_payload(agent, messages), accumulator, watchdog)
+        except Exception as e:
+            # Hand the partial response to the retry / salvage layer
+            raise StreamInterrupted(watchdog.stalled or e, accumulator) from e
+        finally:
+            watchdog.stop()
+
+        if watchdog.stalled is not None:
+            raise StreamInterrupted(watchdog.stalled, accumulator)
+        return accumulator.result()
+
+
+# ---------------------------------------------------------------------------
+# Benchmark: SDK path vs. fast path against a local SSE stand-in server
+# ---------------------------------------------------------------------------
+
+def _fake_sse_body(chunks: int) -> bytes:
+    """A realistic stream: reasoning, content, then one large write_chapter call."""
+    def event(delta, finish_reason=None):
+        return b"data: " + fastJson.dumps_bytes({
+            "id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": 0,
+            "model": ParametersONE.MODEL,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }) + b"\n\n"
+
+    third = max(chunks // 3, 1)
+    events = [event({"role": "assistant", "content": ""})]
+    events += [event({"reasoning_content": "thinking about the plot "}) for _ in range(third)]
+    events += [event({"content": "Once upon a time "}) for _ in range(third)]
+    events.append(event({"tool_calls": [{"index": 0, "id": "call_0", "type": "function",
+                                         "function": {"name": "write_chapter", "arguments": ""}}]}))
+    events += [event({"tool_calls": [{"index": 0, "function": {"arguments": "the ship sailed on "}}]})
+               for _ in range(third)]
+    events.append(event({}, finish_reason="tool_calls"))
+    events.append(b"data: [DONE]\n\n")
+    return b"".join(events)
+
+
+if __name__ == "__main__":
+    import argparse
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    import httpx
+
+    parser = argparse.ArgumentParser(description="Benchmark SDK vs. raw SSE streaming")
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    body = _fake_sse_body(args.chunks)
+
+    class _SSEHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *_):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SSEHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    payload = {"model": ParametersONE.MODEL, "messages": [{"role": "user", "content": "hi"}], "stream": True}
+    http_client = httpx.Client()
+
+    def _bench(label, fn):
+        timings = []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            cpu = time.process_time()
+            fn()
+            timings.append((time.perf_counter() - start, time.process_time() - cpu))
+        wall = min(t[0] for t in timings)
+        cpu = min(t[1] for t in timings)
+        print(f"{label:<28} best wall {wall * 1000:8.1f} ms | cpu {cpu * 1000:8.1f} ms "
+              f"| {args.chunks / wall:,.0f} chunks/s")
+
+    print(f"Benchmark: {args.chunks:,} chunks x {args.rounds} rounds (JSON backend: {fastJson.BACKEND})")
+    _bench("fast path (raw SSE)", lambda: SSEStreamingChat.stream(
+        http_client, base_url, "bench", payload, StreamAccumulator(0, render=False)).result())
+
+    try:
+        from openai import OpenAI
+        from ads.streamingChat import StreamingChat
+    except ImportError as e:
+        print(f"SDK path skipped: {e}")
+    else:
+        sdk = OpenAI(api_key="bench", base_url=base_url, http_client=http_client)
+        _bench("SDK path (pydantic chunks)", lambda: StreamingChat.consume(
+            sdk.chat.completions.create(**payload), StreamAccumulator(0, render=False)).result())
+
+    server.shutdown()
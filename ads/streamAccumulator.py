@@ -0,0 +1,248 @@
+# streamAccumulator.py
+import time
+from typing import List, Dict, Any, Optional
+
+from ParametersONE import ParametersONE
+from ads.chatMessage import ToolCall
+from ads.eventLog import events, elapsed_since
+from ads.metrics import metrics
+from ads.pipeline import pipeline
+from ads.repetitionGuard import RepetitionDetector, RepetitionDetected
+
+
+class StreamAccumulator:
+    """
+    Collects the deltas of one streamed chat completion and renders them live.
+
+    The accumulator is transport agnostic: the OpenAI SDK path and the raw SSE
+    fast path both feed it plain values (strings / ints), so the console output
+    and the final message are identical whichever client produced the stream.
+
+    Text is collected in lists and joined once in ``result()``; repeated string
+    concatenation on 64K-token responses is quadratic in the worst case.
+
+    With the repetition guard on, every channel (reasoning, content, each tool
+    call's arguments) is watched by a RepetitionDetector. A looping channel is
+    trimmed back to the start of the repetition and RepetitionDetected is
+    raised, which aborts the stream.
+    """
+
+    SPINNER = ["⣾", "⣽", "⣻", "⢿", "⡿", "⣟", "⣯", "⣷"]
+    REPETITION = "repetition"  # finish_reason of a stream aborted by the guard
+
+    def __init__(self, iteration: int, render: Optional[bool] = None, guard: Optional[bool] = None):
+        self.iteration = iteration
+        self.render = (not ParametersONE.HEADLESS) if render is None else render
+        self.guard = ParametersONE.REPETITION_GUARD if guard is None else guard
+        self.repetition: Optional[RepetitionDetected] = None
+        self._detectors: Dict[str, RepetitionDetector] = {}
+
+        self.role: Optional[str] = None
+        self.finish_reason: Optional[str] = None
+        self.usage: Optional[Dict[str, Any]] = None
+        self._reasoning_parts: List[str] = []
+        self._content_parts: List[str] = []
+        self._tool_calls: List[ToolCall] = []
+        self._tool_args_parts: List[List[str]] = []
+        self._tool_args_chars: List[int] = []
+
+        # Track if we've printed headers
+        self._reasoning_header = False
+        self._response_header = False
+        self._last_tool_index = -1
+        self._spinner_idx = 0
+
+        self._started_at = time.monotonic()
+        self._first_token = False
+        # on_chunk middleware, snapshotted once per stream (empty → one falsy check per delta)
+        self._chunk_hooks = pipeline.hooks("on_chunk")
+        events.emit("stream_start", iteration=iteration)
+
+    # ------------------------------------------------------------------ #
+    # Feeding
+    # ------------------------------------------------------------------ #
+
+    def on_role(self, role: str) -> None:
+        self.role = role
+
+    def on_finish(self, finish_reason: str) -> None:
+        self.finish_reason = finish_reason
+
+    def on_usage(self, usage: Dict[str, Any]) -> None:
+        self.usage = usage
+
+    def _on_first_token(self) -> None:
+        self._first_token = True
+        events.emit("stream_first_token", iteration=self.iteration, ttft_s=elapsed_since(self._started_at))
+
+    def on_reasoning(self, text: str) -> None:
+        if not self._first_token:
+            self._on_first_token()
+        if self.render:
+            if not self._reasoning_header:
+                print("=" * 60)
+                print(f"🧠 Reasoning (Iteration {self.iteration})")
+                print("=" * 60)
+                self._reasoning_header = True
+            print(text, end="", flush=True)
+        self._reasoning_parts.append(text)
+        if self._chunk_hooks:
+            pipeline.run("on_chunk", self.iteration, "reasoning", text)
+        if self.guard:
+            self._watch("reasoning", self._reasoning_parts, text)
+
+    def on_content(self, text: str) -> None:
+        if not self._first_token:
+            self._on_first_token()
+        if self.render:
+            # Close reasoning section if it was open
+            if self._reasoning_header and not self._response_header:
+                print("\n" + "=" * 60 + "\n")
+            if not self._response_header:
+                print("💬 Response:")
+                print("-" * 60)
+                self._response_header = True
+            print(text, end="", flush=True)
+        self._content_parts.append(text)
+        if self._chunk_hooks:
+            pipeline.run("on_chunk", self.iteration, "content", text)
+        if self.guard:
+            self._watch("content", self._content_parts, text)
+
+    def on_tool_call(self, index: int, call_id: Optional[str], name: Optional[str],
+                     arguments: Optional[str]) -> None:
+        if not self._first_token:
+            self._on_first_token()
+        # Initialize slot # Ensure we have enough slots in tool_calls
+        while len(self._tool_calls) <= index:
+            self._tool_calls.append(ToolCall())
+            self._tool_args_parts.append([])
+            self._tool_args_chars.append(0)
+
+        tc = self._tool_calls[index]
+
+        # Print header when we start receiving a tool call
+        if index != self._last_tool_index and name:
+            if self.render:
+                if self._reasoning_header or self._response_header:
+                    print("\n" + "=" * 60 + "\n")
+                print(f"🔧 Preparing tool call: {name}")
+                print("─" * 60)
+            self._last_tool_index = index
+
+        if call_id:
+            tc.id = call_id
+        if name:
+            tc.name = name
+        if arguments:
+            self._tool_args_parts[index].append(arguments)
+            self._tool_args_chars[index] += len(arguments)
+            if self._chunk_hooks:
+                pipeline.run("on_chunk", self.iteration, "tool_call", arguments)
+            if self.guard:
+                self._watch(f"tool_arguments[{index}]", self._tool_args_parts[index], arguments, index)
+
+            if self.render:
+                # Live progress (exactly like real Kimi)
+                chars = self._tool_args_chars[index]
+                words = chars // 5
+                spinner_char = self.SPINNER[self._spinner_idx % 8]
+                self._spinner_idx += 1
+                print(f"\r{spinner_char} 生成参数中... {chars:,} 字符 ≈ {words:,} 词", end="", flush=True)
+
+    def _watch(self, channel: str, parts: List[str], text: str, tool_index: int = -1) -> None:
+        """Feed the repetition detector of a channel; abort the stream if it loops."""
+        detector = self._detectors.get(channel)
+        if detector is None:
+            detector = self._detectors[channel] = RepetitionDetector()
+        trim_at = detector.feed(text)
+        if trim_at is None:
+            return
+
+        # Keep the first copy, drop the repeats
+        joined = "".join(parts)
+        parts[:] = [joined[:trim_at]]
+        if tool_index >= 0:
+            self._tool_args_chars[tool_index] = trim_at
+        self.finish_reason = self.REPETITION
+        self.repetition = RepetitionDetected(channel, detector.run, len(joined) - trim_at)
+
+        metrics.incr("stream.repetitions")
+        events.emit("stream_repetition", iteration=self.iteration, channel=channel,
+                    repeated_tokens=detector.run, trimmed_chars=len(joined) - trim_at)
+        if self.render:
+            print(f"\n\n🔁 Stream aborted: {self.repetition}")
+        raise self.repetition
+
+    # ------------------------------------------------------------------ #
+    # Finalization
+    # ------------------------------------------------------------------ #
+
+    @property
+    def content(self) -> str:
+        """Visible content received so far."""
+        return "".join(self._content_parts)
+
+    @property
+    def reasoning(self) -> str:
+        """Reasoning content received so far."""
+        return "".join(self._reasoning_parts)
+
+    @property
+    def tool_calls(self) -> List[ToolCall]:
+        """Tool calls with their argument fragments joined."""
+        for tc, parts in zip(self._tool_calls, self._tool_args_parts):
+            if parts:
+                joined = "".join(parts)
+                parts[:] = [joined]
+                tc.arguments = joined
+        return self._tool_calls
+
+    def result(self) -> tuple[Optional[str], str, str, List[ToolCall], Optional[str]]:
+        """
+        Print the end-of-stream summary and return the accumulated message.
+
+        Returns:
+            Tuple of (role, final_content, reasoning_content, tool_calls, finish_reason)
+        """
+        final_content = self.content
+        reasoning_content = self.reasoning
+        tool_calls = self.tool_calls
+
+        if self.render:
+            # =============== FINAL CLEANUP & SUMMARY ===============
+            print()  # final newline after spinner
+
+            # Tool call completion summary (Kimi style)
+            if tool_calls and any(tc.name for tc in tool_calls):
+                print("\n✓ 工具调用完成")
+                for i, tc in enumerate(tool_calls):
+                    if tc.name:
+                        chars = self._tool_args_chars[i]
+                        words = chars // 5
+                        print(f"   {i + 1}. {tc.name} ({chars:,} 字符, ~{words:,} 词)")
+                print("─" * 50 + "\n")
+
+            # If final answer was empty (pure tool mode), show placeholder
+            if not final_content.strip() and self.finish_reason != "tool_calls":
+                print("（模型正在处理工具结果...）")
+
+        events.emit(
+            "stream_end",
+            iteration=self.iteration,
+            duration_s=elapsed_since(self._started_at),
+            finish_reason=self.finish_reason,
+            reasoning_chars=len(reasoning_content),
+            content_chars=len(final_content),
+            tool_calls=len(tool_calls),
+            tool_args_chars=sum(self._tool_args_chars),
+            usage=self.usage,
+        )
+
+        return (
+            self.role,  # "assistant"
+            final_content,  # Visible answer
+            reasoning_content,  # Hidden o1-style reasoning
+            tool_calls,  # None or list of full tool calls
+            self.finish_reason  # "stop", "tool_calls", "length", ...
+        )
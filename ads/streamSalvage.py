@@ -0,0 +1,109 @@
+# streamSalvage.py
+"""
+Keeps the useful part of a model stream that broke mid-response.
+"""
+from typing import Optional
+
+from ads.chatMessage import ChatMessage
+from ads.repetitionGuard import RepetitionDetected
+from ads.streamAccumulator import StreamAccumulator
+from tools.project import get_active_project_folder
+from tools.repair import parse_tool_arguments
+from tools.writer import save_partial_chapter_impl
+
+
+class StreamSalvage:
+    """
+    Turns a partial StreamAccumulator into history instead of throwing it away.
+
+    - Complete tool calls (id, name and parseable JSON arguments) are returned as
+      the response, so they are executed as if the stream had ended normally.
+    - Otherwise the partial reasoning / content goes into history as an
+      interrupted assistant turn, and the content of a half-streamed
+      ``write_chapter`` call is persisted to disk, followed by a user note
+      telling the model to continue rather than start over.
+    """
+
+    @staticmethod
+    def complete_tool_calls(accumulator: StreamAccumulator) -> list:
+        """Tool calls whose arguments arrived in full."""
+        complete = []
+        for tc in accumulator.tool_calls:
+            if tc.id and tc.name and tc.complete:
+                complete.append(tc)
+        return complete
+
+    @staticmethod
+    def save_partial_chapter(raw_args: str, schema: Optional[dict] = None) -> Optional[str]:
+        """
+        Persist the content of a truncated write_chapter call.
+
+        Args:
+            raw_args: The arguments streamed so far
+            schema: write_chapter's parameters schema, for field-level recovery
+
+        Returns:
+            A note for the model describing where the text went, or None
+        """
+        args = parse_tool_arguments(raw_args, schema).args
+        filename, content = args.get("filename"), args.get("content")
+        if not (get_active_project_folder() and isinstance(filename, str) and isinstance(content, str) and content):
+            return None
+        note = save_partial_chapter_impl(filename, content, args.get("mode"))
+        return None if note.startswith("Error") else note
+
+    @staticmethod
+    def salvage(agent, accumulator: Optional[StreamAccumulator], cause: BaseException) -> Optional[tuple]:
+        """
+        Salvage a broken stream.
+
+        Args:
+            agent: The session whose history receives the partial turn
+            accumulator: Deltas received before the failure (may be None)
+            cause: The error that ended the stream
+
+        Returns:
+            A (role, content, reasoning, tool_calls, finish_reason) response if complete tool
+            calls were recovered; None if the caller should retry the request
+        """
+        if accumulator is None:
+            return None
+
+        content = accumulator.content
+        reasoning = accumulator.reasoning
+
+        tool_calls = StreamSalvage.complete_tool_calls(accumulator)
+        if tool_calls:
+            print(f"\n♻️  Stream broke ({type(cause).__name__}) - salvaged {len(tool_calls)} complete tool call(s)")
+            return accumulator.role or "assistant", content, reasoning, tool_calls, accumulator.finish_reason
+
+        saved = []
+        schema = agent.toolmap.get_parameters_schema("write_chapter")
+        for tc in accumulator.tool_calls:
+            if tc.name == "write_chapter" and tc.arguments:
+                saved_note = StreamSalvage.save_partial_chapter(tc.arguments, schema)
+                if saved_note:
+                    saved.append(saved_note)
+
+        if not (content or reasoning or saved):
+            return None
+
+        agent.messages.append(ChatMessage.assistant(content or "[response interrupted]", reasoning))
+
+        if isinstance(cause, RepetitionDetected):
+            # Corrective nudge instead of the loop
+            note = ("[REPETITION STOPPED] Your previous response kept repeating the same text and was stopped; "
+                    "the repeated part was removed. ")
+        else:
+            note = "[STREAM INTERRUPTED] Your previous response was cut off by a connection error. "
+        if saved:
+            note += " ".join(saved) + " Do not regenerate text that is already saved. "
+        if isinstance(cause, RepetitionDetected):
+            note += "Do not repeat earlier passages: move the text forward with new material, or call the next tool."
+        else:
+            note += "Continue from where you stopped."
+        agent.messages.append(ChatMessage.user(note))
+
+        print(f"\n♻️  Stream broke ({type(cause).__name__}) - kept {len(content) + len(reasoning):,} chars"
+              + (f", saved {len(saved)} partial chapter(s)" if saved else ""))
+        return None
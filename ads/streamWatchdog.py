@@ -0,0 +1,121 @@
+# streamWatchdog.py
+"""
+Deadlines for model streams: time-to-first-token, inter-chunk idle, total.
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+from ParametersONE import ParametersONE
+from ads.metrics import metrics
+
+
+class StreamStalled(Exception):
+    """A stream missed one of its deadlines and was aborted."""
+
+    def __init__(self, phase: str, elapsed: float, limit: float):
+        super().__init__(f"stream stalled: {phase} deadline of {limit:g}s exceeded after {elapsed:.1f}s")
+        self.phase = phase
+        self.elapsed = elapsed
+        self.limit = limit
+
+
+class StreamWatchdog:
+    """
+    Tracks stream liveness and aborts streams that stop making progress.
+
+    Call ``beat()`` for every chunk. For blocking (sync) streams, ``start(close)``
+    runs a daemon thread that calls ``close`` once a deadline passes, which makes
+    the blocked read fail; async streams instead bound each read with
+    ``remaining()``. Either way ``stalled`` then holds the StreamStalled to raise.
+
+    A limit of None (or 0) disables that deadline.
+    """
+
+    FIRST_TOKEN = "first_token"
+    IDLE = "idle"
+    TOTAL = "total"
+
+    def __init__(self,
+                 first_token_timeout: Optional[float] = ParametersONE.STREAM_FIRST_TOKEN_TIMEOUT,
+                 idle_timeout: Optional[float] = ParametersONE.STREAM_IDLE_TIMEOUT,
+                 total_timeout: Optional[float] = ParametersONE.STREAM_TOTAL_TIMEOUT):
+        self.first_token_timeout = first_token_timeout or None
+        self.idle_timeout = idle_timeout or None
+        self.total_timeout = total_timeout or None
+
+        self.started_at = time.monotonic()
+        self.first_chunk_at: Optional[float] = None
+        self.last_chunk_at: Optional[float] = None
+        self.stalled: Optional[StreamStalled] = None
+
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def beat(self) -> None:
+        """Record that a chunk arrived."""
+        now = time.monotonic()
+        if self.first_chunk_at is None:
+            self.first_chunk_at = now
+            metrics.observe("stream.time_to_first_token", now - self.started_at)
+        self.last_chunk_at = now
+
+    def remaining(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the nearest active deadline (None if none is set)."""
+        now = time.monotonic() if now is None else now
+        deadlines = []
+        if self.total_timeout:
+            deadlines.append(self.started_at + self.total_timeout)
+        if self.first_chunk_at is None:
+            if self.first_token_timeout:
+                deadlines.append(self.started_at + self.first_token_timeout)
+        elif self.idle_timeout:
+            deadlines.append(self.last_chunk_at + self.idle_timeout)
+        return max(min(deadlines) - now, 0.0) if deadlines else None
+
+    def check(self, now: Optional[float] = None) -> Optional[StreamStalled]:
+        """Return (and record) a StreamStalled if a deadline has passed."""
+        if self.stalled is not None:
+            return self.stalled
+        now = time.monotonic() if now is None else now
+
+        stall = None
+        if self.total_timeout and now - self.started_at > self.total_timeout:
+            stall = StreamStalled(self.TOTAL, now - self.started_at, self.total_timeout)
+        elif self.first_chunk_at is None:
+            if self.first_token_timeout and now - self.started_at > self.first_token_timeout:
+                stall = StreamStalled(self.FIRST_TOKEN, now - self.started_at, self.first_token_timeout)
+        elif self.idle_timeout and now - self.last_chunk_at > self.idle_timeout:
+            stall = StreamStalled(self.IDLE, now - self.last_chunk_at, self.idle_timeout)
+
+        if stall is not None:
+            self.stalled = stall
+            metrics.incr("stream.stalls")
+            metrics.incr(f"stream.stalls.{stall.phase}")
+        return stall
+
+    def start(self, close: Callable[[], None]) -> "StreamWatchdog":
+        """Watch a blocking stream from a daemon thread; ``close`` aborts it."""
+        if self.remaining() is None:
+            return self
+
+        def _watch():
+            while not self._done.is_set():
+                wait = self.remaining()
+                if self._done.wait(min(wait, 1.0) if wait is not None else 1.0):
+                    return
+                if self.check() is not None:
+                    try:
+                        close()
+                    except Exception:
+                        pass  # the reader sees the closed socket either way
+                    return
+
+        self._thread = threading.Thread(target=_watch, name="stream-watchdog", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop watching and record the stream duration."""
+        self._done.set()
+        metrics.observe("stream.duration", time.monotonic() - self.started_at)
@@ -1,197 +1,210 @@
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, TYPE_CHECKING
 
 from ParametersONE import ParametersONE
-from agentONE import AgentONE
+from ads.messageStore import MessageStore
+from ads.streamAccumulator import StreamAccumulator
+from ads.sseStream import SSEStreamingChat
+from ads.retryPolicy import RetryPolicy, StreamInterrupted
+from ads.repetitionGuard import RepetitionDetected
+from ads.streamSalvage import StreamSalvage
+from ads.streamWatchdog import StreamWatchdog
+from ads.metrics import metrics
+from ads.continuation import Continuation
+from ads.eventLog import events
+from ads.pipeline import pipeline
+
+if TYPE_CHECKING:  # avoids importing the whole agent for benchmarks / type hints only
+    from agentONE import AgentONE
 
 
 class StreamingChat:
 
     def kimi_k2_streaming_chat(
-            agent:AgentONE,
+            agent: "AgentONE",
             iteration:int,
-            # messages: List[Dict[str, Any]],
+            messages: List[Dict[str, Any]] = None,
             # tools: List[Dict] = None,
             # model: str = ParametersONE.MODEL,
             # max_tokens: int = ParametersONE.MAX_TOKENS,
             # temperature: float = ParametersONE.TEMPERATURE,
-    ) -> tuple[str, str, str, list | None]:
+    ) -> tuple[str, str, str, list | None, str | None]:
 
         # Call the model
         # try:
+            if ParametersONE.FAST_STREAM:
+                # Raw SSE + fast JSON → skips the per-chunk pydantic objects
+                return SSEStreamingChat.kimi_k2_streaming_chat(agent, iteration, messages)
+
             print("🤖 Calling AgentONE-thinking model...\n")
 
-            stream = agent.moonshotclient.client.chat.completions.create(
-                model=ParametersONE.MODEL,
-                messages=agent.messages,
-                max_tokens=ParametersONE.MAX_TOKENS,  # 64K tokens
-                tools=agent.tools,
-                temperature=ParametersONE.TEMPERATURE,  # 1.0,
-                stream=True,  # Enable streaming
-
-                tool_choice="auto",
-                # stream=True,
-
-            )
-
-            # Accumulate the streaming response
-            reasoning_content = ""
-            final_content = ""
-            tool_calls = []
-            # current_tool_calls = []  # in-progress
-            role = None
-            finish_reason = None
-
-            # Track if we've printed headers
-            reasoning_header = False
-            response_header = False
-            # tool_header = False
-            last_tool_index = -1
-
-            # Spinner for long argument generation
-            spinner = ["⣾", "⣽", "⣻", "⢿", "⡿", "⣟", "⣯", "⣷"]
-            spinner_idx = 0
-            print(f"\n🤖 调用 Kimi K2 模型... (第 {iteration} 次思考)\n")
-            # Process the stream
+            accumulator = StreamAccumulator(iteration)
+            watchdog = StreamWatchdog()
+            try:
+                stream = agent.moonshotclient.client.chat.completions.create(
+                    model=ParametersONE.MODEL,
+                    messages=MessageStore.hydrate(agent.messages if messages is None else messages),
+                    max_tokens=ParametersONE.MAX_TOKENS,  # 64K tokens
+                    tools=agent.tools,
+                    temperature=ParametersONE.TEMPERATURE,  # 1.0,
+                    stream=True,  # Enable streaming
+
+                    tool_choice="auto",
+                    # stream=True,
+
+                )
+
+                watchdog.start(stream.close)
+
+                print(f"\n🤖 调用 Kimi K2 模型... (第 {iteration} 次思考)\n")
+                StreamingChat.consume(stream, accumulator, watchdog)
+            except Exception as e:
+                if isinstance(e, RepetitionDetected):
+                    stream.close()  # stop generating (and paying for) the loop
+                # Hand the partial response to the retry / salvage layer
+                raise StreamInterrupted(watchdog.stalled or e, accumulator) from e
+            finally:
+                watchdog.stop()
+
+            if watchdog.stalled is not None:
+                # Closing the socket can also end the iteration quietly
+                raise StreamInterrupted(watchdog.stalled, accumulator)
+
+            return accumulator.result()
+
+    @staticmethod
+    def stream_with_retry(agent: "AgentONE", iteration: int, policy: RetryPolicy = None,
+                          messages: List[Dict[str, Any]] = None) -> tuple[str, str, str, list | None, str | None]:
+        """
+        kimi_k2_streaming_chat with salvage, backoff and a retry cap.
+
+        A broken stream first goes through StreamSalvage: complete tool calls are
+        returned as the response, partial text is kept in history. Transient
+        errors are then retried with jittered exponential backoff; fatal ones
+        (and the last transient one) are re-raised.
+
+        Returns:
+            Tuple of (role, final_content, reasoning_content, tool_calls, finish_reason)
+        """
+        policy = policy or RetryPolicy()
+        attempt = 0
+        while True:
+            pipeline.run("pre_request", agent, iteration, messages)
+            try:
+                return StreamingChat.kimi_k2_streaming_chat(agent, iteration, messages)
+            except StreamInterrupted as interrupted:
+                attempt += 1
+                metrics.incr("stream.interruptions")
+                if messages is not None and isinstance(interrupted.cause, RepetitionDetected):
+                    # A continuation that loops → keep its trimmed text and stop continuing
+                    return interrupted.accumulator.result()
+                # Explicit request messages (continuations) are not part of history → nothing to salvage into
+                salvaged = None if messages is not None else \
+                    StreamSalvage.salvage(agent, interrupted.accumulator, interrupted.cause)
+                if salvaged is not None:
+                    return salvaged
+
+                if policy.classify(interrupted) == RetryPolicy.FATAL or attempt > policy.max_retries:
+                    events.emit("stream_failed", iteration=iteration, attempt=attempt, error=str(interrupted))
+                    raise interrupted.cause
+
+                delay = policy.delay(attempt, interrupted)
+                print(f"\n⏳ Stream failed ({interrupted}) - retry {attempt}/{policy.max_retries} in {delay:.1f}s")
+                metrics.incr("stream.retries")
+                events.emit("stream_retry", iteration=iteration, attempt=attempt, delay_s=round(delay, 3),
+                            error=str(interrupted))
+                time.sleep(delay)
+
+    @staticmethod
+    def stream_with_continuation(agent: "AgentONE", iteration: int) -> tuple[str, str, str, list | None, str | None]:
+        """
+        stream_with_retry, then continue responses that stopped at max_tokens.
+
+        See ads.continuation.Continuation: truncated tool-call arguments (or text)
+        are completed with partial-mode requests before anything is executed.
+
+        Returns:
+            Tuple of (role, final_content, reasoning_content, tool_calls, finish_reason)
+        """
+        role, content, reasoning, tool_calls, finish_reason = StreamingChat.stream_with_retry(agent, iteration)
+        rounds = 0
+        while finish_reason == "length" and rounds < ParametersONE.MAX_CONTINUATIONS:
+            target = Continuation.target(content, tool_calls)
+            if target is None:
+                break  # tool calls are complete → run them as they are
+            rounds += 1
+            Continuation.announce(rounds, target, tool_calls)
+            metrics.incr("stream.continuations")
+            events.emit("stream_continuation", iteration=iteration, round=rounds, target=target[0])
+
+            request = Continuation.request_messages(agent.messages, Continuation.prefix(content, tool_calls, target))
+            _, more, _, _, finish_reason = StreamingChat.stream_with_retry(agent, iteration, messages=request)
+            if not more:
+                break  # the model did not continue the text → keep what we have
+            content = Continuation.stitch(content, tool_calls, target, more)
+
+        return role, content, reasoning, tool_calls, finish_reason
+
+    @staticmethod
+    def consume(stream, accumulator: StreamAccumulator,
+                watchdog: StreamWatchdog = None) -> StreamAccumulator:
+        """
+        Feed an OpenAI SDK chunk stream into the accumulator.
+
+        Args:
+            stream: Iterable of ``ChatCompletionChunk`` objects
+            accumulator: Accumulator receiving the deltas
+            watchdog: Optional watchdog told about every chunk
+
+        Returns:
+            The same accumulator, for chaining
+        """
+        if watchdog is None:
+            for chunk in stream:
+                StreamingChat.feed_chunk(chunk, accumulator)
+        else:
+            beat = watchdog.beat
             for chunk in stream:
-                if not chunk.choices:
-                    continue
-
-                delta = chunk.choices[0].delta
-                finish_reason = chunk.choices[0].finish_reason or finish_reason
-
-                # Get role if present (first chunk)
-                if hasattr(delta, "role") and delta.role:
-                    role = delta.role
-
-                # ==================== REASONING ====================
-                # if getattr(delta, "reasoning_content", None):
-                if hasattr(delta, "reasoning_content") and delta.reasoning_content:
-                    if not reasoning_header:
-                        print("=" * 60)
-                        print(f"🧠 Reasoning (Iteration {iteration})")
-                        print("=" * 60)
-                        reasoning_header = True
-
-                    print(delta.reasoning_content, end="", flush=True)
-                    reasoning_content += delta.reasoning_content
-
-                # ==================== FINAL CONTENT ====================
-
-                # if delta.content:
-                if hasattr(delta, "content") and delta.content:
-                    # Close reasoning section if it was open
-                    if reasoning_header and not response_header:
-                        print("\n" + "=" * 60 + "\n")
-
-                    if not response_header:
-                        print("💬 Response:")
-                        print("-" * 60)
-                        response_header = True
-
-                    print(delta.content, end="", flush=True)
-                    final_content += delta.content
-
-                # Handle tool_calls
-                if hasattr(delta, "tool_calls") and delta.tool_calls:
-                    for tc_delta in delta.tool_calls:
-                        idx = tc_delta.index
-                        # Initialize slot # Ensure we have enough slots in tool_calls
-                        while len(tool_calls) <= idx:
-                            tool_calls.append({
-                                "id": None,
-                                "type": "function",
-                                "function": {"name": "", "arguments": ""},
-                                "chars_received": 0
-                            })
-
-                        tc = tool_calls[idx]
-
-                        # Print header when we start receiving a tool call
-                        if idx != last_tool_index:
-                            if reasoning_header or response_header:
-                                print("\n" + "=" * 60 + "\n")
-
-                            if hasattr(tc_delta, "function") and tc_delta.function.name:
-                                print(f"🔧 Preparing tool call: {tc_delta.function.name}")
-                                print("─" * 60)
-                                tool_header = True
-                                last_tool_index = idx
-
-                        # ID
-                        if tc_delta.id:
-                            tc["id"] = tc_delta.id
-
-                        # Arguments streaming
-                        if hasattr(tc_delta, "function"):
-                            if tc_delta.function.name:
-                                tc["function"]["name"] = tc_delta.function.name
-                            if tc_delta.function.arguments:
-                                args = tc_delta.function.arguments
-                                tc["function"]["arguments"] += args
-                                # tc["chars_received"] += len(args)
-                                chars = len(tc["function"]["arguments"])
-
-                                # Live progress (exactly like real Kimi)
-                                words = chars // 5
-                                spinner_char = spinner[spinner_idx % 8]
-                                spinner_idx += 1
-                                print(f"\r{spinner_char} 生成参数中... {chars:,} 字符 ≈ {words:,} 词", end="",
-                                      flush=True)
-                                '''
-                                # Show progress indicator every 500 characters
-                                if chars % 500 == 0 or chars < 100:
-                                    # Calculate approximate words (rough estimate: 5 chars per word)
-                                    words = tc["chars_received"] // 5
-                                    print(f"\r💬 Generating arguments... {tc['chars_received']:,} characters (~{words:,} words)", end="", flush=True)
-                                '''
-
-            # =============== FINAL CLEANUP & SUMMARY ===============
-            print()  # final newline after spinner
-            '''
-            # Print closing for content if it was printed
-            if response_header:
-                print("\n" + "-" * 60 + "\n")
-
-            # Print completion for tool calls if any were received
-            if tool_header:
-                print("\n✓ Tool call complete")
-                print("─" * 60 + "\n")
-            '''
-
-            # Tool call completion summary (Kimi style)
-            if tool_calls and any(tc["function"]["name"] for tc in tool_calls):
-                print("\n✓ 工具调用完成")
-                for i, tc in enumerate(tool_calls):
-                    if tc["function"]["name"]:
-                        chars = len(tc["function"]["arguments"])
-                        words = chars // 5
-                        print(f"   {i + 1}. {tc['function']['name']} ({chars:,} 字符, ~{words:,} 词)")
-                print("─" * 50 + "\n")
-
-            # If final answer was empty (pure tool mode), show placeholder
-            if not final_content.strip() and finish_reason != "tool_calls":
-                print("（模型正在处理工具结果...）")
-            """
-            # Format final tool_calls exactly as OpenAI spec
-            tool_calls_final = None
-            if completed_tools:
-                tool_calls_final = [
-                    {
-                        "id": tc["id"],
-                        "type": "function",
-                        "function": {
-                            "name": tc["function"]["name"],
-                            "arguments": tc["function"]["arguments"]
-                        }
-                    }
-                    for tc in completed_tools
-                ]
-            """
-
-            return (
-                role,  # "assistant"
-                final_content,  # Visible answer
-                reasoning_content,  # Hidden o1-style reasoning
-                # tool_calls_final,  # None or list of full tool calls
-                tool_calls  # None or list of full tool calls
-            )
\ No newline at end of file
+                beat()
+                StreamingChat.feed_chunk(chunk, accumulator)
+        return accumulator
+
+    @staticmethod
+    def feed_chunk(chunk, accumulator: StreamAccumulator) -> None:
+        """Feed a single SDK ``ChatCompletionChunk`` (sync or async stream) into the accumulator."""
+        if not chunk.choices:
+            return
+
+        choice = chunk.choices[0]
+        delta = choice.delta
+        if choice.finish_reason:
+            accumulator.on_finish(choice.finish_reason)
+            # Moonshot reports usage on the final choice, OpenAI on the chunk
+            usage = getattr(choice, "usage", None) or getattr(chunk, "usage", None)
+            if usage:
+                accumulator.on_usage(usage if isinstance(usage, dict) else usage.model_dump())
+
+        # Get role if present (first chunk)
+        if delta.role:
+            accumulator.on_role(delta.role)
+
+        # ==================== REASONING ====================
+        # reasoning_content is a Moonshot extension → not a declared field
+        reasoning = getattr(delta, "reasoning_content", None)
+        if reasoning:
+            accumulator.on_reasoning(reasoning)
+
+        # ==================== FINAL CONTENT ====================
+        if delta.content:
+            accumulator.on_content(delta.content)
+
+        # Handle tool_calls
+        if delta.tool_calls:
+            for tc_delta in delta.tool_calls:
+                function = tc_delta.function
+                accumulator.on_tool_call(
+                    tc_delta.index,
+                    tc_delta.id,
+                    function.name if function else None,
+                    function.arguments if function else None,
+                )
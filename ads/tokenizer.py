@@ -1,13 +1,20 @@
 # tokenizer.py
 import tiktoken
 
+from ads.messageStore import MessageStore
+
 _encoder = tiktoken.get_encoding("cl100k_base")
 
 def estimate_tokens(messages) -> int:
     """Rough but safe token estimation"""
     total = 0
-    for msg in messages:
+    for msg in MessageStore.hydrate(messages):
         for key, value in msg.items():
             if isinstance(value, str):
                 total += len(_encoder.encode(value)) + 4
-    return int(total * 1.1)  # +10% safety margin
\ No newline at end of file
+    return int(total * 1.1)  # +10% safety margin
+
+
+def count_tokens(text: str) -> int:
+    """Token count of a single string"""
+    return len(_encoder.encode(text))
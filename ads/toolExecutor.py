@@ -0,0 +1,129 @@
+# toolExecutor.py
+"""
+Dependency-aware execution of the tool calls of one model turn.
+
+Each call gets a set of conflict keys from its tool's concurrency class (see
+tools/registry.py): pure tools touch nothing, IO tools the file they name,
+project-wide readers (``search_project``) every file (the wildcard key
+``file:*``, which conflicts with any file key but not with another wildcard).
+Consecutive calls with disjoint keys form a wave and run concurrently on a
+bounded thread pool; a call that conflicts with the current wave starts the
+next one. Stateful tools (``create_project`` switches the project,
+``compress_context`` rewrites history) have no key set and always run alone,
+on the calling thread. Results come back in the original order.
+"""
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, FrozenSet, List, Optional
+
+from ParametersONE import ParametersONE
+from tools.registry import ToolSpec
+
+ALL_FILES = "file:*"  # key of project-wide readers
+
+
+class ToolExecutor:
+
+    def __init__(self, max_workers: int = ParametersONE.TOOL_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def conflict_keys(spec: ToolSpec, args: dict) -> Optional[FrozenSet[str]]:
+        """
+        Resources a tool call touches.
+
+        Args:
+            spec: The tool's registry entry
+            args: Parsed call arguments
+
+        Returns:
+            A set of keys (calls with disjoint sets may run together), or None
+            for calls that must run alone
+        """
+        if spec.concurrency == ToolSpec.PURE:
+            return frozenset()
+        if spec.concurrency == ToolSpec.PROJECT:
+            return frozenset({ALL_FILES})
+        if spec.concurrency == ToolSpec.IO and spec.path_arg:
+            filename = args.get(spec.path_arg)
+            if isinstance(filename, str) and filename:
+                filename = os.path.basename(filename)
+                if not filename.endswith(".md"):
+                    filename += ".md"
+                # Case-insensitive: 'Chapter1.md' and 'chapter1.md' are one file on some filesystems
+                return frozenset({f"file:{filename.lower()}"})
+        return None
+
+    @staticmethod
+    def _conflicts(call_keys: FrozenSet[str], used: set) -> bool:
+        """Shared keys conflict, and so does the wildcard with any file key (reads never block reads)."""
+        if used & (call_keys - {ALL_FILES}):
+            return True
+        if ALL_FILES in call_keys and any(key.startswith("file:") and key != ALL_FILES for key in used):
+            return True
+        return ALL_FILES in used and any(key.startswith("file:") and key != ALL_FILES for key in call_keys)
+
+    @staticmethod
+    def waves(keys: List[Optional[FrozenSet[str]]]) -> List[List[int]]:
+        """
+        Split calls (by index) into waves that can each run concurrently.
+
+        Order is preserved: a call never runs before an earlier call it conflicts with.
+        """
+        waves: List[List[int]] = []
+        current: List[int] = []
+        used: set = set()
+        for idx, call_keys in enumerate(keys):
+            if call_keys is None or ToolExecutor._conflicts(call_keys, used):
+                if current:
+                    waves.append(current)
+                current, used = [], set()
+            if call_keys is None:
+                waves.append([idx])
+                continue
+            current.append(idx)
+            used |= call_keys
+        if current:
+            waves.append(current)
+        return waves
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tool")
+            return self._pool
+
+    def run(self, tasks: List[Callable[[], Any]], keys: List[Optional[FrozenSet[str]]]) -> List[Any]:
+        """
+        Run the tasks wave by wave.
+
+        Tasks are expected to handle their own errors. Pool threads run each task
+        in a copy of the caller's context, so the active project folder and the
+        bound event fields are the caller's.
+
+        Args:
+            tasks: One zero-argument callable per tool call
+            keys: Conflict keys per call (see conflict_keys)
+
+        Returns:
+            The task results, in task order
+        """
+        results: List[Any] = [None] * len(tasks)
+        for wave in self.waves(keys):
+            if len(wave) == 1 or self.max_workers <= 1:
+                for idx in wave:
+                    results[idx] = tasks[idx]()
+                continue
+            pool = self._get_pool()
+            futures = [(idx, pool.submit(contextvars.copy_context().run, tasks[idx])) for idx in wave]
+            for idx, future in futures:
+                results[idx] = future.result()
+        return results
+
+
+# ← Process-wide instance shared by all sessions (bounded pool)
+tool_executor = ToolExecutor()
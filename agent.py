@@ -16,18 +16,21 @@ from pathlib import Path
 from dotenv import load_dotenv
 
 
-from MessageConverter import MessageConverter
 from ReconstructedMessage import ReconstructedMessage
 
 from ParametersONE import ParametersONE
 from UserInputHandler import UserInputHandler
 from ads.streamingChat import StreamingChat
+from ads.reasoningRetention import ReasoningRetention
 from agentONE import AgentONE
 from utilsONE import UtilsONE
 from ads.systemPrompt import SystemPrompt
+from ads.eventLog import events, elapsed_since
+from ads.pipeline import pipeline
 # Load environment variables from .env file
 load_dotenv()
 
+import time
 from tools.compression import compress_context_impl
 
 # write a short story with the style of murakami in 1Q84
@@ -37,37 +40,50 @@ signal.signal(signal.SIGTERM, UtilsONE.graceful_shutdown)  # Docker stop / k8s k
 
 def main():
 
-    agent = AgentONE()
-
     handler = UserInputHandler()
     user_prompt, is_recovery = handler.get_input()
+    if handler.headless:
+        events.enable_headless(handler.events_file)
+
+    agent = AgentONE()
     agent.append_prompt(user_prompt, is_recovery)
 
 
     # Main agent loop - outer loop for multiple iterations of the conversation or task
-    # This simulates a long-running agent or chat session where context builds up over time
+    # This simulates a long-running agent or chat session where context builds up over time.
+    # Every step runs as a timed pipeline stage; middleware hooks in via ads/pipeline.py
     for iteration in range(1, ParametersONE.MAX_ITERATIONS + 1):
-        agent.check_and_compress()
+        iteration_start = time.monotonic()
+        events.emit("iteration_start", iteration=iteration, messages=len(agent.messages))
+        # Condense old chain-of-thought before it is counted and resent
+        with pipeline.stage("retain_reasoning", iteration):
+            ReasoningRetention.apply(agent.messages)
+        with pipeline.stage("compress", iteration):
+            agent.check_and_compress()
         # --------------------------------------------------------------------------------------------------------------
         # Auto-backup every N iterations
         if iteration % ParametersONE.BACKUP_INTERVAL == 0:
-            agent.backup_and_compress(iteration)
+            with pipeline.stage("backup", iteration):
+                agent.backup_and_compress(iteration)
 
         # Call the model
         try:
 
-            role, final_content, reasoning_content, tool_calls = StreamingChat.kimi_k2_streaming_chat(agent, iteration)
-
-            # Reconstruct the message object from accumulated data
-            rcmessage = ReconstructedMessage(role or "assistant", final_content, reasoning_content, tool_calls)
-            # Convert message to dict and add to history
-            # Important: preserve the full message object structure
-            agent.messages.append(MessageConverter.convert(rcmessage))
-
-
-            rcmessage.handle_tool_calls(agent, iteration)
+            with pipeline.stage("stream", iteration):
+                role, final_content, reasoning_content, tool_calls, finish_reason = \
+                    StreamingChat.stream_with_continuation(agent, iteration)
 
+            with pipeline.stage("reconstruct", iteration):
+                # Reconstruct the message object from accumulated data
+                rcmessage = ReconstructedMessage(role or "assistant", final_content, reasoning_content, tool_calls)
+                # Add to history (the ChatMessage keeps reasoning and tool calls as streamed)
+                agent.messages.append(rcmessage.message)
+                pipeline.run("post_stream", agent, iteration, rcmessage.message)
 
+            with pipeline.stage("tools", iteration):
+                rcmessage.handle_tool_calls(agent, iteration)
+            events.emit("iteration_end", iteration=iteration, duration_s=elapsed_since(iteration_start),
+                        messages=len(agent.messages))
 
         except KeyboardInterrupt:
             UtilsONE.graceful_shutdown(agent)
@@ -75,6 +91,8 @@ def main():
         except Exception as e:
             print(f"\n✗ Error during iteration {iteration}: {e}")
             print(f"Attempting to continue...\n")
+            events.emit("iteration_error", iteration=iteration, duration_s=elapsed_since(iteration_start),
+                        error=f"{type(e).__name__}: {e}")
             continue
     
     # If we hit max iterations
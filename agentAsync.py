@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+AgentONE Writing Agent - asyncio edition.
+
+Same loop as agent.py, but built on AsyncOpenAI: network waits, token
+estimation, compression and chapter writes never block the event loop, so
+many AgentONE sessions can run concurrently in one process and share one
+connection pool. Ctrl+C / SIGTERM cancel every session cooperatively; each
+session dumps its history before it stops.
+"""
+
+import asyncio
+import signal
+import time
+from datetime import datetime
+from typing import List, Tuple
+
+from dotenv import load_dotenv
+
+from ReconstructedMessage import ReconstructedMessage
+
+from ParametersONE import ParametersONE
+from UserInputHandler import UserInputHandler
+from ads.asyncStreamingChat import AsyncStreamingChat
+from ads.reasoningRetention import ReasoningRetention
+from ads.MoonshotClient import MoonshotClient
+from ads.eventLog import events, elapsed_since
+from ads.pipeline import pipeline
+from agentONE import AgentONE
+from utilsONE import UtilsONE
+from tools.writeback import write_behind
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+async def run_session(agent: AgentONE, render: bool = True, label: str = "session") -> int:
+    """
+    Drive one agent until it completes, hits MAX_ITERATIONS or is cancelled.
+
+    Args:
+        agent: Session with its prompt already appended
+        render: Print the live stream (disable when several sessions share a console)
+        label: Name used in log lines and in the emergency dump filename
+
+    Returns:
+        The last iteration run
+    """
+    iteration = 0
+    events.bind(session=label)  # this task's context only
+    try:
+        for iteration in range(1, ParametersONE.MAX_ITERATIONS + 1):
+            iteration_start = time.monotonic()
+            events.emit("iteration_start", iteration=iteration, messages=len(agent.messages))
+            # Condense old chain-of-thought before it is counted and resent
+            with pipeline.stage("retain_reasoning", iteration):
+                ReasoningRetention.apply(agent.messages)
+            with pipeline.stage("compress", iteration):
+                await agent.check_and_compress_async()
+
+            # Auto-backup every N iterations
+            if iteration % ParametersONE.BACKUP_INTERVAL == 0:
+                with pipeline.stage("backup", iteration):
+                    await asyncio.to_thread(agent.backup_and_compress, iteration)
+
+            try:
+                with pipeline.stage("stream", iteration):
+                    role, final_content, reasoning_content, tool_calls, finish_reason = \
+                        await AsyncStreamingChat.stream_with_continuation(agent, iteration, render=render)
+
+                with pipeline.stage("reconstruct", iteration):
+                    rcmessage = ReconstructedMessage(role or "assistant", final_content, reasoning_content, tool_calls)
+                    agent.messages.append(rcmessage.message)
+                    pipeline.run("post_stream", agent, iteration, rcmessage.message)
+
+                with pipeline.stage("tools", iteration):
+                    done = await rcmessage.handle_tool_calls_async(agent, iteration, render=render)
+                events.emit("iteration_end", iteration=iteration,
+                            duration_s=elapsed_since(iteration_start), messages=len(agent.messages))
+                if done:
+                    return iteration
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"\n✗ [{label}] Error during iteration {iteration}: {e}")
+                print(f"Attempting to continue...\n")
+                events.emit("iteration_error", iteration=iteration,
+                            duration_s=elapsed_since(iteration_start), error=f"{type(e).__name__}: {e}")
+                continue
+
+        print(f"\n⚠️  [{label}] MAX ITERATIONS REACHED ({ParametersONE.MAX_ITERATIONS})")
+        return iteration
+
+    except asyncio.CancelledError:
+        # Cooperative cancellation: persist what we have, then let the cancel propagate
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        dump_path = f"backups/CANCELLED_{label}_{timestamp}.json"
+        try:
+            await asyncio.to_thread(UtilsONE.dump_raw_messages, agent.messages, dump_path)
+            print(f"\n⏹  [{label}] Cancelled at iteration {iteration} → history saved to {dump_path}")
+        except Exception as e:
+            print(f"\n⏹  [{label}] Cancelled at iteration {iteration} (history dump failed: {e})")
+        raise
+
+
+async def run_sessions(requests: List[Tuple[str, bool]]) -> list:
+    """
+    Run several writing sessions concurrently in one event loop.
+
+    Args:
+        requests: List of (prompt_or_recovered_context, is_recovery)
+
+    Returns:
+        Per session: last iteration, or the exception that ended it
+    """
+    agents = []
+    for user_prompt, is_recovery in requests:
+        agent = AgentONE()
+        agent.append_prompt(user_prompt, is_recovery)
+        agents.append(agent)
+
+    render = len(agents) == 1 and not ParametersONE.HEADLESS
+    tasks = [
+        asyncio.create_task(run_session(agent, render=render, label=f"session{idx}"))
+        for idx, agent in enumerate(agents, start=1)
+    ]
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, lambda: [task.cancel() for task in tasks])
+        except (NotImplementedError, RuntimeError):
+            pass  # e.g. Windows → KeyboardInterrupt still ends asyncio.run
+
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await asyncio.to_thread(write_behind.close)
+        await MoonshotClient.aclose_shared()
+
+
+def main():
+    handler = UserInputHandler()
+    user_prompt, is_recovery = handler.get_input()
+    if handler.headless:
+        events.enable_headless(handler.events_file)
+    asyncio.run(run_sessions([(user_prompt, is_recovery)]))
+
+
+if __name__ == "__main__":
+    main()
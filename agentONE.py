@@ -1,5 +1,4 @@
-
-
+import asyncio
 import os
 import sys
 import json
@@ -33,6 +32,10 @@ from ads.MessageBuilder import MessageBuilder
 from ads.tokenizer import estimate_tokens
 from ads.ContextCompressor import ContextCompressor
 from ads.UserInput import UserInput
+from ads.eventLog import events
+from ads.pipeline import pipeline
+from ads.chatMessage import ChatMessage
+from ads.messageStore import BlobStore, MessageStore
 
 
 
@@ -45,12 +48,26 @@ class AgentONE:
         self.moonshotclient = MoonshotClient()
         self.projectmanager = projectmanager
         self.toolmap = ToolMap()
+        pipeline.load_plugins(ParametersONE.PIPELINE_PLUGINS)
         self.compressor = ContextCompressor(self.moonshotclient.client)
         self.tools = self.toolmap.get_tool_definitions()
         self.tool_map = self.toolmap.get_tool_map()
         # self.tool_map = get_tool_map(client=self.client.client, messages=self.messages, compressor=self.compressor)
 
-        self.messages = [{"role": "system", "content": SystemPrompt.get_system_prompt()}]
+        # Large message fields are spilled to an on-disk blob file (see ads/messageStore.py)
+        self.blobs = BlobStore() if ParametersONE.MESSAGE_SPILL else None
+        self.messages = [ChatMessage.system(SystemPrompt.get_system_prompt())]
+
+    @property
+    def messages(self) -> MessageStore:
+        return self._messages
+
+    @messages.setter
+    def messages(self, messages) -> None:
+        # Lists assigned after compression are wrapped again, so new large fields keep spilling
+        if not (isinstance(messages, MessageStore) and messages.blobs is self.blobs):
+            messages = MessageStore(messages, self.blobs)
+        self._messages = messages
 
 
     def append_prompt(self, user_prompt, is_recovery) -> None:
@@ -59,10 +76,9 @@ class AgentONE:
 
         self.user_prompt = user_prompt
         self.is_recovery = is_recovery
-        self.messages.append({
-            "role": "user",
-            "content": f"[RECOVERED CONTEXT]\n{self.user_prompt}\n[END]" if self.is_recovery else self.user_prompt
-        })
+        self.messages.append(ChatMessage.user(
+            f"[RECOVERED CONTEXT]\n{self.user_prompt}\n[END]" if self.is_recovery else self.user_prompt
+        ))
 
         self.start_print()
 
@@ -167,6 +183,8 @@ class AgentONE:
             # ------------------------------------------------------------------
             self._rotate_backups(ParametersONE.BACKUP_DIR, keep_last=5)
 
+            events.emit("backup", ok=True, iteration=iteration, path=str(backup_path),
+                        summary_file=str(summary_file), messages=len(self.messages))
             print(f"✓ Context auto-saved → {backup_path.name}")
             print(f"   📁 Location: {backup_path.resolve()}")
             print(f"   ⚡ Ratio: ~{backup_data['compression_ratio']:.2f}x | "
@@ -178,6 +196,7 @@ class AgentONE:
             # if compression_result.get("summary_file"):
             # print(f"✓ Backup saved: {os.path.basename(compression_result['summary_file'])}\n")
         except Exception as e:
+            events.emit("backup", ok=False, iteration=iteration, error=f"{type(e).__name__}: {e}")
             print(f"⚠️  Auto-backup failed: {e}")
             print("   Continuing without backup...\n")
 
@@ -273,6 +292,7 @@ class AgentONE:
 
             if tokens >= ParametersONE.COMPRESSION_THRESHOLD:
                 # print(f"\n⚠️  Approaching token limit! Compressing context...")
+                pipeline.run("pre_compress", self, tokens)
                 compression_result = compress_context_impl(
                     messages=self.messages,
                     client=self.moonshotclient.client,
@@ -285,11 +305,45 @@ class AgentONE:
 
                     tokens = UtilsONE.estimate_token_count(self.moonshotclient.base_url, self.moonshotclient.api_key,
                                                            ParametersONE.MODEL, self.messages)
+                pipeline.run("post_compress", self, compression_result)
 
 
         except Exception as e:
             print(f"⚠️  Warning: Could not estimate token count: {e}")
 
+    async def check_and_compress_async(self) -> None:
+        """
+        asyncio variant of check_and_compress.
+
+        Token estimation goes through the shared async pool; the summarization call
+        runs in a worker thread so other sessions keep streaming meanwhile.
+        """
+        try:
+            tokens = await UtilsONE.estimate_token_count_async(
+                self.moonshotclient.base_url, self.moonshotclient.api_key, ParametersONE.MODEL, self.messages,
+                http_client=MoonshotClient.shared_async_http_client())
+            print(
+                f"📊 Current tokens: {tokens:,}/{ParametersONE.TOKEN_LIMIT:,} ({tokens / ParametersONE.TOKEN_LIMIT * 100:.1f}%)")
+
+            if tokens >= ParametersONE.COMPRESSION_THRESHOLD:
+                pipeline.run("pre_compress", self, tokens)
+                compression_result = await asyncio.to_thread(
+                    compress_context_impl,
+                    messages=self.messages,
+                    client=self.moonshotclient.client,
+                    model=ParametersONE.MODEL,
+                    keep_recent=10
+                )
+
+                if "compressed_messages" in compression_result:
+                    self.messages = compression_result["compressed_messages"]
+                pipeline.run("post_compress", self, compression_result)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️  Warning: Could not estimate token count: {e}")
+
 
 
 
@@ -1,15 +1,24 @@
 """
 Tools module for the Kimi Writing Agent.
 Exports all available tools for the agent to use.
+
+Tool modules are imported on first attribute access, so importing the
+package (or tools.registry) stays cheap.
 """
 
-from .writer import write_chapter_impl
-from .project import create_project_impl
-from .compression import compress_context_impl
+import importlib
+
+_EXPORTS = {
+    'write_chapter_impl': '.writer',
+    'write_chapter_impl_async': '.writer',
+    'create_project_impl': '.project',
+    'compress_context_impl': '.compression',
+}
+
+__all__ = list(_EXPORTS)
 
-__all__ = [
-    'write_chapter_impl',
-    'create_project_impl', 
-    'compress_context_impl',
-]
 
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,9 +4,14 @@ Context compression tool for managing conversation history.
 
 import os
 import json
+import time
 from datetime import datetime
 from typing import List, Dict, Any
 from .project import get_active_project_folder
+from ParametersONE import ParametersONE
+from ads.eventLog import events, elapsed_since
+from ads.messageStore import MessageStore
+from ads.pipeline import pipeline
 
 
 def compress_context_impl(
@@ -48,11 +53,12 @@ def compress_context_impl(
     # Separate system message, messages to compress, and recent messages
     system_message = messages[0] if messages and messages[0].get("role") == "system" else None
     
+    # Only the messages being summarized are read back from the blob store
     if system_message:
-        messages_to_compress = messages[1:-keep_recent]
+        messages_to_compress = MessageStore.hydrate(messages[1:-keep_recent])
         recent_messages = messages[-keep_recent:]
     else:
-        messages_to_compress = messages[:-keep_recent]
+        messages_to_compress = MessageStore.hydrate(messages[:-keep_recent])
         recent_messages = messages[-keep_recent:]
     
     # Create a detailed prompt for summarization
@@ -100,6 +106,7 @@ Conversation history to summarize:
             conversation_text += f"\n[User]: {content}\n"
     
     # Call the API to get summary
+    compression_start = time.monotonic()
     try:
         summary_response = client.chat.completions.create(
             model=model,
@@ -114,6 +121,8 @@ Conversation history to summarize:
         summary = summary_response.choices[0].message.content
         
     except Exception as e:
+        events.emit("compression", ok=False, duration_s=elapsed_since(compression_start),
+                    messages_before=len(messages), error=f"{type(e).__name__}: {e}")
         return {
             "compressed_messages": messages,
             "summary_file": None,
@@ -162,6 +171,10 @@ Conversation history to summarize:
     original_length = sum(len(str(m)) for m in messages_to_compress)
     compressed_length = len(summary)
     estimated_tokens_saved = (original_length - compressed_length) // 4  # Rough estimate
+
+    events.emit("compression", ok=True, duration_s=elapsed_since(compression_start),
+                messages_before=len(messages), messages_after=len(compressed_messages),
+                tokens_saved=estimated_tokens_saved, summary_file=summary_file)
     
     return {
         "compressed_messages": compressed_messages,
@@ -172,3 +185,35 @@ Conversation history to summarize:
         "message": f"Successfully compressed {len(messages_to_compress)} messages. Summary saved to {os.path.basename(summary_file)}."
     }
 
+
+
+def compress_context_tool(agent) -> str:
+    """
+    Handler of the compress_context tool: compresses the agent's history and
+    swaps in the result.
+
+    Args:
+        agent: The session whose ``messages`` are compressed
+
+    Returns:
+        The result message for the model
+    """
+    print("     Performing intelligent context compression...")
+    pipeline.run("pre_compress", agent, None)
+    compression_result = compress_context_impl(
+        messages=agent.messages,
+        client=agent.moonshotclient.client,
+        model=ParametersONE.MODEL,
+        keep_recent=10,
+    )
+
+    if compression_result.get("compressed_messages"):
+        _old_len = len(agent.messages)
+        agent.messages = compression_result["compressed_messages"]
+        saved = _old_len - len(agent.messages)
+        ratio = compression_result.get("compression_ratio", 1.0)
+        print(f"     Context compressed: {_old_len} → {len(agent.messages)} messages "
+              f"(-{saved}, ~{ratio:.2f}x)")
+    pipeline.run("post_compress", agent, compression_result)
+
+    return compression_result.get("message", "Compression completed")
@@ -0,0 +1,233 @@
+"""
+Targeted chapter editing tool.
+
+Revising one paragraph with write_chapter means resending the whole chapter
+in 'overwrite' mode. edit_chapter takes a list of small operations instead:
+
+- ``replace``: exact search/replace block (the search text must occur once)
+- ``replace_section``: new body for the section under a Markdown heading
+- ``insert_section``: new text before or after a heading's section
+- ``diff``: a unified diff, applied hunk by hunk against its context lines
+
+All operations are applied in memory first; if any of them does not apply
+(text not found, ambiguous match, context mismatch) nothing is written. The
+file is then replaced atomically, and the previous version is kept in the
+chapter's revision history (tools/revisions.py).
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .project import get_active_project_folder
+from .manifest import record_write
+from .revisions import record_revision
+from .search import notify_write
+from .writeback import atomic_write, write_behind
+from .writer import hash_index
+
+_HEADING = re.compile(r'^(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$')
+_HUNK = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+
+class EditConflict(Exception):
+    """An edit operation does not apply to the current text."""
+
+
+def _norm_heading(text: str) -> str:
+    return " ".join(text.strip().lstrip('#').split()).lower()
+
+
+def _find_section(lines: List[str], heading: str) -> Tuple[int, int, int]:
+    """
+    Locate the section under a heading.
+
+    Returns:
+        (heading line index, first body line, end line (exclusive)); the section
+        ends at the next heading of the same or a higher level
+    """
+    wanted = _norm_heading(heading)
+    matches = []
+    for idx, line in enumerate(lines):
+        match = _HEADING.match(line)
+        if match and _norm_heading(match.group(2)) == wanted:
+            matches.append((idx, len(match.group(1))))
+    if not matches:
+        raise EditConflict(f"heading '{heading}' not found")
+    if len(matches) > 1:
+        raise EditConflict(f"heading '{heading}' occurs {len(matches)} times")
+
+    start, level = matches[0]
+    end = len(lines)
+    for idx in range(start + 1, len(lines)):
+        match = _HEADING.match(lines[idx])
+        if match and len(match.group(1)) <= level:
+            end = idx
+            break
+    return start, start + 1, end
+
+
+def _splice(lines: List[str], start: int, end: int, text: str) -> None:
+    """Put ``text`` in place of ``lines[start:end]``, with exactly one blank line on either side."""
+    block = text.strip("\n").split("\n")
+    if start > 0 and lines[start - 1].strip():
+        block.insert(0, "")
+    if end >= len(lines) or lines[end].strip():
+        block.append("")
+    lines[start:end] = block
+
+
+def _replace(text: str, search: str, replacement: str) -> str:
+    if not search:
+        raise EditConflict("'search' is empty")
+    count = text.count(search)
+    if count == 0:
+        raise EditConflict(f"search text not found: {search[:80]!r}")
+    if count > 1:
+        raise EditConflict(f"search text occurs {count} times, add surrounding text to make it unique: "
+                           f"{search[:80]!r}")
+    return text.replace(search, replacement, 1)
+
+
+def _replace_section(text: str, heading: str, content: str) -> str:
+    lines = text.split("\n")
+    _start, body, end = _find_section(lines, heading)
+    _splice(lines, body, end, content)
+    return "\n".join(lines)
+
+
+def _insert_section(text: str, heading: str, content: str, position: str) -> str:
+    lines = text.split("\n")
+    start, _body, end = _find_section(lines, heading)
+    at = start if position == "before" else end
+    # The blank lines around the insertion point are rebuilt by _splice
+    while position == "after" and at > start + 1 and not lines[at - 1].strip():
+        at -= 1
+    _splice(lines, at, at, content)
+    return "\n".join(lines)
+
+
+def _apply_diff(text: str, diff: str) -> str:
+    """Apply a unified diff; each hunk must match its context (near its line number, or uniquely)."""
+    lines = text.split("\n")
+    hunks: List[Tuple[int, List[str], List[str]]] = []
+    current: Optional[Tuple[int, List[str], List[str]]] = None
+    for line in diff.split("\n"):
+        header = _HUNK.match(line)
+        if header:
+            current = (int(header.group(1)), [], [])
+            hunks.append(current)
+        elif current is None or line.startswith(("---", "+++", "\\")):
+            continue
+        elif line.startswith("-"):
+            current[1].append(line[1:])
+        elif line.startswith("+"):
+            current[2].append(line[1:])
+        else:
+            # Context line (a bare empty line is an empty context line)
+            current[1].append(line[1:])
+            current[2].append(line[1:])
+    if not hunks:
+        raise EditConflict("no hunks ('@@ -a,b +c,d @@') found in the diff")
+
+    offset = 0
+    for number, (old_start, old, new) in enumerate(hunks, start=1):
+        # Trailing empty context lines are usually an artifact of the diff's last newline
+        while old and new and old[-1] == "" and new[-1] == "":
+            old.pop()
+            new.pop()
+        expected = max(old_start - 1 + offset, 0)
+        if lines[expected:expected + len(old)] == old:
+            at = expected
+        else:
+            positions = [i for i in range(len(lines) - len(old) + 1) if lines[i:i + len(old)] == old]
+            if len(positions) != 1:
+                problem = "does not match the file" if not positions else f"matches {len(positions)} places"
+                raise EditConflict(f"hunk {number} (line {old_start}) {problem}")
+            at = positions[0]
+        lines[at:at + len(old)] = new
+        offset += (at - expected) + len(new) - len(old)
+    return "\n".join(lines)
+
+
+def apply_edits(text: str, edits: List[Dict[str, Any]]) -> str:
+    """
+    Apply edit operations in order.
+
+    Raises:
+        EditConflict: If an operation does not apply (message names the operation)
+    """
+    for number, edit in enumerate(edits, start=1):
+        if not isinstance(edit, dict):
+            raise EditConflict(f"edit {number} must be an object")
+        op = edit.get("op")
+        try:
+            if op == "replace":
+                text = _replace(text, edit.get("search") or "", edit.get("replace") or "")
+            elif op == "replace_section":
+                text = _replace_section(text, edit.get("heading") or "", edit.get("content") or "")
+            elif op == "insert_section":
+                position = edit.get("position") or "after"
+                if position not in ("before", "after"):
+                    raise EditConflict("'position' must be 'before' or 'after'")
+                text = _insert_section(text, edit.get("heading") or "", edit.get("content") or "", position)
+            elif op == "diff":
+                text = _apply_diff(text, edit.get("diff") or "")
+            else:
+                raise EditConflict(f"unknown op '{op}' (use replace, replace_section, insert_section or diff)")
+        except EditConflict as e:
+            raise EditConflict(f"edit {number} ({op}): {e}") from None
+    return text
+
+
+def edit_chapter_impl(filename: str, edits: List[Dict[str, Any]]) -> str:
+    """
+    Applies targeted edits to a markdown file in the active project folder.
+
+    Args:
+        filename: The name of the file to edit
+        edits: Edit operations (see module docstring), applied in order
+
+    Returns:
+        A short confirmation or an error message; on error nothing is written
+    """
+    project_folder = get_active_project_folder()
+    if not project_folder:
+        return "Error: No active project folder. Please create a project first using create_project."
+
+    filename = os.path.basename(filename)
+    if not filename.endswith('.md'):
+        filename = filename + '.md'
+    file_path = os.path.abspath(os.path.join(project_folder, filename))
+    if not edits:
+        return "Error: No edits given."
+
+    try:
+        write_behind.flush(file_path)
+        if not os.path.exists(file_path):
+            return f"Error: File '{filename}' does not exist. Use write_chapter to create it."
+
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            original = f.read()
+        try:
+            edited = apply_edits(original, edits)
+        except EditConflict as e:
+            return f"Error: Could not edit '{filename}', nothing was changed: {e}."
+
+        if edited == original:
+            return f"No changes: the edits leave '{filename}' as it is; nothing was written."
+
+        # Atomic replace: readers never see a half-written chapter
+        data = edited.encode('utf-8')
+        record_revision(file_path, original.encode('utf-8'), "edit")
+        atomic_write(file_path, data)
+        hash_index.wrote(file_path, data)
+        notify_write(file_path)
+        record_write(file_path, "edit", data, edited)
+
+        delta = len(edited) - len(original)
+        return (f"Successfully applied {len(edits)} edit{'s' if len(edits) != 1 else ''} to '{filename}' "
+                f"({delta:+,} characters, now {len(edited):,}).")
+
+    except Exception as e:
+        return f"Error editing file '{filename}': {str(e)}"
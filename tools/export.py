@@ -0,0 +1,434 @@
+"""
+Manuscript export: compile a project's chapters into deliverables.
+
+    python -m tools.export my_novel other_project    # folders in output/, or paths
+    python -m tools.export --all --format md epub --jobs 4
+
+For every project three outputs can be built in ``<project>/export/``:
+
+- ``<project>.md``: all chapters in one Markdown file
+- ``<project>.epub``: an EPUB 3 book, one XHTML document per chapter
+- ``<project>.zip``: the chapter sources
+
+Chapter order comes from the outline when there is one (the order in which
+``outline*.md`` names chapter files), then natural name order
+(chapter_2 before chapter_10). Outlines, notes and ``.partial.md`` files are
+left out of the manuscript (``EXPORT_EXCLUDE``).
+
+Chapters are streamed, never loaded whole: Markdown is copied in blocks, the
+EPUB is converted line by line into zip members written as they are produced.
+Each output remembers a fingerprint of its inputs (names, order and content
+hashes from the project manifest) and is only rebuilt when that changes.
+Projects are exported in parallel on a thread pool; compression and file I/O
+release the GIL.
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ParametersONE import ParametersONE
+from .manifest import manifest_for
+from .writeback import create_temp
+
+FORMATS = ("md", "epub", "zip")
+STATE_NAME = ".export_state.json"
+_FORMAT_VERSION = 1  # bump to rebuild every export after a change to the output format
+_BLOCK = 1 << 20
+
+_OUTPUT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output")
+_CHAPTER_REF = re.compile(r'[\w.\-]+\.md\b')
+_NUMBERS = re.compile(r'(\d+)')
+
+
+def _natural_key(name: str) -> list:
+    return [int(part) if part.isdigit() else part.lower() for part in _NUMBERS.split(name)]
+
+
+def chapter_order(folder: str) -> Tuple[List[str], List[str]]:
+    """
+    The manuscript chapters of a project, in reading order, and all chapter files.
+
+    Returns:
+        (manuscript file names, every chapter file name of the manifest)
+    """
+    manifest = manifest_for(folder)
+    manifest.refresh()  # also writes queued appends (tools/writeback.py)
+    manifest.save()
+    files = sorted(manifest.chapters(), key=_natural_key)
+
+    excluded = [name for name in files if any(fnmatch.fnmatch(name.lower(), pattern)
+                                              for pattern in ParametersONE.EXPORT_EXCLUDE)]
+    chapters = [name for name in files if name not in excluded]
+
+    ordered: List[str] = []
+    for outline in (name for name in excluded if name.lower().startswith("outline")):
+        with open(os.path.join(manifest.folder, outline), 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                for ref in _CHAPTER_REF.findall(line):
+                    if ref in chapters and ref not in ordered:
+                        ordered.append(ref)
+    ordered += [name for name in chapters if name not in ordered]
+    return ordered, files
+
+
+def _fingerprint(folder: str, kind: str, names: List[str]) -> str:
+    manifest = manifest_for(folder)
+    hasher = hashlib.sha256(f"{_FORMAT_VERSION}:{kind}".encode())
+    for name in names:
+        entry = manifest.entry(name) or {}
+        hasher.update(f"\0{name}\0{entry.get('sha256')}".encode())
+    if kind == "epub":
+        hasher.update(ParametersONE.EXPORT_LANGUAGE.encode())
+    return hasher.hexdigest()
+
+
+def _title(folder: str) -> str:
+    return os.path.basename(os.path.normpath(folder)).replace("_", " ").strip() or "Untitled"
+
+
+class _AtomicOutput:
+    """A temp file in the export folder, renamed over the output when complete."""
+
+    def __init__(self, path: str):
+        self.path = path
+        fd, self.tmp_path = create_temp(path)
+        os.close(fd)
+
+    def __enter__(self) -> str:
+        return self.tmp_path
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        else:
+            try:
+                os.unlink(self.tmp_path)
+            except OSError:
+                pass
+
+
+# ---------------------------------------------------------------------- #
+# Markdown
+# ---------------------------------------------------------------------- #
+
+def write_markdown(folder: str, chapters: List[str], target: str) -> None:
+    """Concatenate chapters block by block, one blank line between them."""
+    with _AtomicOutput(target) as tmp_path, open(tmp_path, 'wb') as out:
+        for number, name in enumerate(chapters):
+            if number:
+                out.write(b"\n")
+            last = b"\n"
+            with open(os.path.join(folder, name), 'rb') as f:
+                for block in iter(lambda: f.read(_BLOCK), b""):
+                    out.write(block)
+                    last = block[-1:]
+            if last != b"\n":
+                out.write(b"\n")
+
+
+# ---------------------------------------------------------------------- #
+# EPUB
+# ---------------------------------------------------------------------- #
+
+_HEADING = re.compile(r'^(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$')
+_RULE = re.compile(r'^[ \t]*([-*_])([ \t]*\1){2,}[ \t]*$')
+_LIST_ITEM = re.compile(r'^[ \t]*(?:[-*+]|\d+[.)])[ \t]+(.*)$')
+_EMPHASIS = re.compile(r'[*_`]+')
+_INLINE = [
+    (re.compile(r'`([^`]+)`'), r'<code>\1</code>'),
+    (re.compile(r'\*\*(.+?)\*\*|__(.+?)__'), lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>"),
+    (re.compile(r'(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?!\*)|(?<!\w)_(?!\s)(.+?)(?<!\s)_(?!\w)'),
+     lambda m: f"<em>{m.group(1) or m.group(2)}</em>"),
+]
+
+
+def _inline(text: str) -> str:
+    text = html.escape(text, quote=False)
+    for pattern, replacement in _INLINE:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def markdown_to_xhtml(lines: Iterable[str]) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Convert Markdown lines to XHTML body fragments, one block at a time.
+
+    Covers what chapters use: headings, paragraphs, emphasis, block quotes,
+    lists and scene breaks. Memory is bounded by the longest paragraph.
+
+    Yields:
+        (fragment, heading text or None)
+    """
+    paragraph: List[str] = []
+    quote: List[str] = []
+    items: List[str] = []
+    hard_break = False
+
+    def close_blocks() -> Iterator[Tuple[str, Optional[str]]]:
+        if paragraph:
+            yield f"<p>{'<br/>'.join(_inline(line) for line in paragraph)}</p>\n", None
+            paragraph.clear()
+        if quote:
+            yield f"<blockquote><p>{' '.join(_inline(line) for line in quote)}</p></blockquote>\n", None
+            quote.clear()
+        if items:
+            yield "<ul>" + "".join(f"<li>{_inline(item)}</li>" for item in items) + "</ul>\n", None
+            items.clear()
+
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        stripped = line.strip()
+        heading = _HEADING.match(stripped)
+        if not stripped:
+            yield from close_blocks()
+        elif heading:
+            yield from close_blocks()
+            level = len(heading.group(1))
+            yield f"<h{level}>{_inline(heading.group(2))}</h{level}>\n", heading.group(2)
+        elif _RULE.match(stripped):
+            yield from close_blocks()
+            yield '<hr class="scene-break"/>\n', None
+        elif stripped.startswith(">"):
+            if paragraph or items:
+                yield from close_blocks()
+            quote.append(stripped.lstrip(">").strip())
+        elif _LIST_ITEM.match(line) and not paragraph:
+            if quote:
+                yield from close_blocks()
+            items.append(_LIST_ITEM.match(line).group(1))
+        else:
+            if quote or items:
+                yield from close_blocks()
+            # Markdown hard breaks (two trailing spaces) are kept, single newlines join the paragraph
+            if paragraph and not hard_break:
+                paragraph[-1] = paragraph[-1] + " " + stripped
+            else:
+                paragraph.append(stripped)
+            hard_break = line.endswith("  ")
+    yield from close_blocks()
+
+
+_CONTAINER = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>
+</container>
+"""
+
+_STYLE = """body { font-family: serif; line-height: 1.5; margin: 0 5%; }
+h1, h2, h3 { text-align: center; page-break-after: avoid; }
+p { margin: 0; text-indent: 1.5em; }
+h1 + p, h2 + p, h3 + p, hr + p { text-indent: 0; }
+hr.scene-break { border: none; margin: 1.5em 0; text-align: center; }
+hr.scene-break::after { content: "* * *"; }
+blockquote { margin: 1em 2em; font-style: italic; }
+"""
+
+
+def _xhtml_head(title: str, language: str) -> str:
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE html>\n'
+            f'<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" '
+            f'xml:lang="{language}" lang="{language}">\n<head><meta charset="UTF-8"/>'
+            f'<title>{html.escape(title)}</title><link rel="stylesheet" type="text/css" href="style.css"/>'
+            f'</head>\n<body>\n')
+
+
+def write_epub(folder: str, chapters: List[str], target: str, fingerprint: str) -> None:
+    """Build an EPUB 3 book; chapters are converted and compressed as they are read."""
+    title = _title(folder)
+    language = ParametersONE.EXPORT_LANGUAGE
+    book_id = f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, 'agentONE:' + fingerprint)}"
+    documents: List[Tuple[str, str]] = []  # (file name in OEBPS, chapter title)
+
+    with _AtomicOutput(target) as tmp_path, zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as book:
+        # The mimetype must come first and be stored uncompressed
+        book.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        book.writestr("META-INF/container.xml", _CONTAINER)
+        book.writestr("OEBPS/style.css", _STYLE)
+
+        for number, name in enumerate(chapters, start=1):
+            doc_name = f"chapter{number:04d}.xhtml"
+            chapter_title = None
+            fallback = os.path.splitext(name)[0].replace("_", " ").strip()
+            with open(os.path.join(folder, name), 'r', encoding='utf-8', errors='replace') as src, \
+                    book.open(f"OEBPS/{doc_name}", 'w') as member:
+                member.write(_xhtml_head(fallback, language).encode("utf-8"))
+                for fragment, heading in markdown_to_xhtml(src):
+                    if chapter_title is None and heading:
+                        chapter_title = _EMPHASIS.sub("", heading)
+                    member.write(fragment.encode("utf-8"))
+                member.write(b"</body>\n</html>\n")
+            documents.append((doc_name, chapter_title or fallback))
+
+        nav_items = "".join(f'<li><a href="{doc}">{html.escape(heading)}</a></li>\n' for doc, heading in documents)
+        book.writestr("OEBPS/nav.xhtml",
+                      _xhtml_head(title, language) +
+                      f'<nav epub:type="toc" id="toc"><h1>{html.escape(title)}</h1>\n<ol>\n{nav_items}</ol></nav>\n'
+                      f'</body>\n</html>\n')
+
+        manifest_items = "".join(f'    <item id="c{idx}" href="{doc}" media-type="application/xhtml+xml"/>\n'
+                                 for idx, (doc, _) in enumerate(documents, start=1))
+        spine = "".join(f'    <itemref idref="c{idx}"/>\n' for idx in range(1, len(documents) + 1))
+        modified = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        book.writestr("OEBPS/content.opf", f"""<?xml version="1.0" encoding="UTF-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id" xml:lang="{language}">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:identifier id="book-id">{book_id}</dc:identifier>
+    <dc:title>{html.escape(title)}</dc:title>
+    <dc:language>{language}</dc:language>
+    <dc:creator>AgentONE</dc:creator>
+    <meta property="dcterms:modified">{modified}</meta>
+  </metadata>
+  <manifest>
+    <item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>
+    <item id="css" href="style.css" media-type="text/css"/>
+{manifest_items}  </manifest>
+  <spine>
+{spine}  </spine>
+</package>
+""")
+
+
+# ---------------------------------------------------------------------- #
+# Zip
+# ---------------------------------------------------------------------- #
+
+def write_zip(folder: str, files: List[str], target: str) -> None:
+    """Archive the chapter sources under a folder named after the project."""
+    prefix = os.path.basename(os.path.normpath(folder))
+    with _AtomicOutput(target) as tmp_path, zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name in files:
+            archive.write(os.path.join(folder, name), f"{prefix}/{name}")
+
+
+# ---------------------------------------------------------------------- #
+# Driver
+# ---------------------------------------------------------------------- #
+
+def export_project(folder: str, formats: Iterable[str] = FORMATS, force: bool = False) -> Dict[str, Tuple[str, str]]:
+    """
+    Build the outputs of one project whose inputs changed.
+
+    Args:
+        folder: The project folder
+        formats: Any of "md", "epub", "zip"
+        force: Rebuild even if the inputs are unchanged
+
+    Returns:
+        Per format: ("written" | "unchanged", output path)
+
+    Raises:
+        ValueError: For an unknown format
+        OSError: If a chapter cannot be read or an output written
+    """
+    folder = os.path.abspath(folder)
+    formats = list(dict.fromkeys(formats))
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(unknown)} (use {', '.join(FORMATS)})")
+
+    chapters, files = chapter_order(folder)
+    export_dir = os.path.join(folder, ParametersONE.EXPORT_DIRNAME)
+    os.makedirs(export_dir, exist_ok=True)
+    state_path = os.path.join(export_dir, STATE_NAME)
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+
+    base = os.path.join(export_dir, os.path.basename(folder))
+    results = {}
+    for fmt in formats:
+        target = f"{base}.{fmt}"
+        fingerprint = _fingerprint(folder, fmt, files if fmt == "zip" else chapters)
+        if not force and state.get(fmt) == fingerprint and os.path.exists(target):
+            results[fmt] = ("unchanged", target)
+            continue
+        if fmt == "md":
+            write_markdown(folder, chapters, target)
+        elif fmt == "epub":
+            write_epub(folder, chapters, target, fingerprint)
+        else:
+            write_zip(folder, files, target)
+        state[fmt] = fingerprint
+        results[fmt] = ("written", target)
+
+    with _AtomicOutput(state_path) as tmp_path, open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    return results
+
+
+def export_projects(folders: List[str], formats: Iterable[str] = FORMATS, force: bool = False,
+                    jobs: Optional[int] = None) -> Dict[str, object]:
+    """
+    Export several projects in parallel.
+
+    Returns:
+        Per folder: the result of export_project, or the exception that stopped it
+    """
+    formats = list(formats)
+    results: Dict[str, object] = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs or ParametersONE.EXPORT_WORKERS),
+                            thread_name_prefix="export") as pool:
+        futures = {folder: pool.submit(export_project, folder, formats, force) for folder in folders}
+        for folder, future in futures.items():
+            try:
+                results[folder] = future.result()
+            except Exception as e:
+                results[folder] = e
+    return results
+
+
+def _resolve_project(name: str) -> str:
+    if os.path.isdir(name):
+        return os.path.abspath(name)
+    return os.path.join(_OUTPUT_ROOT, name)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compile projects into Markdown, EPUB and zip files.")
+    parser.add_argument("projects", nargs="*", help="Project folders, or names of folders in output/")
+    parser.add_argument("--all", action="store_true", help="Export every project in output/")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=list(ParametersONE.EXPORT_FORMATS))
+    parser.add_argument("--jobs", type=int, default=ParametersONE.EXPORT_WORKERS, help="Projects exported at once")
+    parser.add_argument("--force", action="store_true", help="Rebuild outputs even if their chapters did not change")
+    args = parser.parse_args(argv)
+
+    folders = [_resolve_project(name) for name in args.projects]
+    if args.all and os.path.isdir(_OUTPUT_ROOT):
+        folders += [entry.path for entry in os.scandir(_OUTPUT_ROOT) if entry.is_dir()]
+    folders = list(dict.fromkeys(folders))
+    if not folders:
+        parser.error("name at least one project, or pass --all")
+    missing = [folder for folder in folders if not os.path.isdir(folder)]
+    if missing:
+        parser.error(f"no such project folder: {', '.join(missing)}")
+
+    start = time.monotonic()
+    failed = 0
+    for folder, result in export_projects(folders, args.format, args.force, args.jobs).items():
+        name = os.path.basename(folder)
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"✗ {name}: {type(result).__name__}: {result}")
+            continue
+        for fmt, (status, path) in result.items():
+            mark = "✓" if status == "written" else "="
+            print(f"{mark} {name} [{fmt}] {status} → {os.path.relpath(path)}")
+    print(f"\n📚 {len(folders) - failed}/{len(folders)} project(s) exported in {time.monotonic() - start:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+Project manifest: what a project contains, kept up to date as it is written.
+
+Every chapter write (write_chapter, edit_chapter, saved partial text) updates
+the in-memory manifest of its project folder: size, word count, content hash,
+the iteration that last touched the file and a short history of write modes.
+Appends only add their own bytes and words; their hash is filled in from the
+writer's incremental hash index (tools/writer.py) when the manifest is read.
+Files changed from outside the process are noticed by a stat check and
+re-measured.
+
+The manifest is refreshed (hashes filled in) and saved as ``.manifest.json``
+in the project folder at the end of each iteration's tool stage and at exit. ``project_status`` returns it as
+a short table, so the model can check progress without re-reading chapters.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ads import fastJson
+from ads.pipeline import current_iteration, pipeline
+from .project import get_active_project_folder
+from .search import tokenize
+from .writeback import atomic_write, write_behind
+
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 1
+_HISTORY = 20  # write modes remembered per file
+
+
+def count_words(text: str) -> int:
+    """Words of a text (every CJK character counts as one), as search_project sees them."""
+    return len(tokenize(text))
+
+
+def is_chapter_file(name: str) -> bool:
+    """Markdown files of the project; hidden files (summaries, temp files) are not chapters."""
+    return name.endswith(".md") and not name.startswith(".")
+
+
+class ProjectManifest:
+    """Per-file stats of one project folder."""
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.path = os.path.join(folder, MANIFEST_NAME)
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'rb') as f:
+                data = fastJson.loads(f.read())
+            if data.get("version") == MANIFEST_VERSION:
+                self.files = data.get("files") or {}
+        except (OSError, ValueError, AttributeError):
+            self.files = {}  # missing or unreadable → rebuilt by refresh()
+
+    # ------------------------------------------------------------------ #
+    # Updates
+    # ------------------------------------------------------------------ #
+
+    def record(self, path: str, mode: str, data: bytes, text: str, appended: bool = False) -> None:
+        """
+        Record one write.
+
+        Args:
+            path: The file written
+            mode: "create", "overwrite", "append", "edit", ...
+            data: The bytes written (for appends: only the appended bytes)
+            text: ``data`` decoded (for the word count)
+            appended: ``data`` was added to the end of the file (implied by mode "append")
+        """
+        name = os.path.basename(path)
+        if not is_chapter_file(name):
+            return
+        iteration = current_iteration()
+        with self._lock:
+            entry = self.files.get(name)
+            if entry is None:
+                entry = self.files[name] = {"bytes": 0, "words": 0, "sha256": None, "mtime_ns": None,
+                                            "created": time.time(), "writes": 0, "history": []}
+            if appended or mode == "append":
+                entry["bytes"] += len(data)
+                entry["words"] += count_words(text)
+            else:
+                entry["bytes"] = len(data)
+                entry["words"] = count_words(text)
+            # Filled in by refresh() before every save: appends reach the file later (write-behind);
+            # the missing mtime marks the change as ours, so the file is not re-measured
+            entry["sha256"] = entry["mtime_ns"] = None
+            self._touch(entry, iteration, mode)
+
+    def _touch(self, entry: Dict[str, Any], iteration: Optional[int], mode: str) -> None:
+        entry["iteration"] = iteration if iteration is not None else entry.get("iteration")
+        entry["updated"] = time.time()
+        entry["writes"] = entry.get("writes", 0) + 1
+        entry["history"] = (entry.get("history", []) + [[iteration, mode, entry["bytes"]]])[-_HISTORY:]
+        self.dirty = True
+
+    def refresh(self) -> None:
+        """
+        Reconcile with the folder: fill in pending hashes, add, drop or
+        re-measure files that changed without going through the writer.
+        """
+        from .writer import hash_index  # writer imports this module
+
+        write_behind.flush(folder=self.folder)
+        current = {}
+        with os.scandir(self.folder) as entries:
+            for item in entries:
+                if item.is_file() and is_chapter_file(item.name):
+                    current[item.name] = item.stat()
+
+        with self._lock:
+            for name in [name for name in self.files if name not in current]:
+                del self.files[name]
+                self.dirty = True
+            for name, st in current.items():
+                entry = self.files.get(name)
+                path = os.path.join(self.folder, name)
+                if entry is not None and entry.get("mtime_ns") == st.st_mtime_ns and entry.get("bytes") == st.st_size:
+                    continue
+                ours = entry is not None and entry.get("mtime_ns") is None and entry.get("bytes") == st.st_size
+                if not ours:
+                    # New to the manifest, or changed from outside → measure from disk
+                    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                        words = count_words(f.read())
+                    if entry is None:
+                        entry = self.files[name] = {"created": st.st_mtime, "writes": 0, "history": []}
+                        mode = "found"
+                    else:
+                        mode = "external"
+                    entry["bytes"] = st.st_size
+                    entry["words"] = words
+                    self._touch(entry, None, mode)
+                digest = hash_index.digest(path)
+                entry["sha256"] = digest.hex() if digest else None
+                entry["mtime_ns"] = st.st_mtime_ns
+                self.dirty = True
+
+    def save(self) -> bool:
+        """Write the manifest if it changed; returns whether it was written."""
+        with self._lock:
+            if not self.dirty:
+                return False
+            payload = json.dumps({"version": MANIFEST_VERSION, "folder": self.folder, "saved": time.time(),
+                                  "files": self.files}, ensure_ascii=False, indent=1)
+            self.dirty = False
+        try:
+            atomic_write(self.path, payload.encode("utf-8"))
+        except OSError:
+            self.dirty = True
+            raise
+        return True
+
+    # ------------------------------------------------------------------ #
+    # Reading
+    # ------------------------------------------------------------------ #
+
+    def chapters(self) -> List[str]:
+        """File names in name order (chapter_01.md, chapter_02.md, ...)."""
+        with self._lock:
+            return sorted(self.files)
+
+    def entry(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self.files.get(name)
+            return dict(entry) if entry else None
+
+    def report(self) -> str:
+        """Short table of the project for the model."""
+        with self._lock:
+            files = sorted(self.files.items())
+            total_words = sum(entry.get("words", 0) for _, entry in files)
+            total_bytes = sum(entry.get("bytes", 0) for _, entry in files)
+            lines = [f"Project '{os.path.basename(self.folder)}': {len(files)} file{'s' if len(files) != 1 else ''}, "
+                     f"{total_words:,} words, {total_bytes:,} bytes."]
+            for name, entry in files:
+                modes = ", ".join(mode for _, mode, _ in entry.get("history", [])[-3:])
+                iteration = entry.get("iteration")
+                lines.append(f"- {name}: {entry.get('words', 0):,} words, {entry.get('bytes', 0):,} bytes, "
+                             f"{entry.get('writes', 0)} write{'s' if entry.get('writes', 0) != 1 else ''} "
+                             f"(last: {modes or '-'}"
+                             f"{f', iteration {iteration}' if iteration is not None else ''}), "
+                             f"sha256 {(entry.get('sha256') or '?')[:12]}")
+            if not files:
+                lines.append("(no chapters yet)")
+        return "\n".join(lines)
+
+
+_manifests: Dict[str, ProjectManifest] = {}
+_manifests_lock = threading.Lock()
+
+
+def manifest_for(folder: str) -> ProjectManifest:
+    """The (cached) manifest of a project folder."""
+    folder = os.path.abspath(folder)
+    with _manifests_lock:
+        manifest = _manifests.get(folder)
+        if manifest is None:
+            manifest = _manifests[folder] = ProjectManifest(folder)
+        return manifest
+
+
+def record_write(path: str, mode: str, data: bytes, text: str, appended: bool = False) -> None:
+    """Update the manifest of the file's folder after a write (see ProjectManifest.record)."""
+    manifest_for(os.path.dirname(os.path.abspath(path))).record(path, mode, data, text, appended)
+
+
+def save_manifests() -> None:
+    """
+    Save every manifest that changed (end of the tool stage, exit), after a
+    refresh that fills in the hashes and mtimes of the files written since.
+    """
+    with _manifests_lock:
+        manifests = list(_manifests.values())
+    for manifest in manifests:
+        if not manifest.dirty:
+            continue
+        try:
+            manifest.refresh()
+            manifest.save()
+        except OSError as e:
+            print(f"⚠️  Could not save the manifest of '{manifest.folder}': {e}")
+
+
+@pipeline.hook("post_stage")
+def _save_after_tools(stage: str, iteration: int, wall_s: float, cpu_s: float) -> None:
+    if stage == "tools":
+        save_manifests()
+
+
+atexit.register(save_manifests)
+
+
+def project_status_impl() -> str:
+    """
+    Reports what the active project contains.
+
+    Returns:
+        One line per file (words, bytes, writes, last modes and iteration,
+        content hash) under a total, or an error message
+    """
+    project_folder = get_active_project_folder()
+    if not project_folder:
+        return "Error: No active project folder. Please create a project first using create_project."
+
+    manifest = manifest_for(project_folder)
+    try:
+        manifest.refresh()
+        manifest.save()
+    except OSError as e:
+        return f"Error reading project status: {str(e)}"
+    return manifest.report()
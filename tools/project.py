@@ -4,11 +4,14 @@ Project folder management tool.
 
 import os
 import re
+from contextvars import ContextVar
 from typing import Optional
 
+from .writeback import write_behind
 
-# Global variable to track the active project folder
-_active_project_folder: Optional[str] = None
+# Tracks the active project folder. A ContextVar instead of a plain global so that
+# concurrent asyncio sessions (agentAsync.py) each see their own project.
+_active_project_folder: ContextVar[Optional[str]] = ContextVar("active_project_folder", default=None)
 
 
 def sanitize_folder_name(name: str) -> str:
@@ -40,18 +43,26 @@ def get_active_project_folder() -> Optional[str]:
     Returns:
         Path to active project folder or None if not set
     """
-    return _active_project_folder
+    return _active_project_folder.get()
 
 
 def set_active_project_folder(folder_path: str) -> None:
     """
     Sets the active project folder.
     
+    Leaving a project writes its queued appends and closes its open append
+    handles (tools/writeback.py).
+
     Args:
         folder_path: Path to the project folder
     """
-    global _active_project_folder
-    _active_project_folder = folder_path
+    previous = _active_project_folder.get()
+    if previous and os.path.abspath(previous) != os.path.abspath(folder_path):
+        try:
+            write_behind.release(previous)
+        except OSError as e:
+            print(f"⚠️  Could not write queued text of the previous project: {e}")
+    _active_project_folder.set(folder_path)
 
 
 def create_project_impl(project_name: str) -> str:
@@ -64,8 +75,6 @@ def create_project_impl(project_name: str) -> str:
     Returns:
         Success message with folder path or error message
     """
-    global _active_project_folder
-    
     # Sanitize the folder name
     sanitized_name = sanitize_folder_name(project_name)
     
@@ -87,13 +96,13 @@ def create_project_impl(project_name: str) -> str:
     # Check if folder already exists
     if os.path.exists(project_path):
         # Use existing folder and set it as active
-        _active_project_folder = project_path
+        set_active_project_folder(project_path)
         return f"Project folder already exists at '{project_path}'. Set as active project folder."
     
     # Create the folder
     try:
         os.makedirs(project_path, exist_ok=True)
-        _active_project_folder = project_path
+        set_active_project_folder(project_path)
         return f"Successfully created project folder at '{project_path}'. This is now the active project folder."
     except Exception as e:
         return f"Error creating project folder: {str(e)}"
@@ -0,0 +1,191 @@
+"""
+Ranged chapter reading tool.
+
+Lets the model re-read part of what it wrote (a scene under a heading, a
+range of lines or bytes) instead of keeping whole chapters in context. Files
+are read through a memory map; the byte offset of every line and the
+headings are indexed once per file version (size + mtime) and cached.
+"""
+
+import mmap
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from ParametersONE import ParametersONE
+from .project import get_active_project_folder
+from .writeback import write_behind
+
+_HEADING = re.compile(rb'^(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$')
+
+_INDEX_CACHE_SIZE = 64
+
+
+class ChapterIndex:
+    """Line start offsets and headings of one file version."""
+
+    __slots__ = ("size", "mtime_ns", "line_starts", "headings")
+
+    def __init__(self, size: int, mtime_ns: int, data: bytes):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.line_starts = array('q', [0])  # byte offset of every line
+        self.headings: List[Tuple[int, int, str]] = []  # (line index, level, title)
+        find = data.find
+        pos = 0
+        while True:
+            end = find(b"\n", pos)
+            line_end = size if end < 0 else end
+            if data[pos:pos + 1] == b"#":
+                match = _HEADING.match(data[pos:line_end].rstrip(b"\r"))
+                if match:
+                    title = match.group(2).decode("utf-8", errors="replace")
+                    self.headings.append((len(self.line_starts) - 1, len(match.group(1)), title))
+            if end < 0:
+                break
+            pos = end + 1
+            if pos < size:
+                self.line_starts.append(pos)
+
+    @property
+    def lines(self) -> int:
+        return len(self.line_starts) if self.size else 0
+
+    def line_offset(self, line: int) -> int:
+        """Byte offset where a (0-based) line starts; the file size past the end."""
+        return self.line_starts[line] if line < len(self.line_starts) else self.size
+
+    def section(self, heading: str) -> Tuple[int, int]:
+        """
+        Line range (0-based, end exclusive) of the section under a heading.
+
+        Raises:
+            ValueError: If the heading is missing or ambiguous
+        """
+        wanted = _norm_heading(heading)
+        matches = [(line, level) for line, level, title in self.headings if _norm_heading(title) == wanted]
+        if not matches:
+            raise ValueError(f"heading '{heading}' not found")
+        if len(matches) > 1:
+            raise ValueError(f"heading '{heading}' occurs {len(matches)} times")
+        start, level = matches[0]
+        end = next((line for line, lvl, _ in self.headings if line > start and lvl <= level), self.lines)
+        return start, end
+
+
+def _norm_heading(text: str) -> str:
+    return " ".join(text.strip().lstrip('#').split()).lower()
+
+
+_cache: "OrderedDict[str, ChapterIndex]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _get_index(path: str, data: bytes, st: os.stat_result) -> ChapterIndex:
+    with _cache_lock:
+        index = _cache.get(path)
+        if index is not None and (index.size, index.mtime_ns) == (st.st_size, st.st_mtime_ns):
+            _cache.move_to_end(path)
+            return index
+    index = ChapterIndex(st.st_size, st.st_mtime_ns, data)
+    with _cache_lock:
+        _cache[path] = index
+        _cache.move_to_end(path)
+        while len(_cache) > _INDEX_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
+
+
+def _char_boundary(data: bytes, pos: int) -> int:
+    """Move a byte offset forward to the start of a UTF-8 character."""
+    while 0 < pos < len(data) and (data[pos] & 0xC0) == 0x80:
+        pos += 1
+    return pos
+
+
+def _outline(filename: str, index: ChapterIndex) -> str:
+    lines = [f"[{filename}: {index.lines:,} lines, {index.size:,} bytes. "
+             f"Pass a heading, start_line/end_line or start_byte/end_byte to read a part.]"]
+    for line, level, title in index.headings:
+        lines.append(f"{'  ' * (level - 1)}- line {line + 1}: {'#' * level} {title}")
+    if not index.headings:
+        lines.append("(no headings)")
+    return "\n".join(lines)
+
+
+def read_chapter_impl(filename: str, heading: Optional[str] = None,
+                      start_line: Optional[int] = None, end_line: Optional[int] = None,
+                      start_byte: Optional[int] = None, end_byte: Optional[int] = None) -> str:
+    """
+    Reads part of a markdown file in the active project folder.
+
+    Args:
+        filename: The name of the file to read
+        heading: Read the section under this Markdown heading
+        start_line: First line to read (1-based)
+        end_line: Last line to read (inclusive)
+        start_byte: First byte to read (moved to a character boundary)
+        end_byte: Byte offset to stop at (exclusive)
+
+    Returns:
+        The requested text with a header giving its position; without a
+        range, a short file or else the file's outline; or an error message
+    """
+    project_folder = get_active_project_folder()
+    if not project_folder:
+        return "Error: No active project folder. Please create a project first using create_project."
+
+    filename = os.path.basename(filename)
+    if not filename.endswith('.md'):
+        filename = filename + '.md'
+    file_path = os.path.abspath(os.path.join(project_folder, filename))
+
+    try:
+        write_behind.flush(file_path)  # queued appends are part of the chapter
+    except OSError as e:
+        return f"Error reading file '{filename}': {str(e)}"
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return f"Error: File '{filename}' does not exist."
+    if st.st_size == 0:
+        return f"[{filename} is empty]"
+
+    try:
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            index = _get_index(file_path, data, st)
+
+            if heading:
+                try:
+                    first, last = index.section(heading)
+                except ValueError as e:
+                    return f"Error: {e} in '{filename}'. Call read_chapter without a range to see the headings."
+                begin, end = index.line_offset(first), index.line_offset(last)
+                where = f"section '{heading}', lines {first + 1}-{last} of {index.lines:,}"
+            elif start_line is not None or end_line is not None:
+                first = max(int(start_line or 1), 1) - 1
+                last = min(int(end_line) if end_line is not None else index.lines, index.lines)
+                if first >= last:
+                    return f"Error: Empty line range; '{filename}' has {index.lines:,} lines."
+                begin, end = index.line_offset(first), index.line_offset(last)
+                where = f"lines {first + 1}-{last} of {index.lines:,}"
+            elif start_byte is not None or end_byte is not None:
+                begin = _char_boundary(data, min(max(int(start_byte or 0), 0), st.st_size))
+                end = _char_boundary(data, min(int(end_byte) if end_byte is not None else st.st_size, st.st_size))
+                if begin >= end:
+                    return f"Error: Empty byte range; '{filename}' has {st.st_size:,} bytes."
+                where = f"bytes {begin:,}-{end:,} of {st.st_size:,}"
+            elif st.st_size <= ParametersONE.TOOL_RESULT_MAX_CHARS:
+                begin, end = 0, st.st_size
+                where = f"all {index.lines:,} lines"
+            else:
+                return _outline(filename, index)
+
+            text = data[begin:end].decode("utf-8", errors="replace")
+        return f"[{filename}, {where}]\n{text}"
+
+    except Exception as e:
+        return f"Error reading file '{filename}': {str(e)}"
@@ -0,0 +1,183 @@
+"""
+Registry of the tools offered to the model.
+
+Every tool is declared once as a ToolSpec: its JSON schema, how it may run
+next to other calls (concurrency class), an optional timeout, and its handler.
+Handlers are given as ``"module:function"`` strings and imported on first
+use, so a tool whose module is heavy costs nothing until the model calls it.
+The schema list and its JSON encoding are built once and reused for every
+request.
+
+Third-party tools register themselves from a plugin module listed in
+``ParametersONE.TOOL_PLUGINS``::
+
+    from tools.registry import ToolSpec, tool_registry
+
+    tool_registry.register(ToolSpec(
+        name="word_count",
+        description="Counts the words of a chapter.",
+        parameters={"type": "object", "properties": {...}, "required": [...]},
+        handler="my_plugin.stats:word_count",
+        concurrency=ToolSpec.PURE,
+    ))
+"""
+
+import asyncio
+import contextvars
+import functools
+import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from ads import fastJson
+
+
+def _resolve(target: Union[str, Callable, None]) -> Optional[Callable]:
+    """Import a ``"module:attribute"`` handler (callables are returned as is)."""
+    if target is None or callable(target):
+        return target
+    module_name, _, attribute = target.partition(":")
+    obj = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+@dataclass
+class ToolSpec:
+    """Declaration of one tool."""
+
+    # Concurrency classes (see ads/toolExecutor.py)
+    PURE = "pure"          # no side effects: runs next to anything
+    IO = "io"              # touches the file named by ``path_arg``: runs next to calls on other files
+    PROJECT = "project"    # reads every file of the project: runs next to pure calls and other project reads
+    STATEFUL = "stateful"  # changes session state (active project, history): runs alone, on the caller's thread
+
+    name: str
+    description: str
+    parameters: Dict[str, Any]
+    handler: Union[str, Callable]                           # "module:function" (lazy) or a callable
+    concurrency: str = STATEFUL
+    timeout: Optional[float] = None                         # seconds; not enforced for STATEFUL tools
+    async_handler: Union[str, Callable, None] = None        # coroutine variant used by agentAsync.py
+    path_arg: Optional[str] = None                          # IO tools: argument naming the file
+    needs_agent: bool = False                               # handler(agent, **args) instead of handler(**args)
+    blocking: bool = True                                   # asyncio: run off the event loop (if no async_handler)
+    offload: bool = True                                    # large results are stored out of band (tools/results.py)
+    _loaded: Dict[str, Callable] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    @property
+    def definition(self) -> Dict[str, Any]:
+        """OpenAI-style tool definition sent to the model."""
+        return {
+            "type": "function",
+            "function": {"name": self.name, "description": self.description, "parameters": self.parameters},
+        }
+
+    def load(self, which: str = "handler") -> Optional[Callable]:
+        """The handler (or ``async_handler``), imported on first use."""
+        if which not in self._loaded:
+            self._loaded[which] = _resolve(getattr(self, which))
+        return self._loaded[which]
+
+    def __call__(self, **args) -> Any:
+        """Call the handler directly (tools that need the agent must go through ``invoke``)."""
+        return self.load()(**args)
+
+    def _bind(self, agent, args: Dict[str, Any], which: str = "handler") -> Callable:
+        handler = self.load(which)
+        return functools.partial(handler, agent, **args) if self.needs_agent else functools.partial(handler, **args)
+
+    def _timed_out(self) -> str:
+        return (f"Error: Tool '{self.name}' timed out after {self.timeout:g}s; it may still finish "
+                f"in the background, check its effect before calling it again.")
+
+    def invoke(self, agent, args: Dict[str, Any]) -> Any:
+        """Run the tool, enforcing ``timeout`` (the call moves to a helper thread for that)."""
+        call = self._bind(agent, args)
+        if self.timeout is None or self.concurrency == ToolSpec.STATEFUL:
+            return call()
+        future = tool_registry.timeout_pool().submit(contextvars.copy_context().run, call)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            return self._timed_out()
+
+    async def invoke_async(self, agent, args: Dict[str, Any]) -> Any:
+        """asyncio variant of ``invoke``: async handler, worker thread, or inline for cheap tools."""
+        if self.async_handler is not None:
+            awaitable = self._bind(agent, args, "async_handler")()
+        elif self.blocking:
+            awaitable = asyncio.to_thread(self._bind(agent, args))
+        else:
+            # Cheap and stateful (create_project sets the session's project) → run inline
+            return self._bind(agent, args)()
+        try:
+            return await asyncio.wait_for(awaitable, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            return self._timed_out()
+
+
+class ToolRegistry:
+    """Tools by name, plus the cached schema list / JSON sent with every request."""
+
+    def __init__(self):
+        self._specs: Dict[str, ToolSpec] = {}
+        self._definitions: Optional[List[Dict[str, Any]]] = None
+        self._definitions_json: Optional[bytes] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def register(self, spec: ToolSpec) -> ToolSpec:
+        """Add (or replace) a tool."""
+        if spec.concurrency not in (ToolSpec.PURE, ToolSpec.IO, ToolSpec.PROJECT, ToolSpec.STATEFUL):
+            raise ValueError(f"Unknown concurrency class '{spec.concurrency}' for tool '{spec.name}'")
+        with self._lock:
+            self._specs[spec.name] = spec
+            self._definitions = self._definitions_json = None
+        return spec
+
+    def load_plugins(self, modules: List[str]) -> None:
+        """Import plugin modules (they register their tools when imported)."""
+        for module_name in modules:
+            importlib.import_module(module_name)
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        return self._specs.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    @property
+    def specs(self) -> Dict[str, ToolSpec]:
+        return dict(self._specs)
+
+    @property
+    def definitions(self) -> List[Dict[str, Any]]:
+        """Tool definitions for the API (built once; do not modify)."""
+        with self._lock:
+            if self._definitions is None:
+                self._definitions = [spec.definition for spec in self._specs.values()]
+            return self._definitions
+
+    @property
+    def definitions_json(self) -> bytes:
+        """``definitions`` encoded as JSON, spliced into every raw request body."""
+        definitions = self.definitions
+        with self._lock:
+            if self._definitions_json is None:
+                self._definitions_json = fastJson.dumps_bytes(definitions)
+            return self._definitions_json
+
+    def timeout_pool(self) -> ThreadPoolExecutor:
+        """Threads that run calls with a timeout (a timed-out call keeps its thread until it returns)."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(thread_name_prefix="tool-timeout")
+            return self._pool
+
+
+# ← Process-wide registry; built-in tools are declared in tools/toolMap.py
+tool_registry = ToolRegistry()
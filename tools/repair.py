@@ -0,0 +1,262 @@
+"""
+Recovery of truncated or malformed tool-call arguments.
+
+Long ``write_chapter`` calls are the most likely to arrive broken (max_tokens,
+dropped streams), and the whole chapter is in the arguments. Instead of
+treating a JSONDecodeError as "no arguments", the raw text is repaired
+(control characters accepted, unterminated strings / objects / arrays closed,
+dangling keys dropped) and the result is checked against the tool's JSON
+schema from ToolMap.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from ads import fastJson
+
+_DECODER = json.JSONDecoder(strict=False)
+
+# Trailing fragments that keep an otherwise closed document from parsing,
+# tried in this order, one per attempt
+_DANGLING = (
+    re.compile(r'\s*,\s*$'),                              # trailing comma
+    re.compile(r'\s*,?\s*"(?:[^"\\]|\\.)*"\s*:\s*$'),      # key without a value
+    re.compile(r'[^\s,:\[\]{}"]+\s*$'),                   # literal cut short (tru, 1.5e)
+    re.compile(r'\s*,?\s*"(?:[^"\\]|\\.)*"\s*$'),          # key without a colon
+)
+
+_JSON_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+}
+
+
+@dataclass
+class ParsedArguments:
+    """Outcome of parsing one tool call's arguments."""
+    args: Dict[str, Any]
+    repaired: bool = False                              # raw text was not valid JSON
+    problems: List[str] = field(default_factory=list)   # schema violations, empty if usable
+    error: Optional[str] = None                         # the original decode error
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+
+def _close_open_string(raw: str) -> Tuple[str, str]:
+    """
+    Terminate an unterminated string and work out the missing closing brackets.
+
+    Returns:
+        (text, closers) - the text with any open string closed, and the
+        brackets that still have to be appended
+    """
+    stack = []
+    in_string = False
+    escaped = False
+    for ch in raw:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            stack.append("}")
+        elif ch == "[":
+            stack.append("]")
+        elif ch in "}]" and stack:
+            stack.pop()
+
+    text = raw
+    if in_string:
+        if escaped:
+            # Lone backslash the stream cut off from its escape
+            text = text[:-1]
+        else:
+            # \uXX cut in half - only if that backslash is not itself escaped
+            match = re.search(r'(\\+)u[0-9a-fA-F]{0,3}$', text)
+            if match and len(match.group(1)) % 2 == 1:
+                text = text[:match.end(1) - 1]
+        text += '"'
+    return text, "".join(reversed(stack))
+
+
+def close_json(raw: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse possibly truncated or malformed JSON arguments.
+
+    Args:
+        raw: Raw argument text as streamed by the model
+
+    Returns:
+        The recovered object, or None if nothing object-shaped can be recovered
+    """
+    text, closers = _close_open_string(raw.strip())
+    for _ in range(len(_DANGLING) * 2):
+        try:
+            value, _end = _DECODER.raw_decode(text + closers)
+            return value if isinstance(value, dict) else None
+        except json.JSONDecodeError:
+            pass
+        for pattern in _DANGLING:
+            trimmed = pattern.sub("", text, count=1)
+            if trimmed != text:
+                text = trimmed
+                break
+        else:
+            return None
+    return None
+
+
+def extract_string_field(raw: str, name: str) -> Optional[str]:
+    """
+    Pull a string field out of possibly truncated JSON arguments.
+
+    Last resort when the document as a whole cannot be repaired.
+
+    Returns:
+        The (decoded) value, cut where the text stops, or None
+    """
+    match = re.search(r'"%s"\s*:\s*"((?:[^"\\]|\\.)*)' % re.escape(name), raw, re.DOTALL)
+    if not match:
+        return None
+    value = match.group(1)
+    # Drop an escape sequence cut in half (\ or \uXX)
+    value = re.sub(r'\\(u[0-9a-fA-F]{0,3})?$', '', value)
+    try:
+        return _DECODER.decode(f'"{value}"')
+    except json.JSONDecodeError:
+        return value
+
+
+def validate_arguments(args: Dict[str, Any], schema: Optional[Dict[str, Any]]) -> List[str]:
+    """
+    Check arguments against a tool's ``parameters`` schema.
+
+    Returns:
+        Human-readable problems (missing / unknown parameters, wrong type,
+        value outside the enum); empty if the call can be made
+    """
+    if not schema:
+        return []
+    problems = []
+    properties = schema.get("properties", {})
+    for name in schema.get("required", []):
+        if name not in args:
+            problems.append(f"missing required parameter '{name}'")
+    for name, value in args.items():
+        spec = properties.get(name)
+        if spec is None:
+            problems.append(f"unknown parameter '{name}'")
+            continue
+        expected = _JSON_TYPES.get(spec.get("type"))
+        if expected and not isinstance(value, expected):
+            problems.append(f"parameter '{name}' must be of type {spec['type']}")
+        elif "enum" in spec and value not in spec["enum"]:
+            problems.append(f"parameter '{name}' must be one of {spec['enum']}")
+    return problems
+
+
+def decode_arguments(raw: Optional[str]) -> Tuple[Any, Optional[str]]:
+    """
+    Strict JSON decode of argument text (ads.fastJson backend).
+
+    Returns:
+        (value, None), or (None, error message) if the text is not valid JSON
+    """
+    try:
+        return fastJson.loads(raw or "{}"), None
+    except json.JSONDecodeError as e:  # orjson's error subclasses it
+        return None, str(e)
+
+
+def parse_tool_arguments(raw: Optional[str], schema: Optional[Dict[str, Any]] = None,
+                         decoded: Optional[Tuple[Any, Optional[str]]] = None) -> ParsedArguments:
+    """
+    Parse a tool call's arguments, repairing them if needed.
+
+    Args:
+        raw: Raw JSON argument text (None / empty means no arguments)
+        schema: The tool's ``parameters`` schema (see ToolMap.get_parameters_schema)
+        decoded: Result of an earlier decode_arguments(raw) (e.g. ``ToolCall.decoded``),
+            so the text is not decoded a second time
+
+    Returns:
+        ParsedArguments; ``ok`` tells whether the call can be executed
+    """
+    raw = raw or "{}"
+    args, error = decoded if decoded is not None else decode_arguments(raw)
+    if error is None:
+        if not isinstance(args, dict):
+            return ParsedArguments({}, problems=["arguments must be a JSON object"])
+        return ParsedArguments(args, problems=validate_arguments(args, schema))
+
+    args = close_json(raw)
+    if args is None:
+        # Salvage whatever string fields can still be found
+        names = (schema or {}).get("properties", {}).keys()
+        args = {name: value for name in names
+                if (value := extract_string_field(raw, name)) is not None}
+    return ParsedArguments(args, repaired=True, problems=validate_arguments(args, schema), error=error)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark: old per-call argument handling vs. decoding once
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Benchmark tool-argument decoding")
+    parser.add_argument("--kb", type=int, default=300, help="size of the write_chapter content")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    paragraph = "The ship sailed on through the night, \"quiet\" as a held breath.\n\n海风吹过甲板。\n"
+    content = paragraph * (args.kb * 1024 // len(paragraph.encode("utf-8")) + 1)
+    raw = json.dumps({"filename": "Chapter 1.md", "content": content, "mode": "create"}, ensure_ascii=False)
+    schema = {"type": "object", "required": ["filename", "content"],
+              "properties": {"filename": {"type": "string"}, "content": {"type": "string"},
+                             "mode": {"type": "string", "enum": ["create", "append", "overwrite"]}}}
+
+    def legacy():
+        # MessageConverter re-serialization, handle_tool_calls parse, indented display dump
+        reserialized = json.dumps(json.loads(raw))
+        parsed = json.loads(reserialized)
+        json.dumps(parsed, ensure_ascii=False, indent=2)
+
+    def decode_once(loads):
+        def run():
+            value = loads(raw)
+            parse_tool_arguments(raw, schema, decoded=(value, None))
+        return run
+
+    def _bench(label, fn):
+        best = float("inf")
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        print(f"{label:<28} best {best * 1000:8.2f} ms | {len(raw.encode('utf-8')) / best / 2 ** 20:8.1f} MB/s")
+
+    print(f"Benchmark: {len(raw.encode('utf-8')) / 1024:,.0f} KB arguments x {args.rounds} rounds")
+    _bench("legacy (4 passes, json)", legacy)
+    _bench("decode once (json)", decode_once(json.loads))
+    try:
+        import orjson
+    except ImportError as e:
+        print(f"orjson path skipped: {e}")
+    else:
+        _bench("decode once (orjson)", decode_once(orjson.loads))
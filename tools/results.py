@@ -0,0 +1,103 @@
+"""
+Out-of-band storage for large tool results.
+
+A tool result goes into the ``tool`` message and is resent with every later
+request. Results above ``TOOL_RESULT_MAX_CHARS`` are written to the project's
+``.tool_results/`` folder instead (keyed by tool_call_id); history gets a
+short reference with a bounded preview, and the model reads further slices
+with the ``fetch_tool_result`` tool.
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Optional
+
+from ParametersONE import ParametersONE
+from ads.eventLog import events
+from ads.metrics import metrics
+from .project import get_active_project_folder
+
+RESULTS_DIRNAME = ".tool_results"
+
+
+def _results_dir(create: bool = False) -> Path:
+    """The active project's result folder (the backup folder when no project is active)."""
+    project_folder = get_active_project_folder()
+    directory = Path(project_folder) / RESULTS_DIRNAME if project_folder else ParametersONE.BACKUP_DIR / "tool_results"
+    if create:
+        directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def _result_path(tool_call_id: str, create: bool = False) -> Path:
+    # Call ids may contain ':' (e.g. 'write_chapter:0')
+    return _results_dir(create) / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', tool_call_id)}.txt"
+
+
+def store_tool_result(tool_call_id: str, tool_name: str, result: str,
+                      max_chars: int = ParametersONE.TOOL_RESULT_MAX_CHARS,
+                      preview_chars: int = ParametersONE.TOOL_RESULT_PREVIEW_CHARS) -> str:
+    """
+    The ``tool`` message content for a result: the result itself if it is
+    small, otherwise a reference plus a preview (the full text goes to disk).
+
+    Args:
+        tool_call_id: ID of the call that produced the result
+        tool_name: Name of the tool (for the reference text)
+        result: Full result text
+        max_chars: Results up to this size stay in history as they are
+        preview_chars: Size of the preview kept in history
+
+    Returns:
+        The content to put into history
+    """
+    if len(result) <= max_chars or not tool_call_id:
+        return result
+
+    path = _result_path(tool_call_id, create=True)
+    try:
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(result, encoding="utf-8")
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️  Could not store the result of {tool_name} out of band: {e}")
+        return result
+
+    metrics.incr("tools.results_offloaded_chars", len(result) - preview_chars)
+    events.emit("tool_result_offloaded", tool=tool_name, call_id=tool_call_id, chars=len(result), path=str(path))
+
+    preview = result[:preview_chars]
+    return (f"[{tool_name} returned {len(result):,} characters; the full result is stored out of band. "
+            f"Preview of characters 0-{len(preview):,} below. Call fetch_tool_result with "
+            f"tool_call_id='{tool_call_id}' and an offset to read more.]\n{preview}\n[…]")
+
+
+def fetch_tool_result_impl(tool_call_id: str, offset: int = 0, length: Optional[int] = None) -> str:
+    """
+    Reads a slice of a result stored by store_tool_result.
+
+    Args:
+        tool_call_id: ID of the call whose result to read
+        offset: Character offset to start at
+        length: Number of characters (capped at TOOL_RESULT_MAX_CHARS)
+
+    Returns:
+        The slice with a header giving its position, or an error message
+    """
+    path = _result_path(tool_call_id)
+    if not path.exists():
+        return f"Error: No stored result for tool_call_id '{tool_call_id}'."
+
+    limit = ParametersONE.TOOL_RESULT_MAX_CHARS
+    length = limit if length is None else max(0, min(int(length), limit))
+    offset = max(0, int(offset))
+    try:
+        text = path.read_text(encoding="utf-8")
+    except OSError as e:
+        return f"Error reading stored result '{tool_call_id}': {str(e)}"
+
+    chunk = text[offset:offset + length]
+    end = offset + len(chunk)
+    more = f" Next offset: {end}." if end < len(text) else " End of result."
+    return f"[characters {offset:,}-{end:,} of {len(text):,}.{more}]\n{chunk}"
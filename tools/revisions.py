@@ -0,0 +1,384 @@
+"""
+Revision history of chapters that get overwritten.
+
+Before write_chapter 'overwrite', edit_chapter or a rollback replaces a
+chapter, the version being replaced is recorded in
+``<project>/.revisions/<chapter>/``. A revision is stored as a zlib-compressed
+line delta against the previous revision, with a full keyframe every
+``REVISION_KEYFRAME_INTERVAL`` revisions (or whenever the delta would not be
+smaller). Reading any revision therefore applies at most that many deltas.
+
+Histories are pruned after every new revision, by count (``REVISION_KEEP``)
+and age (``REVISION_MAX_AGE_DAYS``). When the oldest revisions are dropped,
+the first one kept is rewritten as a keyframe.
+
+The ``chapter_history`` tool lists, shows, diffs and rolls back revisions.
+The same operations are available from the command line:
+
+    python -m tools.revisions my_novel list chapter_01.md
+    python -m tools.revisions my_novel diff chapter_01.md 3        # r3 → current file
+    python -m tools.revisions my_novel rollback chapter_01.md 3
+    python -m tools.revisions my_novel prune --keep 20             # every chapter
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from ParametersONE import ParametersONE
+from ads.pipeline import current_iteration
+from .project import get_active_project_folder
+from .writeback import atomic_write, write_behind
+
+REVISIONS_DIRNAME = ".revisions"
+KEYFRAME = "key"
+DELTA = "delta"
+
+_OUTPUT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output")
+
+
+# ---------------------------------------------------------------------- #
+# Line deltas
+# ---------------------------------------------------------------------- #
+
+def encode_delta(base: bytes, target: bytes) -> bytes:
+    """
+    Line delta that turns ``base`` into ``target``.
+
+    Format: ``C <first> <end>\\n`` copies base lines, ``I <length>\\n<bytes>``
+    inserts raw bytes. Lines keep their endings, so the result is exact.
+    """
+    old = base.splitlines(keepends=True)
+    new = target.splitlines(keepends=True)
+    out = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+        if tag == "equal":
+            out.append(b"C %d %d\n" % (i1, i2))
+        elif j2 > j1:  # replace / insert; deletes only skip base lines
+            data = b"".join(new[j1:j2])
+            out.append(b"I %d\n" % len(data))
+            out.append(data)
+    return b"".join(out)
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    old = base.splitlines(keepends=True)
+    out = []
+    pos = 0
+    while pos < len(delta):
+        end = delta.index(b"\n", pos)
+        op, *numbers = delta[pos:end].split()
+        pos = end + 1
+        if op == b"C":
+            out.extend(old[int(numbers[0]):int(numbers[1])])
+        elif op == b"I":
+            length = int(numbers[0])
+            out.append(delta[pos:pos + length])
+            pos += length
+        else:
+            raise ValueError(f"corrupt revision delta (op {op!r})")
+    return b"".join(out)
+
+
+# ---------------------------------------------------------------------- #
+# Store
+# ---------------------------------------------------------------------- #
+
+class ChapterHistory:
+    """Stored revisions of one chapter file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.dir = os.path.join(os.path.dirname(path), REVISIONS_DIRNAME, os.path.basename(path))
+        self.index_path = os.path.join(self.dir, "index.json")
+        self._lock = threading.RLock()
+        self._last: Optional[Tuple[int, bytes]] = None  # (revision, content) of the newest revision
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.entries: List[Dict[str, Any]] = json.load(f)
+        except (OSError, ValueError):
+            self.entries = []
+
+    def _blob_path(self, entry: Dict[str, Any]) -> str:
+        return os.path.join(self.dir, f"{entry['rev']:06d}.{entry['kind']}.z")
+
+    def _entry(self, rev: int) -> Dict[str, Any]:
+        for entry in self.entries:
+            if entry["rev"] == rev:
+                return entry
+        known = f"r{self.entries[0]['rev']}-r{self.entries[-1]['rev']}" if self.entries else "none"
+        raise KeyError(f"revision {rev} not found (stored: {known})")
+
+    def _save_index(self) -> None:
+        atomic_write(self.index_path, json.dumps(self.entries, indent=1).encode("utf-8"))
+
+    def version(self, rev: int) -> bytes:
+        """
+        Content of a revision: its keyframe plus the deltas after it.
+
+        Raises:
+            KeyError: If the revision is not stored
+        """
+        with self._lock:
+            if self._last is not None and self._last[0] == rev:
+                return self._last[1]
+            position = self.entries.index(self._entry(rev))
+            start = position
+            while self.entries[start]["kind"] != KEYFRAME:
+                start -= 1
+            content = b""
+            for entry in self.entries[start:position + 1]:
+                with open(self._blob_path(entry), 'rb') as f:
+                    blob = zlib.decompress(f.read())
+                content = blob if entry["kind"] == KEYFRAME else apply_delta(content, blob)
+            return content
+
+    def record(self, data: bytes, mode: str) -> Optional[int]:
+        """
+        Store ``data`` (the version about to be replaced) as a new revision.
+
+        Returns:
+            The revision number, or None if it equals the newest revision
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if self.entries and self.entries[-1]["sha256"] == sha256:
+                return None
+            os.makedirs(self.dir, exist_ok=True)
+            rev = self.entries[-1]["rev"] + 1 if self.entries else 1
+
+            kind, blob = KEYFRAME, zlib.compress(data, 6)
+            if self.entries:
+                since_keyframe = next(i for i, entry in enumerate(reversed(self.entries)) if entry["kind"] == KEYFRAME)
+                if since_keyframe + 1 < max(ParametersONE.REVISION_KEYFRAME_INTERVAL, 1):
+                    delta = zlib.compress(encode_delta(self.version(self.entries[-1]["rev"]), data), 6)
+                    if len(delta) < len(blob):
+                        kind, blob = DELTA, delta
+
+            entry = {"rev": rev, "kind": kind, "ts": time.time(), "iteration": current_iteration(),
+                     "mode": mode, "bytes": len(data), "stored": len(blob), "sha256": sha256}
+            atomic_write(self._blob_path(entry), blob)
+            self.entries.append(entry)
+            self._last = (rev, data)
+            self.prune()
+            self._save_index()
+            return rev
+
+    def prune(self, keep: Optional[int] = None, max_age_days: Optional[float] = None) -> int:
+        """
+        Drop the oldest revisions beyond ``keep`` or older than ``max_age_days``
+        (defaults from ParametersONE; None or 0 disables a limit).
+
+        Returns:
+            Number of revisions removed
+        """
+        keep = ParametersONE.REVISION_KEEP if keep is None else keep
+        max_age_days = ParametersONE.REVISION_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        with self._lock:
+            drop = 0
+            if keep:
+                drop = max(len(self.entries) - keep, 0)
+            if max_age_days:
+                cutoff = time.time() - max_age_days * 86400
+                while drop < len(self.entries) and self.entries[drop]["ts"] < cutoff:
+                    drop += 1
+            if not drop:
+                return 0
+
+            removed, kept = self.entries[:drop], self.entries[drop:]
+            stale = [self._blob_path(entry) for entry in removed]
+            if kept and kept[0]["kind"] != KEYFRAME:
+                # The first kept revision loses its base → rewrite it as a keyframe
+                blob = zlib.compress(self.version(kept[0]["rev"]), 6)
+                stale.append(self._blob_path(kept[0]))
+                kept[0] = dict(kept[0], kind=KEYFRAME, stored=len(blob))
+                atomic_write(self._blob_path(kept[0]), blob)
+            self.entries = kept
+            self._save_index()  # before the blobs go, so the index never names a missing one
+            for path in stale:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            if not kept:
+                self._last = None
+            return len(removed)
+
+    def listing(self) -> str:
+        with self._lock:
+            if not self.entries:
+                return f"No revisions of '{os.path.basename(self.path)}' yet (they are kept when it is overwritten or edited)."
+            raw = sum(entry["bytes"] for entry in self.entries)
+            stored = sum(entry["stored"] for entry in self.entries)
+            lines = [f"{len(self.entries)} revision{'s' if len(self.entries) != 1 else ''} of "
+                     f"'{os.path.basename(self.path)}' ({raw:,} bytes of text stored in {stored:,}):"]
+            for entry in self.entries:
+                when = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["ts"]))
+                iteration = f", iteration {entry['iteration']}" if entry.get("iteration") is not None else ""
+                lines.append(f"- r{entry['rev']}: {when}{iteration}, replaced by {entry['mode']}, "
+                             f"{entry['bytes']:,} bytes ({entry['kind']}, {entry['stored']:,} stored)")
+            return "\n".join(lines)
+
+
+_histories: Dict[str, ChapterHistory] = {}
+_histories_lock = threading.Lock()
+
+
+def history_for(path: str) -> ChapterHistory:
+    """The (cached) revision history of a chapter file."""
+    path = os.path.abspath(path)
+    with _histories_lock:
+        history = _histories.get(path)
+        if history is None:
+            history = _histories[path] = ChapterHistory(path)
+        return history
+
+
+def record_revision(path: str, data: bytes, mode: str) -> Optional[int]:
+    """
+    Keep the current content of a chapter before it is replaced.
+
+    Never fails the write it protects: errors are reported and swallowed.
+    """
+    try:
+        return history_for(path).record(data, mode)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Could not keep the previous version of '{os.path.basename(path)}': {e}")
+        return None
+
+
+# ---------------------------------------------------------------------- #
+# Tool
+# ---------------------------------------------------------------------- #
+
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", errors="replace")
+
+
+def _rollback(file_path: str, filename: str, rev: int) -> str:
+    from .manifest import record_write  # these modules import this one
+    from .search import notify_write
+    from .writer import hash_index
+
+    history = history_for(file_path)
+    target = history.version(rev)
+    with open(file_path, 'rb') as f:
+        current = f.read()
+    if current == target:
+        return f"No changes: '{filename}' already matches r{rev}; nothing was written."
+    saved = history.record(current, "rollback")
+    atomic_write(file_path, target)
+    hash_index.wrote(file_path, target)
+    notify_write(file_path)
+    record_write(file_path, "rollback", target, _decode(target))
+    kept = f" The replaced version was kept as r{saved}." if saved else ""
+    return f"Rolled back '{filename}' to r{rev} ({len(target):,} bytes).{kept}"
+
+
+def chapter_history_impl(filename: str, action: str = "list", revision: Optional[int] = None,
+                         other: Optional[int] = None) -> str:
+    """
+    Lists, shows, diffs or restores earlier versions of a chapter.
+
+    Args:
+        filename: The chapter file
+        action: "list", "show" (a revision's text), "diff" (a revision against
+            ``other`` or the current file) or "rollback" (restore a revision)
+        revision: Revision number (r1, r2, ... as listed)
+        other: Second revision for "diff"; the current file when omitted
+
+    Returns:
+        The listing, text or diff, a confirmation, or an error message
+    """
+    project_folder = get_active_project_folder()
+    if not project_folder:
+        return "Error: No active project folder. Please create a project first using create_project."
+
+    filename = os.path.basename(filename)
+    if not filename.endswith('.md'):
+        filename = filename + '.md'
+    file_path = os.path.abspath(os.path.join(project_folder, filename))
+    history = history_for(file_path)
+
+    if action == "list":
+        return history.listing()
+    if action not in ("show", "diff", "rollback"):
+        return f"Error: Unknown action '{action}' (use list, show, diff or rollback)."
+    if revision is None:
+        return f"Error: '{action}' needs a revision number; see action 'list'."
+
+    try:
+        write_behind.flush(file_path)
+        if action == "show":
+            return f"[{filename} r{revision}]\n{_decode(history.version(int(revision)))}"
+        if action == "rollback":
+            return _rollback(file_path, filename, int(revision))
+
+        before = _decode(history.version(int(revision)))
+        if other is not None:
+            after, after_name = _decode(history.version(int(other))), f"r{other}"
+        else:
+            with open(file_path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+                after, after_name = f.read(), "current"
+        diff = "".join(difflib.unified_diff(before.splitlines(keepends=True), after.splitlines(keepends=True),
+                                            f"{filename} r{revision}", f"{filename} {after_name}"))
+        return diff or f"No differences between r{revision} and {after_name}."
+    except KeyError as e:
+        return f"Error: {e.args[0]} for '{filename}'."
+    except FileNotFoundError:
+        return f"Error: File '{filename}' does not exist."
+    except Exception as e:
+        return f"Error reading the history of '{filename}': {str(e)}"
+
+
+# ---------------------------------------------------------------------- #
+# Command line
+# ---------------------------------------------------------------------- #
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="List, diff, roll back and prune chapter revisions.")
+    parser.add_argument("project", help="Project folder, or name of a folder in output/")
+    parser.add_argument("action", choices=["list", "show", "diff", "rollback", "prune"])
+    parser.add_argument("chapter", nargs="?", help="Chapter file (prune: every chapter when omitted)")
+    parser.add_argument("revision", nargs="?", type=int)
+    parser.add_argument("other", nargs="?", type=int, help="diff: second revision (default: the current file)")
+    parser.add_argument("--keep", type=int, help="prune: revisions to keep per chapter")
+    parser.add_argument("--days", type=float, help="prune: drop revisions older than this")
+    args = parser.parse_args(argv)
+
+    folder = args.project if os.path.isdir(args.project) else os.path.join(_OUTPUT_ROOT, args.project)
+    if not os.path.isdir(folder):
+        parser.error(f"no such project folder: {folder}")
+    folder = os.path.abspath(folder)
+
+    if args.action == "prune":
+        revisions_dir = os.path.join(folder, REVISIONS_DIRNAME)
+        chapters = [args.chapter] if args.chapter else \
+            (sorted(os.listdir(revisions_dir)) if os.path.isdir(revisions_dir) else [])
+        total = 0
+        for chapter in chapters:
+            removed = history_for(os.path.join(folder, chapter)).prune(args.keep, args.days)
+            total += removed
+            if removed:
+                print(f"🗑  {chapter}: {removed} revision{'s' if removed != 1 else ''} removed")
+        print(f"✓ Pruned {total} revision{'s' if total != 1 else ''}")
+        return 0
+
+    if not args.chapter:
+        parser.error(f"'{args.action}' needs a chapter")
+    from .project import set_active_project_folder
+    set_active_project_folder(folder)
+    result = chapter_history_impl(args.chapter, args.action, args.revision, args.other)
+    print(result)
+    return 1 if result.startswith("Error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
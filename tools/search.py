@@ -0,0 +1,233 @@
+"""
+Full-text search over the active project.
+
+``search_project`` ranks paragraphs of every Markdown file in the project
+folder (chapters and the ``.context_summary_*.md`` files written by
+compression) with BM25 and returns short snippets, for continuity checks
+such as "where did this character last appear".
+
+The inverted index lives in memory, one per project folder, and is built on
+the first query. After that only changed files are re-indexed: the writer
+marks the files it touches dirty (notify_write), and a stat check on each
+query catches any other change (new summaries, edits from outside). Queued
+appends (tools/writeback.py) are flushed before the check.
+"""
+
+import heapq
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from ParametersONE import ParametersONE
+from .project import get_active_project_folder
+from .writeback import write_behind
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"  # kana, CJK ideographs, hangul
+_TERM = re.compile(f"[{_CJK}]|[^\\W{_CJK}]+")
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+
+_K1 = 1.2
+_B = 0.75
+_SNIPPET_CHARS = 300
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words; every CJK character is a term of its own."""
+    return _TERM.findall(text.lower())
+
+
+class Passage:
+    """One indexed paragraph."""
+
+    __slots__ = ("path", "line", "text", "length")
+
+    def __init__(self, path: str, line: int, text: str, length: int):
+        self.path = path
+        self.line = line  # 1-based line of the paragraph's start
+        self.text = text
+        self.length = length  # number of terms
+
+
+class ProjectIndex:
+    """BM25 inverted index over the Markdown files of one folder."""
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self._files: Dict[str, Tuple[int, int, List[int]]] = {}  # path → (size, mtime_ns, passage ids)
+        self._passages: Dict[int, Passage] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}  # term → {passage id: term frequency}
+        self._total_length = 0
+        self._next_id = 0
+        self._dirty: set = set()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ #
+    # Maintenance
+    # ------------------------------------------------------------------ #
+
+    def mark_dirty(self, path: str) -> None:
+        with self._lock:
+            self._dirty.add(path)
+
+    def refresh(self) -> int:
+        """
+        Bring the index up to date with the folder.
+
+        Returns:
+            Number of files (re)indexed or dropped
+        """
+        current = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".md"):
+                    st = entry.stat()
+                    current[os.path.abspath(entry.path)] = (st.st_size, st.st_mtime_ns)
+
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            changed = [path for path, (size, mtime_ns) in current.items()
+                       if path in dirty or self._files.get(path, (None, None))[:2] != (size, mtime_ns)]
+            removed = [path for path in self._files if path not in current]
+            for path in removed:
+                self._remove(path)
+            for path in changed:
+                self._remove(path)
+                self._add(path, *current[path])
+        return len(changed) + len(removed)
+
+    def _remove(self, path: str) -> None:
+        entry = self._files.pop(path, None)
+        if entry is None:
+            return
+        for pid in entry[2]:
+            passage = self._passages.pop(pid)
+            self._total_length -= passage.length
+            for term in set(tokenize(passage.text)):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(pid, None)
+                    if not postings:
+                        del self._postings[term]
+
+    def _add(self, path: str, size: int, mtime_ns: int) -> None:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
+        except OSError:
+            return
+        ids = []
+        line = 1
+        pos = 0
+        for match in list(_PARAGRAPH_BREAK.finditer(text)) + [None]:
+            end = match.start() if match else len(text)
+            paragraph = text[pos:end].strip()
+            if paragraph:
+                leading = len(text[pos:end]) - len(text[pos:end].lstrip())
+                start_line = line + text.count("\n", pos, pos + leading)
+                terms = Counter(tokenize(paragraph))
+                length = sum(terms.values())
+                if length:
+                    pid = self._next_id
+                    self._next_id += 1
+                    self._passages[pid] = Passage(path, start_line, paragraph, length)
+                    self._total_length += length
+                    for term, tf in terms.items():
+                        self._postings.setdefault(term, {})[pid] = tf
+                    ids.append(pid)
+            if match is None:
+                break
+            line += text.count("\n", pos, match.end())
+            pos = match.end()
+        self._files[path] = (size, mtime_ns, ids)
+
+    # ------------------------------------------------------------------ #
+    # Queries
+    # ------------------------------------------------------------------ #
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[float, Passage]]:
+        """Top passages for a query, best first."""
+        terms = set(tokenize(query))
+        with self._lock:
+            count = len(self._passages)
+            if not count or not terms:
+                return []
+            avg_length = self._total_length / count
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for pid, tf in postings.items():
+                    norm = _K1 * (1 - _B + _B * self._passages[pid].length / avg_length)
+                    scores[pid] = scores.get(pid, 0.0) + idf * tf * (_K1 + 1) / (tf + norm)
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(score, self._passages[pid]) for pid, score in best]
+
+
+def _snippet(text: str, terms: List[str]) -> str:
+    """Part of a passage around its first query term, on one line."""
+    lowered = text.lower()
+    hits = [pos for pos in (lowered.find(term) for term in terms) if pos >= 0]
+    start = max(min(hits) - _SNIPPET_CHARS // 3, 0) if hits else 0
+    snippet = " ".join(text[start:start + _SNIPPET_CHARS].split())
+    return ("…" if start else "") + snippet + ("…" if start + _SNIPPET_CHARS < len(text) else "")
+
+
+_indexes: Dict[str, ProjectIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _index_for(folder: str) -> ProjectIndex:
+    folder = os.path.abspath(folder)
+    with _indexes_lock:
+        index = _indexes.get(folder)
+        if index is None:
+            index = _indexes[folder] = ProjectIndex(folder)
+        return index
+
+
+def notify_write(path: str) -> None:
+    """Mark a file re-indexable after a write (no-op until the project has been searched)."""
+    path = os.path.abspath(path)
+    index = _indexes.get(os.path.dirname(path))
+    if index is not None:
+        index.mark_dirty(path)
+
+
+def search_project_impl(query: str, limit: Optional[int] = None) -> str:
+    """
+    Searches the chapters and context summaries of the active project.
+
+    Args:
+        query: Words to look for (names, places, phrases)
+        limit: Maximum number of snippets
+
+    Returns:
+        Ranked snippets with file and line, or a message that nothing matched
+    """
+    project_folder = get_active_project_folder()
+    if not project_folder:
+        return "Error: No active project folder. Please create a project first using create_project."
+
+    limit = max(1, min(int(limit or ParametersONE.SEARCH_RESULTS), 50))
+    index = _index_for(project_folder)
+    try:
+        write_behind.flush(folder=project_folder)
+        index.refresh()
+    except OSError as e:
+        return f"Error indexing project: {str(e)}"
+
+    results = index.search(query, limit)
+    if not results:
+        return f"No matches for '{query}' in the project."
+
+    terms = tokenize(query)
+    lines = [f"{len(results)} best match{'es' if len(results) != 1 else ''} for '{query}':"]
+    for rank, (score, passage) in enumerate(results, start=1):
+        lines.append(f"{rank}. {os.path.basename(passage.path)} (line {passage.line}, score {score:.2f}): "
+                     f"{_snippet(passage.text, terms)}")
+    return "\n".join(lines)
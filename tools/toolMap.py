@@ -1,105 +1,289 @@
 
 
 
-from typing import List, Dict, Any, Callable
-from typing import Dict, Any, Callable
+from typing import List, Dict, Any, Optional
 
-from ads.projectManager import ProjectManager
-from tools import write_chapter_impl, create_project_impl, compress_context_impl
+from ParametersONE import ParametersONE
+from tools.registry import ToolSpec, tool_registry
 
 
+# Built-in tools. Handlers are imported on first use (see tools/registry.py).
+tool_registry.register(ToolSpec(
+    name="create_project",
+    description="Creates a new project folder in the 'output' directory with a sanitized name. This should be called first before writing any files. Only one project can be active at a time.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "project_name": {
+                "type": "string",
+                "description": "The name for the project folder (will be sanitized for filesystem compatibility)"
+            }
+        },
+        "required": ["project_name"]
+    },
+    handler="tools.project:create_project_impl",
+    concurrency=ToolSpec.STATEFUL,  # switches the session's active project
+    blocking=False,
+))
+
+tool_registry.register(ToolSpec(
+    name="write_chapter",
+    description="Writes content to a markdown file in the active project folder. Supports three modes: 'create' (creates new file, fails if exists), 'append' (adds content to end of existing file), 'overwrite' (replaces entire file content).",
+    parameters={
+        "type": "object",
+        "properties": {
+
+            "filename": {
+                "type": "string",
+                "description": "The name of the markdown file to write (should end in .md)"
+            },
+            "content": {
+                "type": "string",
+                "description": "The content to write to the file"
+            },
+            "mode": {
+                "type": "string",
+                "enum": ["create", "append", "overwrite"],
+                "description": "The write mode: 'create' for new files, 'append' to add to existing, 'overwrite' to replace"
+            }
+        },
+        "required": ["filename", "content", "mode"]
+    },
+    handler="tools.writer:write_chapter_impl",
+    async_handler="tools.writer:write_chapter_impl_async",
+    concurrency=ToolSpec.IO,
+    path_arg="filename",
+    timeout=ParametersONE.TOOL_TIMEOUT,
+))
+
+tool_registry.register(ToolSpec(
+    name="edit_chapter",
+    description="Applies targeted edits to an existing markdown file in the active project folder, so a revision does not need to resend the whole chapter. Operations are applied in order and atomically: if one does not apply, nothing is changed. Prefer this over write_chapter 'overwrite' for changes to part of a chapter.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "filename": {
+                "type": "string",
+                "description": "The name of the markdown file to edit"
+            },
+            "edits": {
+                "type": "array",
+                "description": "Edit operations, applied in order",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "op": {
+                            "type": "string",
+                            "enum": ["replace", "replace_section", "insert_section", "diff"],
+                            "description": "'replace': replace the exact text 'search' (must occur once) with 'replace'. 'replace_section': replace the body of the section under 'heading' with 'content'. 'insert_section': insert 'content' before or after the section under 'heading' (see 'position'). 'diff': apply the unified diff in 'diff'."
+                        },
+                        "search": {"type": "string", "description": "replace: exact text to find"},
+                        "replace": {"type": "string", "description": "replace: replacement text"},
+                        "heading": {"type": "string", "description": "Section operations: the Markdown heading, e.g. '## The Storm'"},
+                        "position": {"type": "string", "enum": ["before", "after"], "description": "insert_section: where to insert (default 'after')"},
+                        "content": {"type": "string", "description": "Section operations: the new text"},
+                        "diff": {"type": "string", "description": "diff: unified diff with @@ hunk headers"}
+                    },
+                    "required": ["op"]
+                }
+            }
+        },
+        "required": ["filename", "edits"]
+    },
+    handler="tools.editor:edit_chapter_impl",
+    concurrency=ToolSpec.IO,
+    path_arg="filename",
+    timeout=ParametersONE.TOOL_TIMEOUT,
+))
+
+tool_registry.register(ToolSpec(
+    name="read_chapter",
+    description="Reads part of a markdown file in the active project folder: the section under a heading, a range of lines or a range of bytes. Without a range, returns a short file whole, or else its outline (headings with line numbers). Use it to re-read earlier scenes instead of keeping whole chapters in mind.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "filename": {
+                "type": "string",
+                "description": "The name of the markdown file to read"
+            },
+            "heading": {
+                "type": "string",
+                "description": "Read the section under this Markdown heading, e.g. '## The Storm'"
+            },
+            "start_line": {
+                "type": "integer",
+                "description": "First line to read (1-based)"
+            },
+            "end_line": {
+                "type": "integer",
+                "description": "Last line to read (inclusive)"
+            },
+            "start_byte": {
+                "type": "integer",
+                "description": "First byte to read"
+            },
+            "end_byte": {
+                "type": "integer",
+                "description": "Byte offset to stop at (exclusive)"
+            }
+        },
+        "required": ["filename"]
+    },
+    handler="tools.reader:read_chapter_impl",
+    concurrency=ToolSpec.IO,  # ordered after writes of the same file in the turn
+    path_arg="filename",
+))
+
+tool_registry.register(ToolSpec(
+    name="search_project",
+    description="Full-text search over all chapters and context summaries of the active project. Returns the best matching paragraphs as short snippets with file name and line number. Use it for continuity checks (where a character last appeared, what something was named) instead of guessing.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "Words to look for: names, places, phrases"
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of snippets (default 8)"
+            }
+        },
+        "required": ["query"]
+    },
+    handler="tools.search:search_project_impl",
+    concurrency=ToolSpec.PROJECT,  # indexes every chapter → after the turn's earlier writes
+))
+
+tool_registry.register(ToolSpec(
+    name="project_status",
+    description="Reports what the active project contains: every chapter file with its word count, size, number of writes, last write modes and iteration, and content hash, plus totals. Cheap; use it to check progress instead of re-reading chapters.",
+    parameters={
+        "type": "object",
+        "properties": {},
+        "required": []
+    },
+    handler="tools.manifest:project_status_impl",
+    concurrency=ToolSpec.PROJECT,  # stats every chapter → after the turn's earlier writes
+))
+
+tool_registry.register(ToolSpec(
+    name="chapter_history",
+    description="Earlier versions of a chapter: every overwrite or edit keeps the replaced version as a numbered revision. 'list' shows the revisions, 'show' returns one revision's text, 'diff' compares a revision with another one or with the current file, 'rollback' restores a revision (the version it replaces is kept too).",
+    parameters={
+        "type": "object",
+        "properties": {
+            "filename": {
+                "type": "string",
+                "description": "The chapter file"
+            },
+            "action": {
+                "type": "string",
+                "enum": ["list", "show", "diff", "rollback"],
+                "description": "What to do (default 'list')"
+            },
+            "revision": {
+                "type": "integer",
+                "description": "Revision number for show, diff and rollback"
+            },
+            "other": {
+                "type": "integer",
+                "description": "diff only: the revision to compare with (default: the current file)"
+            }
+        },
+        "required": ["filename"]
+    },
+    handler="tools.revisions:chapter_history_impl",
+    concurrency=ToolSpec.IO,  # rollback replaces the file
+    path_arg="filename",
+))
 
+tool_registry.register(ToolSpec(
+    name="compress_context",
+    description="INTERNAL TOOL - This is automatically called by the system when token limit is approached. You should not call this manually. It compresses the conversation history to save tokens.",
+    parameters={
+        "type": "object",
+        "properties": {},
+        "required": []
+    },
+    handler="tools.compression:compress_context_tool",
+    concurrency=ToolSpec.STATEFUL,  # rewrites the history
+    needs_agent=True,
+))
 
+tool_registry.register(ToolSpec(
+    name="fetch_tool_result",
+    description="Reads part of a large tool result that was stored out of band (its tool message shows only a preview and the tool_call_id). Returns up to a few thousand characters starting at the given offset.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "tool_call_id": {
+                "type": "string",
+                "description": "The tool_call_id named in the stored result's preview"
+            },
+            "offset": {
+                "type": "integer",
+                "description": "Character offset to start reading at (default 0)"
+            },
+            "length": {
+                "type": "integer",
+                "description": "Number of characters to read (capped)"
+            }
+        },
+        "required": ["tool_call_id"]
+    },
+    handler="tools.results:fetch_tool_result_impl",
+    concurrency=ToolSpec.PURE,
+    offload=False,  # its output is already bounded
+))
 
 
 class ToolMap:
+    """A session's view of the tool registry."""
 
     def __init__(self):
-        '''
-
-        '''
+        tool_registry.load_plugins(ParametersONE.TOOL_PLUGINS)
 
     def get_tool_definitions(self) -> List[Dict[str, Any]]:
         """
         Returns the tool definitions in the format expected by kimi-k2-thinking.
 
+        The list is built once by the registry and shared; do not modify it.
+
         Returns:
             List of tool definition dictionaries
         """
-        return [
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_project",
-                    "description": "Creates a new project folder in the 'output' directory with a sanitized name. This should be called first before writing any files. Only one project can be active at a time.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "project_name": {
-                                "type": "string",
-                                "description": "The name for the project folder (will be sanitized for filesystem compatibility)"
-                            }
-                        },
-                        "required": ["project_name"]
-                    }
-                }
-            },
-            
-            {
-                "type": "function",
-                "function": {
-                    "name": "write_chapter",
-                    "description": "Writes content to a markdown file in the active project folder. Supports three modes: 'create' (creates new file, fails if exists), 'append' (adds content to end of existing file), 'overwrite' (replaces entire file content).",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-
-                            "filename": {
-                                "type": "string",
-                                "description": "The name of the markdown file to write (should end in .md)"
-                            },
-                            "content": {
-                                "type": "string",
-                                "description": "The content to write to the file"
-                            },
-                            "mode": {
-                                "type": "string",
-                                "enum": ["create", "append", "overwrite"],
-                                "description": "The write mode: 'create' for new files, 'append' to add to existing, 'overwrite' to replace"
-                            }
-                        },
-                        "required": ["filename", "content", "mode"]
-                    }
-                }
-            },
-            
-
-            {
-                "type": "function",
-                "function": {
-                    "name": "compress_context",
-                    "description": "INTERNAL TOOL - This is automatically called by the system when token limit is approached. You should not call this manually. It compresses the conversation history to save tokens.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {},
-                        "required": []
-                    }
-                }
-            }
-        ]
-    
-    
-    def get_tool_map(self) -> Dict[str, Callable]:
+        return tool_registry.definitions
+
+    def get_tool_definitions_json(self) -> bytes:
+        """The tool definitions as JSON bytes (encoded once)."""
+        return tool_registry.definitions_json
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        """The spec of a tool, or None for an unknown tool."""
+        return tool_registry.get(name)
+
+    def get_parameters_schema(self, name: str) -> Optional[Dict[str, Any]]:
         """
-        Returns a mapping of tool names to their implementation functions.
+        Returns the JSON schema of a tool's parameters.
+
+        Args:
+            name: Tool name
 
         Returns:
-            Dictionary mapping tool name strings to callable functions
+            The ``parameters`` schema, or None for an unknown tool
+        """
+        spec = tool_registry.get(name)
+        return spec.parameters if spec else None
+
+    def get_tool_map(self) -> Dict[str, ToolSpec]:
         """
+        Returns a mapping of tool names to their (lazily loaded) implementations.
 
+        Specs are callable: ``tool_map[name](**args)`` imports the handler on
+        first use. Tools that need the agent go through ``ToolSpec.invoke``.
 
-        return {
-            "create_project": create_project_impl,
-            "write_chapter": write_chapter_impl,
-            "compress_context": compress_context_impl
-        }
+        Returns:
+            Dictionary mapping tool name strings to callable tool specs
+        """
+        return tool_registry.specs
@@ -0,0 +1,494 @@
+"""
+Write-behind buffer and atomic replace for chapter files.
+
+Appends are queued in memory and written in one go at the end of the
+iteration's tool stage (or earlier, when a file's queue grows past
+``WRITE_BEHIND_MAX_BYTES`` or something needs to read the file). Creates and
+overwrites go through ``atomic_write``: a temp file in the same folder that is
+renamed over the target, so a crash never leaves a half-written chapter.
+
+When the data reaches the disk is set by ``ParametersONE.WRITE_FSYNC``:
+
+- ``"call"``: no buffering; every write is fsynced before the tool returns
+- ``"iteration"``: queued appends are written and everything written during
+  the iteration is fsynced at the end of its tool stage
+- ``"shutdown"``: as "iteration", but fsync only happens on shutdown
+
+Anything that reads a chapter (read_chapter, edit_chapter, search_project,
+the writer's own checks) calls ``flush`` for it first, so readers always see
+every queued append. ``UtilsONE.graceful_shutdown`` and interpreter exit
+flush and fsync whatever is left.
+
+A queued append is not only in memory: before ``append`` returns, the text is
+written to a journal next to the chapter (``.<chapter>.journal``), together
+with the file offset it belongs at. The journal is emptied once the queue is
+written to the chapter. If the process dies in between, the first use of the
+folder (or ``recover``) replays the journal, skipping text that already
+reached the chapter. Journal writes are not fsynced on their own: they
+survive a crash or kill of the process; power loss is covered by the fsync
+policy as above. With the "call" policy nothing is journaled.
+
+A flush that fails keeps its text queued (and journaled), emits a
+``write_error`` event and is reported in the next tool result
+(``take_failures``).
+
+Appends are written through open handles kept in a small LRU pool per project
+folder (``APPEND_HANDLES``), so a chapter built from dozens of appends is
+opened once, not once per flush. Handles are unbuffered: a flush is one write
+straight to the OS. They are closed when evicted, before ``atomic_write``
+replaces their file, when the session switches to another project
+(``release``) and on shutdown. Files replaced or deleted from outside the
+process while a handle is open are not detected; the handle still points to
+the old file until it is evicted.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import BinaryIO, Dict, List, Optional, Set, Tuple
+
+from ParametersONE import ParametersONE
+from ads.eventLog import events
+from ads.metrics import metrics
+from ads.pipeline import pipeline
+
+logger = logging.getLogger(__name__)
+
+FSYNC_CALL = "call"
+FSYNC_ITERATION = "iteration"
+FSYNC_SHUTDOWN = "shutdown"
+
+JOURNAL_SUFFIX = ".journal"
+_RECORD = b"WBJ1 %d %d\n"  # offset in the chapter, length; followed by the text
+
+
+def journal_path(path: str) -> str:
+    """Journal of the queued appends of a chapter."""
+    return os.path.join(os.path.dirname(path), f".{os.path.basename(path)}{JOURNAL_SUFFIX}")
+
+
+def _fsync_path(path: str) -> None:
+    """fsync a file (or directory) by path; directories cannot be opened on Windows, which is fine."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class WriteBehind:
+    """Queued appends per file, the open append handles, and the files written but not yet fsynced."""
+
+    def __init__(self):
+        self._pending: Dict[str, List[bytes]] = {}
+        self._pending_bytes: Dict[str, int] = {}
+        self._unsynced: Set[str] = set()
+        self._lock = threading.Lock()
+        # Guards the handles and all writes through them (flushes are short, one write each)
+        self._io_lock = threading.RLock()
+        self._handles: Dict[str, "OrderedDict[str, BinaryIO]"] = {}  # folder → {path: handle}, LRU order
+        self._recovered: Set[str] = set()  # folders whose journals were checked
+        self._failures: List[str] = []  # flush errors not yet reported to the model
+
+    @staticmethod
+    def policy() -> str:
+        return ParametersONE.WRITE_FSYNC
+
+    # ------------------------------------------------------------------ #
+    # Handle pool (callers hold _io_lock)
+    # ------------------------------------------------------------------ #
+
+    def _handle(self, path: str) -> BinaryIO:
+        """The open append handle of a file, opening it (and evicting the LRU one) if needed."""
+        pool = self._handles.setdefault(os.path.dirname(path), OrderedDict())
+        handle = pool.get(path)
+        if handle is not None:
+            pool.move_to_end(path)
+            metrics.incr("writer.handle_hits")
+            return handle
+        handle = open(path, 'ab', buffering=0)
+        pool[path] = handle
+        metrics.incr("writer.handle_opens")
+        while len(pool) > max(ParametersONE.APPEND_HANDLES, 1):
+            _, evicted = pool.popitem(last=False)
+            evicted.close()
+            metrics.incr("writer.handle_evictions")
+        return handle
+
+    def _close_handle(self, path: str) -> None:
+        pool = self._handles.get(os.path.dirname(path))
+        handle = pool.pop(path, None) if pool else None
+        if handle is not None:
+            handle.close()
+
+    def open_handles(self, folder: Optional[str] = None) -> int:
+        """Number of open append handles (of one folder, or in total)."""
+        with self._io_lock:
+            if folder is not None:
+                return len(self._handles.get(os.path.abspath(folder), ()))
+            return sum(len(pool) for pool in self._handles.values())
+
+    def release(self, folder: str) -> None:
+        """
+        Write a project's queued appends and close its handles (project switch).
+
+        Raises:
+            OSError: If queued text cannot be written; it stays queued
+        """
+        folder = os.path.abspath(folder)
+        try:
+            self.flush(folder=folder)
+        finally:
+            with self._io_lock:
+                self._close_pool(self._handles.pop(folder, {}))
+
+    @staticmethod
+    def _close_pool(pool: Dict[str, BinaryIO]) -> None:
+        """Close handles; journals left empty (their queue was written) are removed."""
+        for path, handle in pool.items():
+            handle.close()
+            if path.endswith(JOURNAL_SUFFIX):
+                try:
+                    if os.path.getsize(path) == 0:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    # ------------------------------------------------------------------ #
+    # Queueing
+    # ------------------------------------------------------------------ #
+
+    def append(self, path: str, data: bytes) -> None:
+        """
+        Queue ``data`` for the end of ``path`` and journal it (written at once with the "call" policy).
+
+        Raises:
+            OSError: If the journal or a write that happens now (policy "call",
+                full queue) fails; when the journal fails, nothing is queued
+        """
+        self.recover(os.path.dirname(path))
+        with self._io_lock:
+            if self.policy() != FSYNC_CALL:
+                # Where the text belongs: the end of the file plus what is queued before it
+                try:
+                    offset = os.path.getsize(path)
+                except OSError:
+                    offset = 0
+                offset += self._pending_bytes.get(path, 0)
+                self._handle(journal_path(path)).write(_RECORD % (offset, len(data)) + data)
+            with self._lock:
+                self._pending.setdefault(path, []).append(data)
+                queued = self._pending_bytes[path] = self._pending_bytes.get(path, 0) + len(data)
+        metrics.incr("writer.queued_bytes", len(data))
+        if self.policy() == FSYNC_CALL:
+            self.flush(path, sync=True)
+        elif queued >= ParametersONE.WRITE_BEHIND_MAX_BYTES:
+            self.flush(path)
+
+    def pending(self, path: str) -> bytes:
+        """Queued, not yet written bytes of a file (b"" if none)."""
+        with self._lock:
+            parts = self._pending.get(path)
+            if not parts:
+                return b""
+            if len(parts) > 1:
+                parts[:] = [b"".join(parts)]
+            return parts[0]
+
+    def written(self, path: str) -> None:
+        """Note a file written outside the queue (atomic_write) for the next fsync."""
+        if self.policy() == FSYNC_CALL:
+            return
+        with self._lock:
+            self._unsynced.add(path)
+
+    # ------------------------------------------------------------------ #
+    # Flushing
+    # ------------------------------------------------------------------ #
+
+    def flush(self, path: Optional[str] = None, folder: Optional[str] = None, sync: bool = False) -> int:
+        """
+        Write queued appends to disk.
+
+        Args:
+            path: Only this file
+            folder: Only files directly in this folder
+            sync: Also fsync every file written since the last sync (and their folders)
+
+        Returns:
+            Number of bytes written
+
+        Raises:
+            OSError: If a file cannot be written; its queue is kept for the next flush
+        """
+        if path is not None:
+            self.recover(os.path.dirname(path))
+        elif folder is not None:
+            self.recover(folder)
+        with self._lock:
+            if path is not None:
+                paths = [path] if path in self._pending else []
+            elif folder is not None:
+                folder = os.path.abspath(folder)
+                paths = [p for p in self._pending if os.path.dirname(p) == folder]
+            else:
+                paths = list(self._pending)
+
+        written = 0
+        failure = None
+        for target in paths:
+            try:
+                written += self._write_pending(target)
+            except OSError as e:
+                self._failed(target, e)
+                failure = failure or e
+        if sync:
+            self.sync()
+        if failure is not None:
+            raise failure
+        return written
+
+    def _write_pending(self, path: str) -> int:
+        # Imported here: both modules import this one
+        from .search import notify_write
+        from .writer import hash_index
+
+        with self._io_lock:
+            with self._lock:
+                parts = self._pending.pop(path, None)
+                self._pending_bytes.pop(path, None)
+            if not parts:
+                return 0
+            data = b"".join(parts)
+            try:
+                handle = self._handle(path)
+                old_size = handle.tell()
+                handle.write(data)  # unbuffered → one write(2), visible to readers at once
+            except OSError:
+                self._close_handle(path)  # reopened on the next attempt
+                with self._lock:
+                    # Put the text back in front of anything queued meanwhile
+                    self._pending[path] = [data] + self._pending.get(path, [])
+                    self._pending_bytes[path] = len(data) + self._pending_bytes.get(path, 0)
+                raise
+            with self._lock:
+                self._unsynced.add(path)
+                queued_meanwhile = path in self._pending
+            if not queued_meanwhile:
+                self._clear_journal(path)
+            hash_index.appended(path, data, old_size)
+        notify_write(path)
+        metrics.incr("writer.flushed_bytes", len(data))
+        return len(data)
+
+    def _clear_journal(self, path: str) -> None:
+        """Empty a chapter's journal once its queue is on disk (callers hold _io_lock)."""
+        journal = journal_path(path)
+        pool = self._handles.get(os.path.dirname(path))
+        handle = pool.get(journal) if pool else None
+        try:
+            if handle is not None:
+                handle.truncate(0)
+            elif os.path.exists(journal):
+                os.truncate(journal, 0)
+        except OSError as e:
+            logger.warning("Could not clear the write-behind journal %s: %s", journal, e)
+
+    def _failed(self, path: str, error: OSError) -> None:
+        metrics.incr("writer.flush_errors")
+        logger.warning("Write-behind flush of %s failed: %s", path, error)
+        events.emit("write_error", path=path, error=str(error))
+        with self._lock:
+            self._failures.append(f"'{os.path.basename(path)}': {error}")
+
+    def take_failures(self) -> Optional[str]:
+        """
+        Flush errors since the last call, as a note for the model (None if there were none).
+
+        The text of a failed flush is still queued and journaled; it is retried
+        at the next flush.
+        """
+        with self._lock:
+            failures, self._failures = self._failures, []
+        if not failures:
+            return None
+        return ("Warning: appended text could not be written to disk yet (it is kept and retried): "
+                + "; ".join(dict.fromkeys(failures)))
+
+    def recover(self, folder: str) -> int:
+        """
+        Replay the journals of a folder left by a process that died with queued
+        appends (once per folder and process).
+
+        Returns:
+            Number of bytes written back to chapters
+        """
+        folder = os.path.abspath(folder)
+        if folder in self._recovered:
+            return 0
+        with self._io_lock:
+            if folder in self._recovered:
+                return 0
+            self._recovered.add(folder)
+            try:
+                journals = [entry.path for entry in os.scandir(folder)
+                            if entry.name.startswith(".") and entry.name.endswith(JOURNAL_SUFFIX) and entry.is_file()]
+            except OSError:
+                return 0
+            restored = 0
+            for journal in journals:
+                path = os.path.join(folder, os.path.basename(journal)[1:-len(JOURNAL_SUFFIX)])
+                try:
+                    restored += self._replay(journal, path)
+                except (OSError, ValueError) as e:
+                    logger.warning("Could not replay the write-behind journal %s: %s", journal, e)
+                    events.emit("write_error", path=path, error=f"journal replay: {e}")
+        return restored
+
+    def _replay(self, journal: str, path: str) -> int:
+        from .search import notify_write  # imported here: search imports this module
+
+        with open(journal, 'rb') as f:
+            raw = f.read()
+        restored = 0
+        pos = 0
+        while pos < len(raw):
+            end = raw.find(b"\n", pos)
+            if end < 0:
+                break  # torn header at the end: the append never returned success
+            _, offset, length = raw[pos:end].split()
+            offset, length = int(offset), int(length)
+            data = raw[end + 1:end + 1 + length]
+            pos = end + 1 + length
+            if len(data) < length:
+                break  # torn text, same as above
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+            if size >= offset + length:
+                continue  # reached the chapter before the crash
+            if size < offset:
+                logger.warning("Journal of %s expects %d bytes before its text, the file has %d", path, offset, size)
+            with open(path, 'ab') as f:
+                f.write(data[max(size - offset, 0):])
+            restored += length - max(size - offset, 0)
+        if restored:
+            _fsync_path(path)
+            notify_write(path)
+            metrics.incr("writer.recovered_bytes", restored)
+            events.emit("write_recovered", path=path, bytes=restored)
+            print(f"♻️  Restored {restored:,} bytes of queued text to '{os.path.basename(path)}' from its journal")
+        os.remove(journal)
+        return restored
+
+    def sync(self) -> int:
+        """fsync every file written since the last sync, then their folders; returns the file count."""
+        with self._lock:
+            paths, self._unsynced = self._unsynced, set()
+        for path in paths:
+            with self._io_lock:
+                pool = self._handles.get(os.path.dirname(path))
+                handle = pool.get(path) if pool else None
+                if handle is not None:
+                    try:
+                        os.fsync(handle.fileno())
+                    except OSError:
+                        pass
+                    continue
+            _fsync_path(path)
+        for folder in {os.path.dirname(path) for path in paths}:
+            _fsync_path(folder)
+        if paths:
+            metrics.incr("writer.fsyncs", len(paths))
+        return len(paths)
+
+    def end_iteration(self) -> None:
+        """Iteration boundary: write the queues, fsync unless the policy defers it to shutdown."""
+        try:
+            self.flush(sync=self.policy() != FSYNC_SHUTDOWN)
+        except OSError as e:
+            # Already emitted and noted for the next tool result by flush()
+            print(f"⚠️  Could not write queued chapter text (kept for the next attempt): {e}")
+
+    def close(self) -> None:
+        """Shutdown: write and fsync everything, then close every handle."""
+        try:
+            self.flush(sync=True)
+        except OSError as e:
+            print(f"⚠️  Could not write queued chapter text on shutdown (it stays in the journal): {e}")
+        finally:
+            with self._io_lock:
+                for pool in self._handles.values():
+                    self._close_pool(pool)
+                self._handles.clear()
+
+
+# ← Process-wide queue (keyed by absolute path, so sessions never collide)
+write_behind = WriteBehind()
+atexit.register(write_behind.close)
+
+
+@pipeline.hook("post_stage")
+def _flush_after_tools(stage: str, iteration: int, wall_s: float, cpu_s: float) -> None:
+    if stage == "tools":
+        write_behind.end_iteration()
+
+
+def create_temp(path: str) -> Tuple[int, str]:
+    """
+    A new, uniquely named temp file next to ``path``, for a later rename over it.
+
+    Unlike ``tempfile.mkstemp`` (mode 0600) the file gets the usual umask-based
+    permissions, so replaced chapters stay readable like files written in place.
+
+    Returns:
+        (open file descriptor, temp path)
+    """
+    while True:
+        tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex[:12]}.tmp")
+        try:
+            return os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666), tmp_path
+        except FileExistsError:
+            continue
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """
+    Replace ``path`` with ``data`` through a temp file and a rename.
+
+    Queued appends for the file must be flushed first (they would land in the
+    old version). With the "call" policy the temp file and the folder are
+    fsynced before this returns; otherwise at the next sync.
+    """
+    folder = os.path.dirname(path)
+    fd, tmp_path = create_temp(path)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if write_behind.policy() == FSYNC_CALL:
+                f.flush()
+                os.fsync(f.fileno())
+        with write_behind._io_lock:
+            # An open append handle would keep writing to the old file; holding the
+            # lock, no flush can reopen it between the close and the rename
+            write_behind._close_handle(path)
+            os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    if write_behind.policy() == FSYNC_CALL:
+        _fsync_path(folder)
+    else:
+        write_behind.written(path)
@@ -1,12 +1,116 @@
 """
 File writing tool for creating and managing markdown files.
+
+Creates and overwrites replace the file atomically; appends are queued and
+written at the end of the iteration (see tools/writeback.py). An overwrite
+keeps the replaced version in the chapter's revision history (tools/revisions.py).
 """
 
+import asyncio
+import hashlib
 import os
-from typing import Literal
+import threading
+from typing import Dict, Literal, Optional, Tuple
 
+from ParametersONE import ParametersONE
+from ads.metrics import metrics
 from ads.projectManager import ProjectManager
 from .project import get_active_project_folder
+from .manifest import record_write
+from .revisions import record_revision
+from .search import notify_write
+from .writeback import atomic_write, write_behind
+
+
+class ContentHashIndex:
+    """
+    SHA-256 of every chapter file written by this process.
+
+    An entry is only trusted while the file's size and mtime are the ones
+    recorded after the last write; otherwise the hash is recomputed from disk.
+    Appends update the stored hash incrementally instead of re-reading the file.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[int, int, "hashlib._Hash"]] = {}
+        self._lock = threading.Lock()
+
+    def digest(self, path: str) -> Optional[bytes]:
+        """Current content hash of a file, or None if it does not exist."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[:2] == (st.st_size, st.st_mtime_ns):
+                return entry[2].digest()
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                hasher.update(block)
+        self._store(path, hasher)
+        return hasher.digest()
+
+    def wrote(self, path: str, data: bytes) -> None:
+        """Record that the file now holds exactly ``data``."""
+        self._store(path, hashlib.sha256(data))
+
+    def appended(self, path: str, data: bytes, old_size: int) -> None:
+        """Record an append; the hash is extended if the entry was current before it."""
+        with self._lock:
+            entry = self._entries.pop(path, None)
+        if entry is None or entry[0] != old_size:
+            return  # unknown or stale → recomputed on the next lookup
+        hasher = entry[2]
+        hasher.update(data)
+        self._store(path, hasher)
+
+    def _store(self, path: str, hasher) -> None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        with self._lock:
+            self._entries[path] = (st.st_size, st.st_mtime_ns, hasher)
+
+
+# ← Process-wide index (keyed by absolute path, so sessions never collide)
+hash_index = ContentHashIndex()
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return -1
+
+
+def _same_content(path: str, data: bytes) -> bool:
+    """Whether the file already holds exactly ``data`` (size check first, then hash)."""
+    return _file_size(path) == len(data) and hash_index.digest(path) == hashlib.sha256(data).digest()
+
+
+def _ends_with(path: str, data: bytes) -> bool:
+    """Whether the file (with its queued appends) already ends with ``data`` (a repeated append)."""
+    if len(data) < ParametersONE.APPEND_DEDUP_MIN_CHARS:
+        return False
+    queued = write_behind.pending(path)
+    if len(queued) >= len(data):
+        return queued.endswith(data)
+    write_behind.flush(path)
+    size = _file_size(path)
+    if size < len(data):
+        return False
+    with open(path, 'rb') as f:
+        f.seek(size - len(data))
+        return f.read(len(data)) == data
+
+
+def _unchanged(filename: str, data: bytes, reason: str) -> str:
+    metrics.incr("writer.skipped_writes")
+    metrics.incr("writer.skipped_bytes", len(data))
+    return f"No changes: '{filename}' {reason}; nothing was written. Continue with the next step."
 
 
 def write_chapter_impl(filename: str, content: str, mode: Literal["create", "append", "overwrite"]) -> str:
@@ -28,33 +132,54 @@ def write_chapter_impl(filename: str, content: str, mode: Literal["create", "app
     if not project_folder:
         return "Error: No active project folder. Please create a project first using create_project."
     
+    # Only a file name: directories would lead out of the project folder
+    filename = os.path.basename(filename)
     # Ensure filename ends with .md
     if not filename.endswith('.md'):
         filename = filename + '.md'
     
     # Create full file path
-    file_path = os.path.join(project_folder, filename)
-    
+    file_path = os.path.abspath(os.path.join(project_folder, filename))
+    data = content.encode('utf-8')
+
     try:
+        if mode != "append":
+            # Queued appends belong before anything that looks at or replaces the file
+            write_behind.flush(file_path)
+
         if mode == "create":
             # Create mode: fail if file exists
             if os.path.exists(file_path):
+                if _same_content(file_path, data):
+                    return _unchanged(filename, data, "already exists with exactly this content")
                 return f"Error: File '{filename}' already exists. Use 'append' or 'overwrite' mode to modify it."
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            atomic_write(file_path, data)
+            hash_index.wrote(file_path, data)
+            notify_write(file_path)
+            record_write(file_path, mode, data, content)
             return f"Successfully created file '{filename}' with {len(content)} characters."
         
         elif mode == "append":
-            # Append mode: add to end of file
-            with open(file_path, 'a', encoding='utf-8') as f:
-                f.write(content)
+            # A repeated append (retry after an error, recovery) would duplicate the text
+            if _ends_with(file_path, data):
+                return _unchanged(filename, data, "already ends with exactly this text (repeated append)")
+            # Append mode: queued for the end of the file (written by the end of the iteration)
+            write_behind.append(file_path, data)
+            record_write(file_path, mode, data, content)
             return f"Successfully appended {len(content)} characters to '{filename}'."
         
         elif mode == "overwrite":
-            # Overwrite mode: replace entire file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            if _same_content(file_path, data):
+                return _unchanged(filename, data, "already has exactly this content")
+            if os.path.exists(file_path):
+                with open(file_path, 'rb') as f:
+                    record_revision(file_path, f.read(), mode)
+            # Overwrite mode: replace entire file (atomically, never truncated in place)
+            atomic_write(file_path, data)
+            hash_index.wrote(file_path, data)
+            notify_write(file_path)
+            record_write(file_path, mode, data, content)
             return f"Successfully overwrote '{filename}' with {len(content)} characters."
         
         else:
@@ -63,3 +188,72 @@ def write_chapter_impl(filename: str, content: str, mode: Literal["create", "app
     except Exception as e:
         return f"Error writing file '{filename}': {str(e)}"
 
+
+
+
+async def write_chapter_impl_async(filename: str, content: str,
+                                   mode: Literal["create", "append", "overwrite"]) -> str:
+    """
+    Async variant of write_chapter_impl for the asyncio agent loop.
+
+    The blocking file I/O runs in a worker thread; ``asyncio.to_thread`` copies the
+    current context, so the calling session's active project folder is used.
+
+    Args:
+        filename: The name of the file to write
+        content: The content to write
+        mode: The write mode - 'create', 'append', or 'overwrite'
+
+    Returns:
+        Success message or error message
+    """
+    return await asyncio.to_thread(write_chapter_impl, filename, content, mode)
+
+
+def save_partial_chapter_impl(filename: str, content: str, mode: str = None) -> str:
+    """
+    Persists the content of a write_chapter call that could not be executed
+    as sent (truncated or malformed arguments).
+
+    New files and appends are written to the target file itself, so the model
+    only has to append the rest. Anything that would replace an existing file
+    goes to ``<name>.partial.md`` to leave the previous version intact.
+
+    Args:
+        filename: The name of the file the call was writing
+        content: The recovered (partial) content
+        mode: The recovered write mode, if any
+
+    Returns:
+        A note for the model describing where the text went, or an error message
+    """
+    project_folder = get_active_project_folder()
+    if not project_folder:
+        return "Error: No active project folder. Please create a project first using create_project."
+
+    filename = os.path.basename(filename)
+    if not filename.endswith('.md'):
+        filename = filename + '.md'
+    file_path = os.path.abspath(os.path.join(project_folder, filename))
+
+    try:
+        if mode == "append" or not (os.path.exists(file_path) or write_behind.pending(file_path)):
+            data = content.encode('utf-8')
+            write_behind.append(file_path, data)
+            record_write(file_path, "partial", data, content, appended=True)
+            return (f"The {len(content):,} characters you had written were saved to '{filename}'. "
+                    f"Continue it with write_chapter in 'append' mode from exactly where it stops; "
+                    f"do not regenerate text that is already saved.")
+
+        partial_name = f"{filename[:-3]}.partial.md"
+        partial_path = os.path.abspath(os.path.join(project_folder, partial_name))
+        write_behind.flush(partial_path)
+        data = content.encode('utf-8')
+        atomic_write(partial_path, data)
+        notify_write(partial_path)
+        record_write(partial_path, "partial", data, content)
+        return (f"The {len(content):,} characters of your write to '{filename}' were saved to "
+                f"'{partial_name}'; '{filename}' was not written.")
+
+    except Exception as e:
+        return f"Error writing file '{filename}': {str(e)}"
@@ -8,6 +8,10 @@ import json
 import agentONE
 from ParametersONE import ParametersONE
 from tools.compression import compress_context_impl
+from ads.eventLog import events
+from tools.writeback import write_behind
+from ads.chatMessage import ChatMessage
+from ads.messageStore import MessageStore
 
 class UtilsONE:
 
@@ -29,14 +33,65 @@ class UtilsONE:
         Returns:
             Total token count
         """
-        # Convert messages to serializable format (remove non-serializable objects)
+        # Both token estimation and chat use api.moonshot.ai
+        token_base_url = base_url
+
+        # Make the API call
+        with httpx.Client(
+                base_url=token_base_url,
+                headers={"Authorization": f"Bearer {api_key}"},
+                timeout=30.0
+        ) as client:
+            response = client.post(
+                "/tokenizers/estimate-token-count",
+                json={
+                    "model": model,
+                    "messages": UtilsONE._serializable_messages(messages)
+                }
+            )
+            response.raise_for_status()
+            data = response.json()
+            return data.get("data", {}).get("total_tokens", 0)
+
+    @staticmethod
+    async def estimate_token_count_async(base_url: str, api_key: str, model: str, messages: List[Dict],
+                                         http_client: httpx.AsyncClient = None) -> int:
+        """
+        Async version of estimate_token_count.
+
+        Args:
+            base_url: The base URL for the API
+            api_key: The API key for authentication
+            model: The model name
+            messages: List of message dictionaries
+            http_client: Optional shared ``httpx.AsyncClient``; a temporary one is used otherwise
+
+        Returns:
+            Total token count
+        """
+        payload = {"model": model, "messages": UtilsONE._serializable_messages(messages)}
+        url = f"{base_url.rstrip('/')}/tokenizers/estimate-token-count"
+        headers = {"Authorization": f"Bearer {api_key}"}
+
+        if http_client is None:
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                response = await client.post(url, json=payload, headers=headers)
+        else:
+            response = await http_client.post(url, json=payload, headers=headers, timeout=30.0)
+        response.raise_for_status()
+        data = response.json()
+        return data.get("data", {}).get("total_tokens", 0)
+
+    @staticmethod
+    def _serializable_messages(messages: List[Dict]) -> List[Dict]:
+        """Convert messages to serializable format (remove non-serializable objects)."""
         serializable_messages: list = []
         for msg in messages:
             if hasattr(msg, 'model_dump'):
                 # OpenAI SDK message object
                 msg_dict = msg.model_dump()
-            elif isinstance(msg, dict):
-                msg_dict = msg.copy()
+            elif isinstance(msg, (dict, ChatMessage)):
+                msg_dict = MessageStore.hydrate_message(msg)
             else:
                 msg_dict = {"role": "assistant", "content": str(msg)}
 
@@ -54,32 +109,32 @@ class UtilsONE:
                 clean_msg['tool_call_id'] = msg_dict['tool_call_id']
 
             serializable_messages.append(clean_msg)
-
-        # Both token estimation and chat use api.moonshot.ai
-        token_base_url = base_url
-
-        # Make the API call
-        with httpx.Client(
-                base_url=token_base_url,
-                headers={"Authorization": f"Bearer {api_key}"},
-                timeout=30.0
-        ) as client:
-            response = client.post(
-                "/tokenizers/estimate-token-count",
-                json={
-                    "model": model,
-                    "messages": serializable_messages
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data.get("data", {}).get("total_tokens", 0)
+        return serializable_messages
 
     import sys
     import signal
     from pathlib import Path
     from datetime import datetime
 
+    @staticmethod
+    def dump_raw_messages(messages: List[Dict], path: str | Path = "backups/EMERGENCY_RAW_DUMP.json") -> Path:
+        """
+        Write the raw message history as JSON (last-ditch save, no API calls).
+
+        Returns:
+            Path of the written dump
+        """
+        _raw_path = Path(path)
+        _raw_path.parent.mkdir(parents=True, exist_ok=True)
+        # One message at a time: spilled fields are read back individually, never all at once
+        with _raw_path.open("w", encoding="utf-8") as f:
+            f.write("[")
+            for i, msg in enumerate(messages):
+                f.write(",\n" if i else "\n")
+                f.write(json.dumps(MessageStore.hydrate_message(msg), ensure_ascii=False, indent=2))
+            f.write("\n]\n")
+        return _raw_path
+
     # ─────────────────────────────────────────────────────────────────────────────
     # Graceful shutdown on Ctrl+C – saves context reliably, never loses work
     # ─────────────────────────────────────────────────────────────────────────────
@@ -87,6 +142,9 @@ class UtilsONE:
     def graceful_shutdown(agent, signum=None, frame=None):
         print("\n\nUser requested shutdown – performing emergency context save...")
 
+        # Queued chapter text first: it is the user's work and needs no API call
+        write_behind.close()
+
         try:
             print("   Running final context compression (keeping everything)...", end=" ")
 
@@ -130,18 +188,15 @@ class UtilsONE:
             print(f"   Error during emergency save: {e}")
             # Last‑ditch raw dump
             try:
-                _raw_path = Path("backups/EMERGENCY_RAW_DUMP.json")
-                _raw_path.parent.mkdir(parents=True, exist_ok=True)
-                _raw_path.write_text(
-                    json.dumps(agent.messages, ensure_ascii=False, indent=2),
-                    encoding="utf-8"
-                )
+                _raw_path = UtilsONE.dump_raw_messages(agent.messages)
                 print(f"   Raw message dump saved → {_raw_path}")
             except Exception:
                 pass
 
         finally:
             print("\nGoodbye!\n")
+            events.emit("shutdown", messages=len(getattr(agent, "messages", [])))
+            events.close()  # flush queued events before exiting
             sys.exit(0)
 '''
     # ─────────────────────────────────────────────────────────────────────────────